@@ -29,6 +29,19 @@ TG_API_HASH = env.str('TG_API_HASH', '')
 TG_SESSION = env.str('TG_SESSION', '')
 TG_GET_MESSAGE_FROM = env.int('TG_GET_MESSAGE_FROM')
 TG_ADDITIONAL_CHAT_ID = env.int('TG_ADDITIONAL_CHAT_ID')
+TG_BOT_API_URL = env.str('TG_BOT_API_URL', '')
+TG_BOT_POOL_SIZE = env.int('TG_BOT_POOL_SIZE', 20)
+TG_BOT_KEEPALIVE_TIMEOUT = env.int('TG_BOT_KEEPALIVE_TIMEOUT', 60)
+TG_NOTIFY_RATE = env.float('TG_NOTIFY_RATE', 25.0)
+TG_NOTIFY_CHAT_RATE = env.float('TG_NOTIFY_CHAT_RATE', 1.0)
+TG_NOTIFY_RETRY_ATTEMPTS = env.int('TG_NOTIFY_RETRY_ATTEMPTS', 3)
+TG_OUTBOX_BATCH_SIZE = env.int('TG_OUTBOX_BATCH_SIZE', 25)
+TG_OUTBOX_POLL_INTERVAL = env.float('TG_OUTBOX_POLL_INTERVAL', 1.0)
+TG_OUTBOX_LEASE = env.int('TG_OUTBOX_LEASE', 60)
+TG_OUTBOX_MAX_ATTEMPTS = env.int('TG_OUTBOX_MAX_ATTEMPTS', 5)
+TG_OUTBOX_RETRY_DELAY = env.int('TG_OUTBOX_RETRY_DELAY', 30)
+TG_ARCHIVE_CONCURRENCY = env.int('TG_ARCHIVE_CONCURRENCY', 4)
+TG_ARCHIVE_CHUNK_SIZE = env.int('TG_ARCHIVE_CHUNK_SIZE', 64 * 1024)
 
 XML_LOGIN = env.str('XML_LOGIN')
 XML_PASSWORD = env.str('XML_PASSWORD')
@@ -50,6 +63,35 @@ TASK_ESCALATION = env.int('TASK_ESCALATION', 10)
 TASK_DEADLINE = env.int('TASK_DEADLINE', 120)
 
 SYNC_TIMEOUT = env.int('SYNC_TIMEOUT', 7)
+SYNC_TIMEOUT_MIN = env.float('SYNC_TIMEOUT_MIN', 2.0)
+SYNC_TIMEOUT_MAX = env.float('SYNC_TIMEOUT_MAX', 20.0)
+SYNC_CONNECT_TIMEOUT_MIN = env.float('SYNC_CONNECT_TIMEOUT_MIN', 0.5)
+SYNC_CONCURRENCY = env.int('SYNC_CONCURRENCY', 50)
+SYNC_FRANCHISE_CONCURRENCY = env.int('SYNC_FRANCHISE_CONCURRENCY', 30)
+SYNC_HOST_CONCURRENCY = env.int('SYNC_HOST_CONCURRENCY', 4)
+SYNC_PROGRESS_INTERVAL = env.int('SYNC_PROGRESS_INTERVAL', 5)
+SYNC_RETRY_ATTEMPTS = env.int('SYNC_RETRY_ATTEMPTS', 3)
+SYNC_RETRY_BASE_DELAY = env.float('SYNC_RETRY_BASE_DELAY', 1.0)
+SYNC_RETRY_MAX_DELAY = env.float('SYNC_RETRY_MAX_DELAY', 10.0)
+SYNC_RUN_DEADLINE = env.int('SYNC_RUN_DEADLINE', 600)
+SYNC_DELTA_MAX_AGE = env.int('SYNC_DELTA_MAX_AGE', 24)
+SYNC_KEEPALIVE_TIMEOUT = env.int('SYNC_KEEPALIVE_TIMEOUT', 600)
+SYNC_RESULTS_BATCH_SIZE = env.int('SYNC_RESULTS_BATCH_SIZE', 200)
+SYNC_PROBE_INTERVAL = env.int('SYNC_PROBE_INTERVAL', 300)
+SYNC_PROBE_TIMEOUT = env.float('SYNC_PROBE_TIMEOUT', 3.0)
+SYNC_PROBE_CONCURRENCY = env.int('SYNC_PROBE_CONCURRENCY', 100)
+SYNC_DEAD_HOST_FAILURES = env.int('SYNC_DEAD_HOST_FAILURES', 3)
+SYNC_SERVICE_USER = env.str('SYNC_SERVICE_USER', 'sync_service')
+SYNC_SCHEDULES_RELOAD_INTERVAL = env.int('SYNC_SCHEDULES_RELOAD_INTERVAL', 300)
+SYNC_DRAIN_TIMEOUT = env.int('SYNC_DRAIN_TIMEOUT', 30)
+SYNC_CANCEL_CHECK_INTERVAL = env.float('SYNC_CANCEL_CHECK_INTERVAL', 1.0)
+SYNC_SHARDS = env.int('SYNC_SHARDS', 1)
+SYNC_WORKER_ID = env.str('SYNC_WORKER_ID', 'sync_worker')
+SYNC_SHARD_MIN_TARGETS = env.int('SYNC_SHARD_MIN_TARGETS', 200)
+SYNC_SHARD_IDLE_TIMEOUT = env.int('SYNC_SHARD_IDLE_TIMEOUT', 600)
+SYNC_MASS_COOLDOWN = env.int('SYNC_MASS_COOLDOWN', 600)
+SYNC_MASS_LOCK_TTL = env.int('SYNC_MASS_LOCK_TTL', 3600)
+REPORT_CACHE_MAX_BYTES = env.int('REPORT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
 
 REDIS_HOST = env.str('REDIS_HOST', '')
 REDIS_PORT = env.int('REDIS_PORT', 6379)
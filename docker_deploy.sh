@@ -12,8 +12,8 @@ LOCAL_USERNAME=$(whoami)
 echo -e "Скачиваем последний образ приложения с DockerHub"
 docker pull stranix34/kfc_support_bot:latest
 
-echo -e "Пересобираем контейнер web и запускаем..."
-docker compose up -d --no-deps --force-recreate web
+echo -e "Пересобираем контейнеры web и sync_worker и запускаем..."
+docker compose up -d --no-deps --force-recreate web sync_worker
 
 echo -e "Собираем статику Django..."
 docker compose exec web python manage.py collectstatic --no-input --clear -v 0
@@ -6,6 +6,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.admin import GroupAdmin
 from django.contrib.auth.models import Group as DjangoGroup, Permission
 from django.shortcuts import redirect
+from django.utils import timezone
 from django.utils.http import url_has_allowed_host_and_scheme
 
 from src.models import (
@@ -18,6 +19,11 @@ from src.models import (
     Restaurant,
     FranchiseOwner,
     SyncReport,
+    SyncResult,
+    HostHealth,
+    SyncSchedule,
+    Notification,
+    DeadNotification,
     WorkShift,
     Dispatcher,
     BotCommand,
@@ -204,6 +210,7 @@ class ServerAdmin(admin.ModelAdmin):
         'restaurant',
         'is_sync',
         'franchise_owner',
+        'last_sync_at',
     ]
 
     list_editable = [
@@ -232,6 +239,7 @@ class RestaurantAdmin(admin.ModelAdmin):
         'server_ip',
         'is_sync',
         'franchise',
+        'last_sync_at',
     ]
     list_editable = [
         'is_sync',
@@ -240,7 +248,56 @@ class RestaurantAdmin(admin.ModelAdmin):
 
 @admin.register(FranchiseOwner)
 class FranchiseOwner(admin.ModelAdmin):
-    pass
+    list_display = [
+        'name',
+        'alias',
+        'referents_changed_at',
+    ]
+
+
+@admin.register(HostHealth)
+class HostHealthAdmin(admin.ModelAdmin):
+    search_fields = [
+        'host',
+    ]
+
+    list_display = [
+        'host',
+        'port',
+        'last_checked_at',
+        'last_seen_at',
+        'latency_ms',
+        'sync_time_ms',
+        'consecutive_failures',
+        'last_error',
+    ]
+    list_filter = [
+        'consecutive_failures',
+    ]
+
+
+@admin.register(SyncSchedule)
+class SyncScheduleAdmin(admin.ModelAdmin):
+    list_display = [
+        'name',
+        'server_type',
+        'franchise',
+        'changed_only',
+        'window_start',
+        'window_end',
+        'is_active',
+        'last_run_at',
+    ]
+    list_filter = [
+        'server_type',
+        'is_active',
+    ]
+    list_editable = [
+        'is_active',
+    ]
+    readonly_fields = [
+        'last_run_at',
+    ]
 
 
 @admin.register(SyncReport)
@@ -248,6 +305,9 @@ class SyncReportAdmin(admin.ModelAdmin):
     search_fields = [
         'employee',
     ]
+    exclude = [
+        'report',
+    ]
 
     list_display = [
         'id',
@@ -255,9 +315,88 @@ class SyncReportAdmin(admin.ModelAdmin):
         'new_employee',
         'server_type',
         'user_choice',
+        'changed_only',
+        'status',
         'start_at',
+        'finished_at',
+    ]
+    list_filter = [
+        'status',
+        'changed_only',
+    ]
+
+
+@admin.register(SyncResult)
+class SyncResultAdmin(admin.ModelAdmin):
+    search_fields = [
+        'server_name',
+    ]
+
+    list_display = [
+        'report',
+        'server_name',
+        'status',
+        'msg',
+        'attempts',
+    ]
+    list_filter = [
+        'status',
+    ]
+    raw_id_fields = [
+        'report',
+    ]
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    search_fields = [
+        'recipient_name',
+        'text',
     ]
 
+    list_display = [
+        'id',
+        'recipient_name',
+        'priority',
+        'status',
+        'attempts',
+        'created_at',
+        'sent_at',
+        'last_error',
+    ]
+    list_filter = [
+        'status',
+        'priority',
+    ]
+    readonly_fields = [
+        'attempts',
+        'created_at',
+        'sent_at',
+        'last_error',
+    ]
+    actions = [
+        'requeue',
+    ]
+
+    @admin.action(description='Отправить повторно')
+    def requeue(self, request, queryset):
+        requeued = queryset.exclude(status='sent').update(
+            status='pending',
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'Вернули в очередь: {requeued}')
+
+
+@admin.register(DeadNotification)
+class DeadNotificationAdmin(NotificationAdmin):
+    list_filter = [
+        'priority',
+    ]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(status='dead')
+
 
 @admin.register(WorkShift)
 class WorkShiftAdmin(admin.ModelAdmin):
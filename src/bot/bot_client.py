@@ -0,0 +1,107 @@
+import ssl
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from django.conf import settings
+
+logger = logging.getLogger('support_bot')
+
+
+class TelegramBotSession(AiohttpSession):
+    """Сессия aiogram с настроенным пулом соединений к Bot API.
+    Соединения живут TG_BOT_KEEPALIVE_TIMEOUT секунд, уведомления
+    не тратят время на TCP подключение и TLS рукопожатие
+    """
+
+    def __init__(
+            self,
+            limit: int | None = None,
+            keepalive_timeout: int | None = None,
+            ssl_context: ssl.SSLContext | None = None,
+            **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._connector_init.update(
+            limit=limit or settings.TG_BOT_POOL_SIZE,
+            keepalive_timeout=(
+                keepalive_timeout or settings.TG_BOT_KEEPALIVE_TIMEOUT
+            ),
+        )
+        if ssl_context is not None:
+            self._connector_init['ssl'] = ssl_context
+
+
+def create_bot(
+        token: str | None = None,
+        api_url: str | None = None,
+        ssl_context: ssl.SSLContext | None = None,
+) -> Bot:
+    api_url = api_url or settings.TG_BOT_API_URL
+    session_kwargs = {'ssl_context': ssl_context}
+    if api_url:
+        session_kwargs['api'] = TelegramAPIServer.from_base(api_url)
+    return Bot(
+        token=token or settings.TG_BOT_TOKEN,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+        session=TelegramBotSession(**session_kwargs),
+    )
+
+
+_bots: dict[asyncio.AbstractEventLoop, Bot] = {}
+
+
+def init_bot(bot: Bot | None = None) -> Bot:
+    """Общий Bot цикла событий для всех исходящих запросов в телеграм.
+    Создается при старте бота, fetch_tg и воркера синхронизаций
+    """
+    loop = asyncio.get_running_loop()
+    drop_closed_loops()
+    _bots[loop] = bot or create_bot()
+    logger.info('Создана сессия Bot API')
+    return _bots[loop]
+
+
+def get_bot() -> Bot:
+    """Сессия aiohttp привязана к циклу событий, в котором создана,
+    поэтому Bot один на цикл: вызов из другого цикла, например из задачи
+    шедулера в отдельном потоке, получает свой Bot и не трогает чужой
+    """
+    bot = _bots.get(asyncio.get_running_loop())
+    if bot is None:
+        return init_bot()
+    return bot
+
+
+def drop_closed_loops():
+    """Bot закрытого цикла уже не закрыть, только забыть"""
+    for loop in [loop for loop in _bots if loop.is_closed()]:
+        logger.warning('Цикл событий закрыт раньше сессии Bot API')
+        del _bots[loop]
+
+
+async def close_bot(timeout: float = 5):
+    """Закрываем Bot всех циклов: Bot цикла в другом потоке
+    закрывается в его цикле
+    """
+    current_loop = asyncio.get_running_loop()
+    for loop, bot in list(_bots.items()):
+        del _bots[loop]
+        if loop is current_loop:
+            await bot.session.close()
+        elif loop.is_running():
+            closing = asyncio.run_coroutine_threadsafe(
+                bot.session.close(),
+                loop,
+            )
+            try:
+                await asyncio.wait_for(asyncio.wrap_future(closing), timeout)
+            except asyncio.TimeoutError:
+                logger.warning('Не дождался закрытия сессии Bot API')
+                continue
+        logger.info('Сессия Bot API закрыта')
@@ -2,9 +2,7 @@ import re
 import logging
 
 from aiogram import types
-from aiogram import Bot
 from aiogram import Router
-from aiogram.enums import ParseMode
 
 from aiogram.filters import Command
 from aiogram.fsm.state import State
@@ -14,8 +12,6 @@ from aiogram.utils.deep_linking import create_start_link
 
 from asgiref.sync import sync_to_async
 
-from django.conf import settings
-
 from src.models import BotCommand
 from src.models import TGDeepLink
 from src.models import CustomGroup
@@ -63,9 +59,11 @@ async def create_deeplink_step_2(
             'Должно содержать только латиницу  от 3 до 5 букв',
         )
         return
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
-    deeplink = await create_start_link(bot, deeplink_key, encode=True)
-    await bot.session.close()
+    deeplink = await create_start_link(
+        message.bot,
+        deeplink_key,
+        encode=True,
+    )
     logger.info('Создаю deeplink группу')
     group = await CustomGroup.objects.acreate(name=f'SBER_{deeplink_key}')
     await TGDeepLink.objects.acreate(
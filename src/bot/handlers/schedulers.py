@@ -1,6 +1,6 @@
 import logging
 
-from datetime import timedelta
+from django.utils import timezone
 
 from aiogram import F
 from aiogram import html
@@ -29,8 +29,8 @@ async def get_scheduler_jobs(
     jobs = scheduler.aio_scheduler.get_jobs()
     message_for_send = ['Активные задачи scheduler:\n']
     for job in jobs:
-        print(job)
-        job_next_run_time = job.trigger.run_date + timedelta(hours=3)
+        logger.debug('Задача шедулера: %s', job)
+        job_next_run_time = timezone.localtime(job.next_run_time)
         job_next_run_time = html.code(
             job_next_run_time.strftime('%d-%m-%Y %H:%M:%S'),
         )
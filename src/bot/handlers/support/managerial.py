@@ -6,6 +6,7 @@ import logging
 from datetime import time
 from datetime import datetime
 from datetime import timedelta
+from functools import partial
 
 from asgiref.sync import sync_to_async
 
@@ -18,6 +19,7 @@ from django.utils import timezone
 from src.models import SDTask
 from src.models import CustomUser
 from src.models import WorkShift
+from src.entities.ReportCache import get_report_cache
 
 logger = logging.getLogger('support_bot')
 router = Router(name='managerial_handlers')
@@ -50,9 +52,9 @@ async def cmd_unclosed_tasks(message: types.Message, employee: CustomUser):
             'title': task.title,
             'description': task.description,
         })
-    report_as_doc = await prepare_report_as_file(report, 'unclosed_tasks.json')
-    await message.answer_document(
-        report_as_doc,
+    await get_report_cache().answer_document(
+        message,
+        partial(prepare_report_as_file, report, 'unclosed_tasks.json'),
         caption='Все незакрытые задачи',
     )
     logger.info('Отчет отправлен %s', employee.name)
@@ -77,9 +79,9 @@ async def cmd_report(message: types.Message, employee: CustomUser):
     shift_end_at = datetime.combine(tomorrow, time(), tzinfo=pytz.UTC)
     shift_end_at -= timedelta(seconds=1)
     shift_report = await get_current_shift_report(shift_start_at, shift_end_at)
-    shift_report_as_doc = await prepare_report_as_file(shift_report)
-    await message.answer_document(
-        shift_report_as_doc,
+    await get_report_cache().answer_document(
+        message,
+        partial(prepare_report_as_file, shift_report),
         caption=f'Отчет по смене {shift_report["shift_date"]}',
     )
     logger.info('Отчет отправлен %s', employee.name)
@@ -352,11 +352,10 @@ async def dispatcher_close_task_approved(
     task: SDTask = data['close_task']
     task = await support_engineer.dispatcher_close_task(
         task.id,
-        task.number,
         data['approved_sub_tasks'],
-        data['get_doc'],
         data['task_comment']
     )
+    await scheduler.add_archive_task_documents(task, data['get_doc'])
     job_id = f'job_{task.number}_deadline'
     await scheduler.delete_scheduler_job_by_id(job_id)
     await Message.send_close_task_notify(task)
@@ -5,6 +5,8 @@ from src.bot.middlewares.SyncMiddleware import SyncMiddleware
 from .sync_report import router as report_router
 from .sync_transits import router as tr_router
 from .sync_restaurants import router as rest_router
+from .hosts_health import router as hosts_health_router
+from .cancel import router as cancel_router
 
 
 router = Router(name='sync_handlers_router')
@@ -12,3 +14,5 @@ router.callback_query.middleware(SyncMiddleware())
 router.include_router(tr_router)
 router.include_router(rest_router)
 router.include_router(report_router)
+router.include_router(hosts_health_router)
+router.include_router(cancel_router)
@@ -0,0 +1,45 @@
+import logging
+
+from aiogram import F
+from aiogram import Router
+from aiogram import types
+
+from src.models import CustomUser
+from src.models import SyncReport
+from src.bot.utils import has_perm
+from src.bot.handlers.synchronizations.jobs import get_sync_queue
+
+logger = logging.getLogger('support_bot')
+router = Router(name='sync_cancel_handlers')
+
+
+@router.callback_query(F.data.startswith('sync_cancel_'))
+async def cancel_sync(query: types.CallbackQuery, employee: CustomUser):
+    job_id = query.data.removeprefix('sync_cancel_')
+    if not await can_cancel_sync(job_id, employee):
+        logger.warning(
+            'Нет прав на отмену синхронизации %s у %s',
+            job_id,
+            employee,
+        )
+        await query.answer('Нет прав на отмену синхронизации')
+        return
+    logger.info(
+        'Отмена синхронизации %s от %s',
+        job_id,
+        query.from_user.full_name,
+    )
+    await get_sync_queue().cancel(job_id)
+    await query.answer('Останавливаю синхронизацию, результаты сохранятся')
+
+
+async def can_cancel_sync(job_id: str, employee: CustomUser) -> bool:
+    """Сообщение с прогрессом видят все в чате, отменить может
+    инициатор синхронизации или сотрудник с правом sync
+    """
+    if await SyncReport.objects.filter(
+        job_id=job_id,
+        new_employee=employee,
+    ).aexists():
+        return True
+    return await has_perm('sync', employee)
@@ -0,0 +1,137 @@
+import time
+import asyncio
+import logging
+
+from dataclasses import dataclass
+
+import aiohttp
+
+from django.conf import settings
+
+logger = logging.getLogger('support_bot')
+
+
+@dataclass
+class ConnectionStats:
+    created: int = 0
+    reused: int = 0
+    handshake_time: float = 0.0
+
+    @property
+    def avg_handshake_time(self) -> float:
+        if not self.created:
+            return 0.0
+        return self.handshake_time / self.created
+
+    def __sub__(self, other: 'ConnectionStats') -> 'ConnectionStats':
+        return ConnectionStats(
+            created=self.created - other.created,
+            reused=self.reused - other.reused,
+            handshake_time=self.handshake_time - other.handshake_time,
+        )
+
+
+class SyncHttpClient:
+    """Общая на процесс HTTP сессия для синхронизаций.
+    Соединения с веб серверами RK7 живут между запусками
+    SYNC_KEEPALIVE_TIMEOUT секунд, поэтому повторная синхронизация
+    не тратит время на TCP подключение и TLS рукопожатие
+    """
+
+    def __init__(self):
+        self.stats = ConnectionStats()
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session and not self._session.closed and self._loop is loop:
+            return self._session
+        if self._session and self._loop is loop:
+            await self._session.close()
+        self._session = self._create_session()
+        self._loop = loop
+        logger.info('Создана HTTP сессия для синхронизаций')
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logger.info('HTTP сессия для синхронизаций закрыта')
+        self._session = None
+        self._loop = None
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        conn = aiohttp.TCPConnector(
+            ssl=settings.SSL_CONTEXT,
+            limit=settings.SYNC_CONCURRENCY,
+            keepalive_timeout=settings.SYNC_KEEPALIVE_TIMEOUT,
+        )
+        return aiohttp.ClientSession(
+            trust_env=True,
+            connector=conn,
+            raise_for_status=True,
+            timeout=aiohttp.ClientTimeout(total=settings.SYNC_TIMEOUT),
+            trace_configs=[self._create_trace_config()],
+        )
+
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Кроме статистики соединений пишет время фаз запроса в мс
+        в trace_request_ctx, если запросу передан словарь.
+        TCP подключение и TLS рукопожатие aiohttp выполняет одним
+        вызовом, поэтому это одна фаза connect
+        """
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_connection_queued_start(session, context, params):
+            context.queued_at = time.monotonic()
+
+        async def on_connection_queued_end(session, context, params):
+            add_trace_timing(context, 'queue', context.queued_at)
+
+        async def on_connection_create_start(session, context, params):
+            context.connection_started_at = time.monotonic()
+
+        async def on_connection_create_end(session, context, params):
+            self.stats.created += 1
+            self.stats.handshake_time += (
+                time.monotonic() - context.connection_started_at
+            )
+            add_trace_timing(context, 'connect', context.connection_started_at)
+
+        async def on_connection_reuseconn(session, context, params):
+            self.stats.reused += 1
+
+        trace_config.on_connection_queued_start.append(
+            on_connection_queued_start,
+        )
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_connection_create_start.append(
+            on_connection_create_start,
+        )
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+
+def add_trace_timing(context, phase: str, started_at: float):
+    if isinstance(context.trace_request_ctx, dict):
+        context.trace_request_ctx[phase] = (
+            context.trace_request_ctx.get(phase, 0.0)
+            + (time.monotonic() - started_at) * 1000
+        )
+
+
+_sync_http_client: SyncHttpClient | None = None
+
+
+def get_sync_http_client() -> SyncHttpClient:
+    global _sync_http_client
+    if _sync_http_client is None:
+        _sync_http_client = SyncHttpClient()
+    return _sync_http_client
+
+
+async def close_sync_http_client():
+    if _sync_http_client is not None:
+        await _sync_http_client.close()
@@ -0,0 +1,105 @@
+import logging
+
+from datetime import datetime
+from datetime import timedelta
+
+from aiogram import html
+
+from django.conf import settings
+from django.utils import timezone
+
+from src.models import Server
+from src.models import Restaurant
+from src.bot.scheme import SyncStatus
+from src.bot.scheme import SyncTarget
+
+logger = logging.getLogger('support_bot')
+
+
+def is_sync_needed(
+        last_sync_at: datetime | None,
+        referents_changed_at: datetime | None,
+        now: datetime | None = None,
+) -> bool:
+    """Сервер нужно синхронизировать, если он ни разу не синхронизировался,
+    справочники франшизы менялись после последней успешной синхронизации
+    или она была раньше чем SYNC_DELTA_MAX_AGE часов назад
+    """
+    if last_sync_at is None:
+        return True
+    if referents_changed_at and referents_changed_at > last_sync_at:
+        return True
+    now = now or timezone.now()
+    max_age = timedelta(hours=settings.SYNC_DELTA_MAX_AGE)
+    return now - last_sync_at >= max_age
+
+
+def split_changed_servers(
+        servers: list[Restaurant | Server],
+) -> tuple[list[Restaurant | Server], list[Restaurant | Server]]:
+    """Делим сервера на требующие синхронизации и пропущенные.
+    Франшиза сервера должна быть загружена через select_related
+    """
+    now = timezone.now()
+    changed = []
+    skipped = []
+    for server in servers:
+        if isinstance(server, Restaurant):
+            franchise = server.franchise
+        else:
+            franchise = server.franchise_owner
+        referents_changed_at = None
+        if franchise:
+            referents_changed_at = franchise.referents_changed_at
+        if is_sync_needed(server.last_sync_at, referents_changed_at, now):
+            changed.append(server)
+        else:
+            skipped.append(server)
+    logger.info(
+        'Синхронизация изменившихся: %s к запуску, %s пропущено',
+        len(changed),
+        len(skipped),
+    )
+    return changed, skipped
+
+
+def get_skipped_status(
+        server: Restaurant | Server,
+        target: SyncTarget,
+) -> SyncStatus:
+    last_sync_at = timezone.localtime(server.last_sync_at)
+    return SyncStatus(
+        server_name=target.server_name,
+        web_link=target.web_link,
+        status='skipped',
+        msg=f'Синхронизирован {last_sync_at:%d-%m-%Y %H:%M}',
+    )
+
+
+def format_skipped_count(skipped_statuses: list[SyncStatus]) -> str:
+    """Строка к итогу синхронизации в режиме только изменившихся"""
+    if not skipped_statuses:
+        return ''
+    return (
+        '\nПропущено (без изменений): '
+        + html.code(len(skipped_statuses))
+    )
+
+
+async def save_last_sync(
+        targets: list[SyncTarget],
+        sync_statuses: list[SyncStatus],
+):
+    """Запоминаем время успешной синхронизации серверов"""
+    synced_ids = {Server: [], Restaurant: []}
+    for target, sync_status in zip(targets, sync_statuses):
+        if sync_status.status != 'ok' or target.server_id is None:
+            continue
+        model = Server if target.server_type == 'Transit' else Restaurant
+        synced_ids[model].append(target.server_id)
+    synced_at = timezone.now()
+    for model, ids in synced_ids.items():
+        if ids:
+            await model.objects.filter(id__in=ids).aupdate(
+                last_sync_at=synced_at,
+            )
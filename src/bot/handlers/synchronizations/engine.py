@@ -0,0 +1,289 @@
+import time
+import random
+import asyncio
+import logging
+
+from typing import Any
+from typing import Callable
+from typing import Awaitable
+from typing import AsyncIterator
+from dataclasses import replace
+from collections import defaultdict
+
+import aiohttp
+
+from django.conf import settings
+
+from src.models import Server
+from src.models import Restaurant
+from src.bot.scheme import SyncStats
+from src.bot.scheme import SyncStatus
+from src.bot.scheme import SyncTarget
+from src.bot.utils import sync_referents
+from src.bot.handlers.synchronizations.retry import RetryPolicy
+from src.bot.handlers.synchronizations.health import TIMEOUT_ERRORS
+from src.bot.handlers.synchronizations.health import backoff_sync_timeout
+from src.bot.handlers.synchronizations.health import get_unreachable_status
+from src.bot.handlers.synchronizations.client import get_sync_http_client
+
+logger = logging.getLogger('support_bot')
+
+
+class SyncEngine:
+    """Запуск sync_referents с ограничением количества одновременных
+    синхронизаций: общим, на франшизу и на ip сервера.
+    При spread > 0 старт синхронизаций растягивается на spread секунд
+    """
+
+    def __init__(
+            self,
+            global_limit: int | None = None,
+            franchise_limit: int | None = None,
+            host_limit: int | None = None,
+            retry_policy: RetryPolicy | None = None,
+            unreachable_hosts: set[tuple[str, int]] | None = None,
+            host_timeouts: dict[
+                tuple[str, int],
+                aiohttp.ClientTimeout,
+            ] | None = None,
+            spread: float = 0.0,
+    ):
+        self.global_limit = global_limit or settings.SYNC_CONCURRENCY
+        self.franchise_limit = (
+            franchise_limit or settings.SYNC_FRANCHISE_CONCURRENCY
+        )
+        self.host_limit = host_limit or settings.SYNC_HOST_CONCURRENCY
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.unreachable_hosts = unreachable_hosts or set()
+        self.host_timeouts = host_timeouts or {}
+        self.spread = spread
+        self.stats = SyncStats()
+        self.sync_statuses: list[SyncStatus | None] = []
+        self.sync_times: dict[tuple[str, int], list[float]] = defaultdict(
+            list,
+        )
+        self._global_semaphore = asyncio.Semaphore(self.global_limit)
+        self._franchise_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(self.franchise_limit)
+        )
+        self._host_semaphores = defaultdict(
+            lambda: asyncio.Semaphore(self.host_limit)
+        )
+
+    async def run(
+            self,
+            targets: list[SyncTarget],
+            on_result: Callable[[SyncStatus], Awaitable[Any]] | None = None,
+            upstreams: dict[int, list[int]] | None = None,
+    ) -> list[SyncStatus]:
+        """Синхронизация списка серверов. Порядок статусов = порядку целей.
+        При отмене в sync_statuses остаются полученные результаты
+        """
+        self.sync_statuses = [None] * len(targets)
+        async for index, sync_status in self.iter_results(targets, upstreams):
+            self.sync_statuses[index] = sync_status
+            if on_result:
+                await on_result(sync_status)
+        return self.sync_statuses
+
+    async def iter_results(
+            self,
+            targets: list[SyncTarget],
+            upstreams: dict[int, list[int]] | None = None,
+    ) -> AsyncIterator[tuple[int, SyncStatus]]:
+        """Отдаем результаты синхронизации по мере их готовности.
+        upstreams - индексы вышестоящих серверов для индекса цели,
+        они должны идти в targets раньше зависящих от них
+        """
+        logger.info(
+            'Запуск синхронизации %s серверов (лимиты: %s/%s/%s)',
+            len(targets),
+            self.global_limit,
+            self.franchise_limit,
+            self.host_limit,
+        )
+        self.stats = SyncStats(total=len(targets))
+        self.sync_times = defaultdict(list)
+        self.retry_policy.start(self.spread)
+        started_at = time.monotonic()
+        start_offsets = get_start_offsets(len(targets), self.spread)
+        http_client = get_sync_http_client()
+        session = await http_client.get_session()
+        connection_stats_before = replace(http_client.stats)
+        upstreams = upstreams or {}
+        tasks = []
+        for index, target in enumerate(targets):
+            upstream_tasks = [
+                tasks[upstream_index]
+                for upstream_index in upstreams.get(index, [])
+            ]
+            tasks.append(
+                asyncio.create_task(
+                    self._sync_target(
+                        session,
+                        index,
+                        target,
+                        upstream_tasks,
+                        started_at + start_offsets[index],
+                    ),
+                ),
+            )
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                task.cancel()
+        self.stats.elapsed = time.monotonic() - started_at
+        connection_stats = http_client.stats - connection_stats_before
+        self.stats.connections_created = connection_stats.created
+        self.stats.connections_reused = connection_stats.reused
+        self.stats.handshake_time = connection_stats.handshake_time
+        self.stats.handshake_time_saved = (
+            connection_stats.reused * http_client.stats.avg_handshake_time
+        )
+        self._log_stats()
+
+    async def _sync_target(
+            self,
+            session: aiohttp.ClientSession,
+            index: int,
+            target: SyncTarget,
+            upstream_tasks: list[asyncio.Task] | None = None,
+            start_at: float = 0.0,
+    ) -> tuple[int, SyncStatus]:
+        host = (target.host, target.port)
+        timeout = self.host_timeouts.get(host)
+        elapsed = 0.0
+        attempt = 1
+        upstream_failed = False
+        if upstream_tasks:
+            upstream_results = await asyncio.gather(*upstream_tasks)
+            upstream_failed = all(
+                sync_status.status != 'ok'
+                for _, sync_status in upstream_results
+            )
+        await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+        while True:
+            if upstream_failed:
+                sync_status = get_upstream_failed_status(target)
+                break
+            if host in self.unreachable_hosts:
+                sync_status = get_unreachable_status(target)
+                break
+            async with self._host_semaphores[target.host], \
+                    self._franchise_semaphores[target.franchise_id], \
+                    self._global_semaphore:
+                attempt_started_at = time.monotonic()
+                sync_status = await sync_referents(
+                    session,
+                    target.web_link,
+                    target.server_name,
+                    timeout=timeout,
+                )
+                attempt_time = time.monotonic() - attempt_started_at
+            elapsed += attempt_time
+            sync_status.attempts = attempt
+            if sync_status.status == 'ok':
+                self.sync_times[host].append(attempt_time * 1000)
+            if sync_status.error_class in TIMEOUT_ERRORS:
+                # медленный, но живой сервер успеет ответить на повторе
+                timeout = backoff_sync_timeout(timeout)
+            delay = self.retry_policy.retry_delay(sync_status, attempt)
+            if delay is None:
+                break
+            logger.debug(
+                'Повтор синхронизации %s через %.1f c (%s)',
+                target.server_name,
+                delay,
+                sync_status.error_class,
+            )
+            await asyncio.sleep(delay)
+            attempt += 1
+        sync_status.elapsed = elapsed
+        if sync_status.status == 'ok':
+            self.stats.ok += 1
+        else:
+            self.stats.errors += 1
+        return index, sync_status
+
+    def _log_stats(self):
+        logger.info(
+            'Соединений новых: %s (рукопожатия %.1f c), переиспользовано: %s '
+            '(сэкономлено примерно %.1f c)',
+            self.stats.connections_created,
+            self.stats.handshake_time,
+            self.stats.connections_reused,
+            self.stats.handshake_time_saved,
+        )
+        logger.info(
+            'Синхронизация завершена: %s серверов за %.1f c '
+            '(%.1f серв/с), ошибок: %s (%.0f%%)',
+            self.stats.total,
+            self.stats.elapsed,
+            self.stats.throughput,
+            self.stats.errors,
+            self.stats.error_rate * 100,
+        )
+
+
+def get_start_offsets(count: int, spread: float) -> list[float]:
+    """Смещения старта от начала запуска: окно делится на count слотов,
+    слоты достаются целям в случайном порядке, внутри слота случайный сдвиг
+    """
+    if not spread or not count:
+        return [0.0] * count
+    slot = spread / count
+    slots = random.sample(range(count), count)
+    return [(number + random.random()) * slot for number in slots]
+
+
+def get_topology_upstreams(targets: list[SyncTarget]) -> dict[int, list[int]]:
+    """Ресторанам в вышестоящие назначаем транзиты их франшизы"""
+    transits = defaultdict(list)
+    for index, target in enumerate(targets):
+        if target.server_type == 'Transit':
+            transits[target.franchise_id].append(index)
+    return {
+        index: transits[target.franchise_id]
+        for index, target in enumerate(targets)
+        if target.server_type != 'Transit' and transits[target.franchise_id]
+    }
+
+
+def get_upstream_failed_status(target: SyncTarget) -> SyncStatus:
+    return SyncStatus(
+        server_name=target.server_name,
+        web_link=target.web_link,
+        status='error',
+        msg='Транзиты франшизы не синхронизированы',
+        error_class='UpstreamFailed',
+    )
+
+
+def server_to_target(server: Restaurant | Server) -> SyncTarget:
+    if isinstance(server, Server):
+        return transit_to_target(server)
+    return restaurant_to_target(server)
+
+
+def restaurant_to_target(restaurant: Restaurant) -> SyncTarget:
+    return SyncTarget(
+        server_name=restaurant.name,
+        web_link=f'https://{restaurant.server_ip}:9000/',
+        host=restaurant.server_ip,
+        franchise_id=restaurant.franchise_id,
+        server_id=restaurant.id,
+    )
+
+
+def transit_to_target(transit: Server) -> SyncTarget:
+    return SyncTarget(
+        server_name=transit.name,
+        web_link=f'https://{transit.ip}:{transit.web_server}/',
+        host=transit.ip,
+        franchise_id=transit.franchise_owner_id,
+        server_id=transit.id,
+        port=transit.web_server,
+        server_type='Transit',
+    )
@@ -0,0 +1,310 @@
+import time
+import asyncio
+import logging
+
+from datetime import datetime
+from datetime import timedelta
+
+import aiohttp
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from asgiref.sync import sync_to_async
+
+from src.models import Server
+from src.models import Restaurant
+from src.models import HostHealth
+from src.bot.scheme import SyncStatus
+from src.bot.scheme import SyncTarget
+
+logger = logging.getLogger('support_bot')
+
+LATENCY_SMOOTHING = 0.3
+SYNC_TIME_SMOOTHING = 1 / 8
+SYNC_TIME_VAR_SMOOTHING = 1 / 4
+TIMEOUT_ERRORS = ('TimeoutError', 'ServerTimeoutError')
+
+
+class HostProber:
+    """Периодическая проверка TCP/TLS подключения к веб серверам RK.
+    Результаты копятся в HostHealth и используются при синхронизации,
+    чтобы не ждать SYNC_TIMEOUT на заведомо недоступных серверах
+    """
+
+    def __init__(
+            self,
+            interval: int | None = None,
+            timeout: float | None = None,
+            concurrency: int | None = None,
+    ):
+        self.interval = interval or settings.SYNC_PROBE_INTERVAL
+        self.timeout = timeout or settings.SYNC_PROBE_TIMEOUT
+        self.concurrency = concurrency or settings.SYNC_PROBE_CONCURRENCY
+
+    async def run_forever(self):
+        logger.info('Проверка доступности серверов запущена')
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as err:
+                logger.exception(err)
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self):
+        hosts = await get_hosts_for_probe()
+        logger.info('Проверяю доступность %s серверов', len(hosts))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def probe_with_limit(host: str, port: int):
+            async with semaphore:
+                return host, port, await probe_host(host, port, self.timeout)
+
+        results = await asyncio.gather(
+            *[probe_with_limit(host, port) for host, port in hosts],
+        )
+        await save_probe_results(results)
+
+
+async def probe_host(
+        host: str,
+        port: int,
+        timeout: float,
+) -> tuple[float | None, str]:
+    """Время TCP подключения и TLS рукопожатия в мс или текст ошибки"""
+    started_at = time.monotonic()
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=settings.SSL_CONTEXT),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        return None, 'timeout'
+    except OSError as error:
+        return None, (error.strerror or type(error).__name__)[:100]
+    latency_ms = (time.monotonic() - started_at) * 1000
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return latency_ms, ''
+
+
+@sync_to_async
+def get_hosts_for_probe() -> set[tuple[str, int]]:
+    hosts = {
+        (server_ip, 9000)
+        for server_ip in Restaurant.objects.filter(
+            server_ip__isnull=False,
+            is_sync=True,
+        ).values_list('server_ip', flat=True)
+    }
+    hosts.update(
+        Server.objects.filter(
+            ip__isnull=False,
+            is_sync=True,
+        ).values_list('ip', 'web_server')
+    )
+    return hosts
+
+
+async def save_probe_results(
+        results: list[tuple[str, int, tuple[float | None, str]]],
+):
+    checked_at = timezone.now()
+    hosts_health = {
+        (health.host, health.port): health
+        async for health in HostHealth.objects.all()
+    }
+    probed_hosts = []
+    for host, port, (latency_ms, error) in results:
+        health = hosts_health.get((host, port)) or HostHealth(
+            host=host,
+            port=port,
+        )
+        update_host_health(health, latency_ms, error, checked_at)
+        probed_hosts.append(health)
+    await HostHealth.objects.abulk_create(
+        probed_hosts,
+        update_conflicts=True,
+        unique_fields=['host', 'port'],
+        update_fields=[
+            'last_checked_at',
+            'last_seen_at',
+            'latency_ms',
+            'consecutive_failures',
+            'last_error',
+        ],
+    )
+    logger.info('Доступность серверов сохранена')
+
+
+def update_host_health(
+        health: HostHealth,
+        latency_ms: float | None,
+        error: str,
+        checked_at: datetime | None = None,
+):
+    health.last_checked_at = checked_at or timezone.now()
+    if latency_ms is None:
+        health.consecutive_failures += 1
+        health.last_error = error
+        return
+    health.last_seen_at = health.last_checked_at
+    health.consecutive_failures = 0
+    health.last_error = ''
+    if health.latency_ms is None:
+        health.latency_ms = latency_ms
+        return
+    health.latency_ms += LATENCY_SMOOTHING * (latency_ms - health.latency_ms)
+
+
+def get_unreachable_filter() -> Q:
+    """Недоступные подряд SYNC_DEAD_HOST_FAILURES проверок.
+    Устаревшие данные не учитываем, если проверка не запускалась
+    """
+    checked_after = timezone.now() - timedelta(
+        seconds=settings.SYNC_PROBE_INTERVAL * 3,
+    )
+    return Q(
+        consecutive_failures__gte=settings.SYNC_DEAD_HOST_FAILURES,
+        last_checked_at__gte=checked_after,
+    )
+
+
+async def get_unreachable_hosts(
+        targets: list[SyncTarget],
+) -> set[tuple[str, int]]:
+    if not settings.SYNC_PROBE_INTERVAL or not targets:
+        return set()
+    unreachable_hosts = HostHealth.objects.filter(
+        get_unreachable_filter(),
+        host__in={target.host for target in targets},
+    ).values_list('host', 'port')
+    unreachable_hosts = set(await sync_to_async(list)(unreachable_hosts))
+    logger.info('Известно недоступных серверов: %s', len(unreachable_hosts))
+    return unreachable_hosts
+
+
+def get_unreachable_status(target: SyncTarget) -> SyncStatus:
+    return SyncStatus(
+        server_name=target.server_name,
+        web_link=target.web_link,
+        status='error',
+        msg='Сервер недоступен по данным проверки доступности',
+        error_class='HostUnreachable',
+    )
+
+
+def update_sync_time(health: HostHealth, sample_ms: float):
+    """Сглаженное время синхронизации и его разброс, как RTT в RFC 6298"""
+    if health.sync_time_ms is None:
+        health.sync_time_ms = sample_ms
+        health.sync_time_var_ms = sample_ms / 2
+        return
+    health.sync_time_var_ms += SYNC_TIME_VAR_SMOOTHING * (
+        abs(health.sync_time_ms - sample_ms) - health.sync_time_var_ms
+    )
+    health.sync_time_ms += SYNC_TIME_SMOOTHING * (
+        sample_ms - health.sync_time_ms
+    )
+
+
+def get_sync_timeout(health: HostHealth | None) -> aiohttp.ClientTimeout:
+    """Таймауты сервера по истории синхронизаций и проверок доступности.
+    Без истории ответов используем SYNC_TIMEOUT, результат ограничен
+    SYNC_TIMEOUT_MIN и SYNC_TIMEOUT_MAX
+    """
+    read_timeout = settings.SYNC_TIMEOUT
+    if health and health.sync_time_ms is not None:
+        read_timeout = (
+            health.sync_time_ms + 4 * health.sync_time_var_ms
+        ) / 1000
+    read_timeout = clamp(
+        read_timeout,
+        settings.SYNC_TIMEOUT_MIN,
+        settings.SYNC_TIMEOUT_MAX,
+    )
+    connect_timeout = read_timeout
+    if health and health.latency_ms is not None:
+        connect_timeout = clamp(
+            4 * health.latency_ms / 1000,
+            settings.SYNC_CONNECT_TIMEOUT_MIN,
+            read_timeout,
+        )
+    return aiohttp.ClientTimeout(
+        total=min(read_timeout + connect_timeout, settings.SYNC_TIMEOUT_MAX),
+        sock_connect=connect_timeout,
+        sock_read=read_timeout,
+    )
+
+
+def backoff_sync_timeout(
+        timeout: aiohttp.ClientTimeout | None,
+) -> aiohttp.ClientTimeout:
+    """Удваиваем таймауты для повтора после таймаута"""
+    timeout = timeout or aiohttp.ClientTimeout(total=settings.SYNC_TIMEOUT)
+    return aiohttp.ClientTimeout(
+        total=min(timeout.total * 2, settings.SYNC_TIMEOUT_MAX),
+        sock_connect=timeout.sock_connect,
+        sock_read=timeout.sock_read and min(
+            timeout.sock_read * 2,
+            settings.SYNC_TIMEOUT_MAX,
+        ),
+    )
+
+
+def clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(value, high))
+
+
+async def get_host_timeouts(
+        targets: list[SyncTarget],
+) -> dict[tuple[str, int], aiohttp.ClientTimeout]:
+    if not targets:
+        return {}
+    hosts_health = {
+        (health.host, health.port): health
+        async for health in HostHealth.objects.filter(
+            host__in={target.host for target in targets},
+        )
+    }
+    return {
+        (target.host, target.port): get_sync_timeout(
+            hosts_health.get((target.host, target.port)),
+        )
+        for target in targets
+    }
+
+
+async def save_sync_times(sync_times: dict[tuple[str, int], list[float]]):
+    """Время синхронизации серверов в мс из SyncEngine.sync_times"""
+    if not sync_times:
+        return
+    hosts_health = {
+        (health.host, health.port): health
+        async for health in HostHealth.objects.filter(
+            host__in={host for host, _ in sync_times},
+        )
+    }
+    synced_hosts = []
+    for (host, port), samples in sync_times.items():
+        health = hosts_health.get((host, port)) or HostHealth(
+            host=host,
+            port=port,
+        )
+        for sample_ms in samples:
+            update_sync_time(health, sample_ms)
+        synced_hosts.append(health)
+    await HostHealth.objects.abulk_create(
+        synced_hosts,
+        update_conflicts=True,
+        unique_fields=['host', 'port'],
+        update_fields=['sync_time_ms', 'sync_time_var_ms'],
+    )
+    logger.info(
+        'Время синхронизации сохранено для %s серверов',
+        len(synced_hosts),
+    )
@@ -0,0 +1,74 @@
+import logging
+
+from aiogram import html
+from aiogram import types
+from aiogram import Router
+from aiogram.filters import Command
+
+from asgiref.sync import sync_to_async
+
+from django.utils import timezone
+from django.utils.dateformat import format
+
+from src.models import HostHealth
+from src.bot.handlers.synchronizations.health import get_unreachable_filter
+
+logger = logging.getLogger('support_bot')
+router = Router(name='hosts_health_handlers')
+
+UNREACHABLE_HOSTS_LIMIT = 20
+
+
+@router.message(Command('hosts_health'))
+async def cmd_hosts_health(message: types.Message):
+    logger.info(
+        'Запрос доступности серверов от %s',
+        message.from_user.full_name,
+    )
+    # строки без проверки созданы по времени синхронизации
+    probed_hosts = HostHealth.objects.filter(
+        last_checked_at__isnull=False,
+    )
+    total = await probed_hosts.acount()
+    if not total:
+        await message.answer('Проверка доступности серверов еще не запускалась')
+        return
+
+    unreachable_hosts = HostHealth.objects.filter(
+        get_unreachable_filter(),
+    ).order_by('-consecutive_failures')
+    unreachable_count = await unreachable_hosts.acount()
+    unreachable_hosts = await sync_to_async(list)(
+        unreachable_hosts[:UNREACHABLE_HOSTS_LIMIT],
+    )
+    last_check = await probed_hosts.order_by('-last_checked_at').afirst()
+    last_checked_at = format(
+        timezone.localtime(last_check.last_checked_at),
+        'd-m-Y H:i:s',
+    )
+
+    message_for_send = [
+        'Доступность серверов для синхронизации\n',
+        f'Последняя проверка: {html.code(last_checked_at)}',
+        f'Всего серверов: {html.code(total)}',
+        f'Доступно: {html.code(total - unreachable_count)}',
+        f'Недоступно: {html.code(unreachable_count)}\n',
+    ]
+    for health in unreachable_hosts:
+        last_seen_at = 'никогда'
+        if health.last_seen_at:
+            last_seen_at = format(
+                timezone.localtime(health.last_seen_at),
+                'd-m-Y H:i',
+            )
+        message_for_send.append(
+            f'{html.code(health)} - проверок подряд: '
+            f'{health.consecutive_failures}, '
+            f'был доступен: {last_seen_at}, '
+            f'{html.quote(health.last_error)}'
+        )
+    if unreachable_count > len(unreachable_hosts):
+        message_for_send.append(
+            f'... и еще {unreachable_count - len(unreachable_hosts)}',
+        )
+    await message.answer('\n'.join(message_for_send))
@@ -0,0 +1,225 @@
+import json
+import asyncio
+import logging
+
+from dataclasses import asdict
+from collections import defaultdict
+
+from redis import asyncio as aioredis
+
+from django.conf import settings
+
+from src.bot.scheme import SyncJob
+
+logger = logging.getLogger('support_bot')
+
+
+class MemorySyncQueue:
+    """Очередь задач синхронизации в памяти процесса бота"""
+    is_local = True
+
+    def __init__(self):
+        self._jobs = asyncio.Queue()
+        self._shards = asyncio.Queue()
+        self._shard_messages = defaultdict(asyncio.Queue)
+        self._cancelled = set()
+
+    async def put(self, job: SyncJob):
+        logger.info('Задача синхронизации %s поставлена в очередь', job.id)
+        await self._jobs.put(job)
+
+    async def get(self, timeout: float | None = None) -> SyncJob | None:
+        try:
+            return await asyncio.wait_for(self._jobs.get(), timeout)
+        except asyncio.TimeoutError:
+            return
+
+    async def ack(self, job: SyncJob):
+        if job.parent_id:
+            self._shards.task_done()
+            return
+        self._jobs.task_done()
+
+    async def requeue_unfinished(self):
+        pass
+
+    async def put_shard(self, job: SyncJob):
+        await self._shards.put(job)
+
+    async def get_shard(self) -> SyncJob | None:
+        try:
+            return self._shards.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+    async def put_shard_message(self, run_id: str, message: dict):
+        await self._shard_messages[run_id].put(message)
+
+    async def get_shard_message(
+            self,
+            run_id: str,
+            timeout: float | None = None,
+    ) -> dict | None:
+        try:
+            return await asyncio.wait_for(
+                self._shard_messages[run_id].get(),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            return
+
+    async def drop_shard_messages(self, run_id: str):
+        self._shard_messages.pop(run_id, None)
+
+    async def cancel(self, job_id: str):
+        logger.info('Запрошена отмена синхронизации %s', job_id)
+        self._cancelled.add(job_id)
+
+    async def is_cancelled(self, job_id: str) -> bool:
+        return job_id in self._cancelled
+
+    async def close(self):
+        pass
+
+
+class RedisSyncQueue:
+    """Очередь задач синхронизации в Redis.
+    Задача, которую взял воркер, лежит в его списке processing до ack,
+    после перезапуска воркера она возвращается в очередь.
+    Шарды запуска идут отдельной очередью, результаты шардов
+    передаются координатору запуска списком sync:shards:{run_id}
+    """
+    is_local = False
+    jobs_key = 'sync:jobs'
+    processing_key = 'sync:jobs:processing'
+    shards_key = 'sync:shards'
+    shards_processing_key = 'sync:shards:processing'
+    shard_messages_key = 'sync:shards:{run_id}'
+    cancel_key = 'sync:jobs:cancel:{job_id}'
+    cancel_ttl = 24 * 60 * 60
+
+    def __init__(self, host: str, port: int, worker_name: str = ''):
+        """worker_name разделяет списки processing процессов воркеров"""
+        self.redis = aioredis.Redis(host=host, port=port)
+        if worker_name:
+            self.processing_key = f'{self.processing_key}:{worker_name}'
+            self.shards_processing_key = (
+                f'{self.shards_processing_key}:{worker_name}'
+            )
+        self._processing = {}
+
+    async def put(self, job: SyncJob):
+        logger.info('Задача синхронизации %s поставлена в очередь', job.id)
+        await self.redis.lpush(self.jobs_key, self._dumps(job))
+
+    async def get(self, timeout: float | None = None) -> SyncJob | None:
+        raw_job = await self.redis.blmove(
+            self.jobs_key,
+            self.processing_key,
+            timeout or 0,
+            'RIGHT',
+            'LEFT',
+        )
+        if raw_job is None:
+            return
+        job = SyncJob(**json.loads(raw_job))
+        self._processing[job.id] = raw_job
+        return job
+
+    async def ack(self, job: SyncJob):
+        raw_job = self._processing.pop(job.id, None)
+        if raw_job is None:
+            # задачу взял другой процесс или она вернулась в очередь
+            logger.warning('Задачи %s нет среди полученных', job.id)
+            return
+        processing_key = self.processing_key
+        if job.parent_id:
+            processing_key = self.shards_processing_key
+        await self.redis.lrem(processing_key, 1, raw_job)
+
+    async def requeue_unfinished(self):
+        for processing_key, jobs_key in (
+                (self.processing_key, self.jobs_key),
+                (self.shards_processing_key, self.shards_key),
+        ):
+            while await self.redis.lmove(
+                processing_key,
+                jobs_key,
+                'RIGHT',
+                'RIGHT',
+            ):
+                logger.warning('Вернул в очередь незавершенную синхронизацию')
+
+    async def put_shard(self, job: SyncJob):
+        await self.redis.lpush(self.shards_key, self._dumps(job))
+
+    async def get_shard(self) -> SyncJob | None:
+        raw_job = await self.redis.lmove(
+            self.shards_key,
+            self.shards_processing_key,
+            'RIGHT',
+            'LEFT',
+        )
+        if raw_job is None:
+            return
+        job = SyncJob(**json.loads(raw_job))
+        self._processing[job.id] = raw_job
+        return job
+
+    async def put_shard_message(self, run_id: str, message: dict):
+        messages_key = self.shard_messages_key.format(run_id=run_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(messages_key, json.dumps(message))
+            pipe.expire(messages_key, self.cancel_ttl)
+            await pipe.execute()
+
+    async def get_shard_message(
+            self,
+            run_id: str,
+            timeout: float | None = None,
+    ) -> dict | None:
+        raw_message = await self.redis.blpop(
+            self.shard_messages_key.format(run_id=run_id),
+            timeout or 0,
+        )
+        if raw_message is None:
+            return
+        return json.loads(raw_message[1])
+
+    async def drop_shard_messages(self, run_id: str):
+        await self.redis.delete(self.shard_messages_key.format(run_id=run_id))
+
+    async def cancel(self, job_id: str):
+        logger.info('Запрошена отмена синхронизации %s', job_id)
+        await self.redis.set(
+            self.cancel_key.format(job_id=job_id),
+            1,
+            ex=self.cancel_ttl,
+        )
+
+    async def is_cancelled(self, job_id: str) -> bool:
+        return bool(
+            await self.redis.exists(self.cancel_key.format(job_id=job_id)),
+        )
+
+    async def close(self):
+        await self.redis.aclose()
+
+    @staticmethod
+    def _dumps(job: SyncJob) -> str:
+        return json.dumps(asdict(job))
+
+
+_sync_queue: MemorySyncQueue | RedisSyncQueue | None = None
+
+
+def get_sync_queue() -> MemorySyncQueue | RedisSyncQueue:
+    global _sync_queue
+    if _sync_queue is None:
+        _sync_queue = MemorySyncQueue()
+        if settings.REDIS_HOST:
+            _sync_queue = RedisSyncQueue(
+                settings.REDIS_HOST,
+                settings.REDIS_PORT,
+            )
+    return _sync_queue
@@ -0,0 +1,92 @@
+import time
+import logging
+
+from datetime import timedelta
+
+from aiogram import Bot
+from aiogram import html
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from django.conf import settings
+
+from src.bot.scheme import SyncStatus
+
+logger = logging.getLogger('support_bot')
+
+
+class SyncProgress:
+    """Прогресс синхронизации в сообщении телеграм.
+    Сообщение редактируется не чаще чем раз в SYNC_PROGRESS_INTERVAL секунд
+    """
+
+    def __init__(
+            self,
+            bot: Bot,
+            chat_id: int,
+            message_id: int,
+            title: str,
+            total: int,
+            interval: float | None = None,
+            reply_markup: InlineKeyboardMarkup | None = None,
+    ):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.title = title
+        self.total = total
+        self.interval = interval or settings.SYNC_PROGRESS_INTERVAL
+        self.reply_markup = reply_markup
+        self.done = 0
+        self.ok = 0
+        self.errors = 0
+        self.started_at = time.monotonic()
+        self._next_edit_at = self.started_at + self.interval
+
+    async def update(self, sync_status: SyncStatus):
+        self.done += 1
+        if sync_status.status == 'ok':
+            self.ok += 1
+        else:
+            self.errors += 1
+
+        now = time.monotonic()
+        if now < self._next_edit_at or self.done == self.total:
+            return
+        self._next_edit_at = now + self.interval
+        await self._edit_message()
+
+    @property
+    def eta(self) -> timedelta | None:
+        if not self.done:
+            return
+        elapsed = time.monotonic() - self.started_at
+        left = elapsed / self.done * (self.total - self.done)
+        return timedelta(seconds=round(left))
+
+    def as_text(self) -> str:
+        text = f'{self.title}\n\n'
+        text += f'Готово: {html.code(f"{self.done}/{self.total}")}\n'
+        text += f'Успешно: {html.code(self.ok)}\n'
+        text += f'Ошибок: {html.code(self.errors)}\n'
+        if self.eta is not None:
+            text += f'Осталось примерно: {html.code(self.eta)}'
+        return text
+
+    async def _edit_message(self):
+        try:
+            await self.bot.edit_message_text(
+                self.as_text(),
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                reply_markup=self.reply_markup,
+            )
+        except TelegramRetryAfter as error:
+            logger.warning(
+                'Телеграм ограничил редактирование на %s c',
+                error.retry_after,
+            )
+            self._next_edit_at = time.monotonic() + error.retry_after
+        except TelegramBadRequest as error:
+            logger.debug('Не смог обновить прогресс: %s', error.message)
@@ -0,0 +1,77 @@
+import time
+import random
+import logging
+
+from dataclasses import field
+from dataclasses import dataclass
+
+from django.conf import settings
+
+from src.bot.scheme import SyncStatus
+
+logger = logging.getLogger('support_bot')
+
+RETRYABLE_ERRORS = (
+    'TimeoutError',
+    'ServerTimeoutError',
+    'ServerDisconnectedError',
+    'ClientConnectorError',
+    'ClientOSError',
+)
+RETRYABLE_HTTP_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class RetryPolicy:
+    """Повтор синхронизации сервера при временных ошибках.
+    Задержка растет экспоненциально со случайным разбросом,
+    повторы прекращаются после deadline секунд от старта запуска
+    """
+    attempts: int = field(
+        default_factory=lambda: settings.SYNC_RETRY_ATTEMPTS,
+    )
+    base_delay: float = field(
+        default_factory=lambda: settings.SYNC_RETRY_BASE_DELAY,
+    )
+    max_delay: float = field(
+        default_factory=lambda: settings.SYNC_RETRY_MAX_DELAY,
+    )
+    deadline: float = field(
+        default_factory=lambda: settings.SYNC_RUN_DEADLINE,
+    )
+    deadline_at: float = 0.0
+
+    def start(self, spread: float = 0.0):
+        """spread - на сколько секунд растянут старт синхронизаций"""
+        self.deadline_at = time.monotonic() + spread + self.deadline
+
+    def retry_delay(
+            self,
+            sync_status: SyncStatus,
+            attempt: int,
+    ) -> float | None:
+        """Задержка перед следующей попыткой или None если не повторяем"""
+        if sync_status.status == 'ok' or attempt >= self.attempts:
+            return
+        if not is_retryable(sync_status):
+            logger.debug(
+                'Ошибку %s на %s не повторяем',
+                sync_status.error_class,
+                sync_status.server_name,
+            )
+            return
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        if self.deadline_at and time.monotonic() + delay > self.deadline_at:
+            logger.debug('Нет времени на повтор для %s', sync_status.server_name)
+            return
+        return delay
+
+
+def is_retryable(sync_status: SyncStatus) -> bool:
+    if sync_status.error_class in RETRYABLE_ERRORS:
+        return True
+    return (
+        sync_status.error_class == 'ClientResponseError'
+        and sync_status.http_status in RETRYABLE_HTTP_STATUSES
+    )
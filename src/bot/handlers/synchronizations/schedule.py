@@ -0,0 +1,67 @@
+import time
+import logging
+
+from django.utils import timezone
+
+from src.models import SyncSchedule
+from src.bot.scheme import SyncJob
+from src.entities.MassSyncLock import MassSyncHolder
+from src.entities.MassSyncLock import MASS_SYNC_CHOICES
+from src.entities.MassSyncLock import get_mass_sync_lock
+from src.bot.handlers.synchronizations.jobs import get_sync_queue
+from src.bot.handlers.synchronizations.worker import get_sync_service_user
+
+logger = logging.getLogger('support_bot')
+
+
+async def run_sync_schedule(schedule_id: int):
+    """Запуск синхронизации по расписанию из задачи шедулера.
+    Задача ставится в общую очередь синхронизаций: растянутый на окно
+    запуск можно отменить, воркер дожидается его при остановке,
+    а после падения воркера задача возвращается в очередь
+    """
+    try:
+        schedule = await SyncSchedule.objects.select_related(
+            'franchise',
+        ).aget(id=schedule_id)
+    except SyncSchedule.DoesNotExist:
+        logger.warning('Расписания синхронизации %s нет в БД', schedule_id)
+        return
+    if not schedule.is_active:
+        logger.info('Расписание синхронизации %s отключено', schedule)
+        return
+
+    logger.info('Синхронизация по расписанию %s', schedule)
+    employee = await get_sync_service_user()
+    job = SyncJob(
+        employee_id=employee.id,
+        server_type=schedule.server_type,
+        user_choice=schedule.user_choice,
+        changed_only=schedule.changed_only,
+        spread=schedule.window_seconds,
+    )
+    if job.user_choice in MASS_SYNC_CHOICES:
+        current_holder = await get_mass_sync_lock().acquire(
+            MassSyncHolder(
+                job_id=job.id,
+                employee_name=employee.name,
+                started_at=time.time(),
+            ),
+        )
+        if current_holder is not None:
+            logger.warning(
+                'Пропускаю синхронизацию по расписанию %s: идет массовая '
+                'синхронизация %s',
+                schedule,
+                current_holder.job_id,
+            )
+            return
+    await SyncSchedule.objects.filter(id=schedule.id).aupdate(
+        last_run_at=timezone.now(),
+    )
+    await get_sync_queue().put(job)
+    logger.info(
+        'Синхронизация по расписанию %s поставлена в очередь: %s',
+        schedule,
+        job.id,
+    )
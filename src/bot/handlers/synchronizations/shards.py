@@ -0,0 +1,74 @@
+import zlib
+import logging
+
+from dataclasses import replace
+
+from django.conf import settings
+
+from src.bot.scheme import SyncJob
+from src.bot.scheme import SyncTarget
+
+logger = logging.getLogger('support_bot')
+
+
+def get_shard_count(targets_count: int) -> int:
+    if settings.SYNC_SHARDS < 2:
+        return 1
+    if targets_count < settings.SYNC_SHARD_MIN_TARGETS:
+        return 1
+    return settings.SYNC_SHARDS
+
+
+def get_shard_index(key: str, shard_count: int) -> int:
+    """crc32, а не hash(): шард сервера одинаков во всех процессах"""
+    return zlib.crc32(key.encode()) % shard_count
+
+
+def get_shard_key(target: SyncTarget, server_type: str) -> str:
+    """С транзитами франшиза целиком в одном шарде: рестораны ждут
+    ее транзиты. Иначе по ip: лимит на хост соблюдается в одном процессе
+    """
+    if server_type == 'All':
+        return f'franchise_{target.franchise_id}'
+    return target.host
+
+
+def select_shard(targets: list[SyncTarget], job: SyncJob) -> list[SyncTarget]:
+    return [
+        target for target in targets
+        if get_shard_index(
+            get_shard_key(target, job.server_type),
+            job.shard_count,
+        ) == job.shard_index
+    ]
+
+
+def make_shard_jobs(
+        job: SyncJob,
+        report_id: int,
+        shard_count: int,
+        targets: list[SyncTarget],
+) -> list[SyncJob]:
+    shard_jobs = [
+        replace(
+            job,
+            id=f'{job.id}_{shard_index}',
+            parent_id=job.id,
+            report_id=report_id,
+            shard_index=shard_index,
+            shard_count=shard_count,
+            chat_id=None,
+            message_id=None,
+        )
+        for shard_index in range(shard_count)
+    ]
+    for shard_job in shard_jobs:
+        shard_job.targets = select_shard(targets, shard_job)
+    return shard_jobs
+
+
+def get_shards_run_status(shard_statuses: list[str]) -> str:
+    for status in ('interrupted', 'cancelled'):
+        if status in shard_statuses:
+            return status
+    return 'completed'
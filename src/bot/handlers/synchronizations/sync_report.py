@@ -1,36 +1,130 @@
 import json
 import logging
-import dataclasses
+
+from functools import partial
+from dataclasses import asdict
 
 from aiogram import F
 from aiogram import Router
 from aiogram import html
 from aiogram import types
 
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
 from src.models import CustomUser
 from src.models import SyncReport
+from src.models import SyncResult
 from src.models import ServerType
 from src.bot.scheme import SyncStatus
+from src.entities.ReportCache import get_report_cache
+from src.entities.SyncPhaseStats import SyncPhaseStats
+from src.entities.SyncReportDiff import SyncReportDiff
 
 logger = logging.getLogger('support_bot')
 router = Router(name='report_handlers')
 
+# поля записи отчета как до SyncResult, не меняем для старых потребителей
+REPORT_ITEM_FIELDS = (
+    'server_name',
+    'web_link',
+    'status',
+    'msg',
+)
+REPORT_DETAIL_FIELDS = (
+    'attempts',
+    'error_class',
+    'http_status',
+    'timings',
+)
+REPORT_KEYS = {
+    'ok': 'completed',
+    'error': 'errors',
+}
+DIFF_SERVERS_LIMIT = 10
+DIFF_MSG_LENGTH = 80
+
 
 @router.callback_query(F.data.startswith('report_'))
 async def send_report(query: types.CallbackQuery):
-    report_id = query.data.split('_')[1]
+    report_id = int(query.data.split('_')[1])
     logger.debug('report_id: %s', report_id)
-    report_as_doc = await prepare_report_as_file(int(report_id))
     await query.answer()
-    await query.message.answer_document(
-        report_as_doc,
+    report_cache = get_report_cache()
+    cache_key = f'sync_report_{report_id}'
+    if not report_cache.has(cache_key):
+        # отчет идущей синхронизации еще меняется
+        if await SyncReport.objects.filter(
+            id=report_id,
+            status='running',
+        ).aexists():
+            cache_key = None
+    await report_cache.answer_document(
+        query.message,
+        partial(prepare_report_as_file, report_id),
         caption='Отчет по синхронизации',
+        key=cache_key,
+    )
+
+
+@router.callback_query(F.data.startswith('sync_diff_'))
+async def send_report_diff(query: types.CallbackQuery):
+    report_id = int(query.data.removeprefix('sync_diff_'))
+    logger.debug('Сравнение отчета %s с предыдущим', report_id)
+    sync_report = await SyncReport.objects.aget(id=report_id)
+    report_diff = await sync_to_async(SyncReportDiff.for_report)(sync_report)
+    await query.answer()
+    await query.message.answer(format_report_diff(report_diff))
+
+
+def format_report_diff(report_diff: SyncReportDiff) -> str:
+    if report_diff.previous_report_id is None:
+        return 'Нет предыдущей синхронизации для сравнения'
+    changed_errors = report_diff.changed_errors
+    message_for_send = [
+        f'Сравнение с синхронизацией '
+        f'{html.code(report_diff.previous_report_id)}\n',
+        f'Новые ошибки: {html.code(len(report_diff.new_errors))}',
+    ]
+    message_for_send += format_diff_servers(report_diff.new_errors)
+    message_for_send.append(
+        f'\nВосстановились: {html.code(len(report_diff.recovered))}',
     )
+    message_for_send += format_diff_servers(report_diff.recovered)
+    message_for_send.append(
+        f'\nОшибки остались: {html.code(len(report_diff.still_failing))}, '
+        f'изменился текст: {html.code(len(changed_errors))}',
+    )
+    message_for_send += format_diff_servers(changed_errors, True)
+    return '\n'.join(message_for_send)
+
+
+def format_diff_servers(
+        servers: list[dict],
+        with_prev_msg: bool = False,
+) -> list[str]:
+    lines = []
+    for server in servers[:DIFF_SERVERS_LIMIT]:
+        line = html.quote(server['server_name'])
+        if server.get('msg'):
+            msg = server['msg'][:DIFF_MSG_LENGTH]
+            if with_prev_msg:
+                msg = f'{server["prev_msg"][:DIFF_MSG_LENGTH]} → {msg}'
+            line += f' - {html.quote(msg)}'
+        lines.append(line)
+    if len(servers) > DIFF_SERVERS_LIMIT:
+        lines.append(f'... и еще {len(servers) - DIFF_SERVERS_LIMIT}')
+    return lines
 
 
 async def prepare_report_as_file(report_id: int) -> types.BufferedInputFile:
+    """Формат sync_report.json прежний: initiator, start_at, server_type
+    и report с errors и completed. Новые данные только в новых ключах
+    верхнего уровня: summary, skipped, details, changed_only и phases_ms
+    """
     logger.info('Подготовка отчета для отправки')
-    sync_report = await SyncReport.objects.select_related(
+    sync_report = await SyncReport.objects.with_result_counts().select_related(
         'new_employee', 'server_type'
     ).aget(id=report_id)
     final_report = {
@@ -41,15 +135,35 @@ async def prepare_report_as_file(report_id: int) -> types.BufferedInputFile:
             'errors': [],
             'completed': [],
         },
+        'summary': {
+            'errors': sync_report.errors,
+            'completed': sync_report.completed,
+            'skipped': sync_report.skipped,
+        },
+        'skipped': [],
+        'details': [],
+        'changed_only': sync_report.changed_only,
     }
+    phase_stats = await sync_to_async(SyncPhaseStats.for_report)(sync_report)
+    final_report['phases_ms'] = [
+        asdict(phase_stat) for phase_stat in phase_stats
+    ]
     logger.debug('final_report: %s', final_report)
-    logger.debug('sync_report.report: %s', sync_report.report)
 
-    for item in sync_report.report:
-        if item['status'] == 'error':
-            final_report['report']['errors'].append(item)
-        if item['status'] == 'ok':
-            final_report['report']['completed'].append(item)
+    sync_results = SyncResult.objects.filter(report_id=report_id) \
+        .order_by('id') \
+        .values(*REPORT_ITEM_FIELDS, *REPORT_DETAIL_FIELDS)
+    async for result in sync_results:
+        item = {field: result[field] for field in REPORT_ITEM_FIELDS}
+        if result['status'] == 'skipped':
+            final_report['skipped'].append(item)
+        else:
+            report_key = REPORT_KEYS.get(result['status'], 'errors')
+            final_report['report'][report_key].append(item)
+        final_report['details'].append({
+            'server_name': result['server_name'],
+            **{field: result[field] for field in REPORT_DETAIL_FIELDS},
+        })
 
     dumps = json.dumps(final_report, ensure_ascii=False, indent=4)
     file = dumps.encode('utf-8')
@@ -62,20 +176,62 @@ async def report_save_in_db(
         server_type_name: str,
         sync_statuses: list[SyncStatus],
         user_choice: str,
+        status: str = 'completed',
+        job_id: str = '',
+        changed_only: bool = False,
 ) -> SyncReport:
     logger.info('Сохраняю отчет о синхронизации в БД')
     server_type = await ServerType.objects.aget(name=server_type_name)
-    report = [dataclasses.asdict(st) for st in sync_statuses]
     sync_report = await SyncReport.objects.acreate(
         new_employee=employee,
         server_type=server_type,
-        report=report,
         user_choice=user_choice,
+        status=status,
+        job_id=job_id,
+        changed_only=changed_only,
     )
+    if sync_statuses:
+        results_writer = SyncResultWriter(sync_report)
+        for sync_status in sync_statuses:
+            await results_writer.add(sync_status)
+        await results_writer.flush()
     logger.info('Готово')
     return sync_report
 
 
+class SyncResultWriter:
+    """Запись результатов синхронизации пачками по мере их получения"""
+
+    def __init__(self, sync_report: SyncReport, batch_size: int | None = None):
+        self.sync_report = sync_report
+        self.batch_size = batch_size or settings.SYNC_RESULTS_BATCH_SIZE
+        self._results = []
+
+    async def add(self, sync_status: SyncStatus):
+        self._results.append(
+            SyncResult(
+                report=self.sync_report,
+                server_name=sync_status.server_name[:100],
+                web_link=sync_status.web_link[:150],
+                status=sync_status.status,
+                msg=sync_status.msg[:255],
+                attempts=sync_status.attempts,
+                error_class=sync_status.error_class[:50],
+                http_status=sync_status.http_status,
+                timings=sync_status.timings,
+            )
+        )
+        if len(self._results) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._results:
+            return
+        results, self._results = self._results, []
+        await SyncResult.objects.abulk_create(results)
+        logger.debug('Сохранил %s результатов синхронизации', len(results))
+
+
 async def create_sync_report(
         sync_statuses: list[SyncStatus]
 ) -> tuple[str, dict]:
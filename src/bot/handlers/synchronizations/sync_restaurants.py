@@ -1,7 +1,8 @@
-import asyncio
 import logging
 
-import aiohttp
+from typing import Any
+from typing import Callable
+from typing import Awaitable
 
 from aiogram import F
 from aiogram import Router
@@ -12,17 +13,15 @@ from aiogram.fsm.state import State
 from aiogram.fsm.state import StatesGroup
 from aiogram.fsm.context import FSMContext
 
-from asgiref.sync import sync_to_async
-from django.conf import settings
-
 from src.models import Employee
 from src.models import CustomUser
 from src.models import Restaurant
 from src.bot import keyboards
+from src.bot.scheme import SyncJob
 from src.bot.scheme import SyncStatus
-from src.bot.utils import sync_referents
-from src.bot.handlers.synchronizations.sync_report import report_save_in_db
-from src.bot.handlers.synchronizations.sync_report import create_sync_report
+from src.bot.handlers.synchronizations.engine import SyncEngine
+from src.bot.handlers.synchronizations.engine import restaurant_to_target
+from src.bot.handlers.synchronizations.jobs import get_sync_queue
 
 logger = logging.getLogger('support_bot')
 router = Router(name='sync_restaurants_handlers')
@@ -75,25 +74,18 @@ async def process_sync_rest_list(
         )
         return
 
-    restaurants = await sync_to_async(list)(
-        Restaurant.objects.filter(
-            server_ip__isnull=False,
-            code__in=restaurants,
-            is_sync=True,
-        )
+    queued_message = await message.answer(
+        'Поставил синхронизацию ресторанов по списку в очередь',
     )
-    logger.debug('Нашел рестораны: %s', restaurants)
-    sync_statuses = await start_synchronized_restaurants(restaurants)
-    message_for_send, _ = await create_sync_report(sync_statuses)
-    sync_report = await report_save_in_db(
-        employee,
-        'Report',
-        sync_statuses,
-        'rest_list',
-    )
-    await message.answer(
-        message_for_send,
-        reply_markup=await keyboards.get_report_keyboard(sync_report.id),
+    await get_sync_queue().put(
+        SyncJob(
+            employee_id=employee.id,
+            server_type='Report',
+            user_choice='rest_list',
+            chat_id=queued_message.chat.id,
+            message_id=queued_message.message_id,
+            restaurant_codes=restaurants,
+        )
     )
     await state.clear()
 
@@ -118,29 +110,18 @@ async def process_sync_rest_group(
     user_choice = query.data.split('_')[1]
     logger.debug('user_choice: %s', user_choice)
     await query.message.edit_text(
-        f'Запустил синхронизацию по ресторанам {user_choice.upper()}',
+        f'Поставил синхронизацию ресторанов {user_choice.upper()} в очередь',
         reply_markup=None,
     )
-    restaurants = await sync_to_async(list)(
-        Restaurant.objects.filter(
-            server_ip__isnull=False,
-            franchise__alias=user_choice,
-            is_sync=True,
+    await get_sync_queue().put(
+        SyncJob(
+            employee_id=employee.id,
+            server_type='Report',
+            user_choice=f'rest_group_{user_choice}',
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
         )
     )
-    logger.debug('Нашел рестораны: %s', restaurants)
-    sync_statuses = await start_synchronized_restaurants(restaurants)
-    message_for_send, _ = await create_sync_report(sync_statuses)
-    sync_report = await report_save_in_db(
-        employee,
-        'Report',
-        sync_statuses,
-        f'rest_group_{user_choice}',
-    )
-    await query.message.edit_text(
-        message_for_send,
-        reply_markup=await keyboards.get_report_keyboard(sync_report.id),
-    )
     await state.clear()
 
 
@@ -149,53 +130,83 @@ async def process_sync_rest_all(
         query: types.CallbackQuery,
         employee: CustomUser,
         state: FSMContext,
+        sync_job_id: str,
 ):
     await query.message.edit_text(
-        'Запустил синхронизацию по всем ресторанам',
+        'Поставил синхронизацию всех ресторанов в очередь',
         reply_markup=None,
     )
     logger.info('Выбраны все рестораны для синхронизации')
-    restaurants = await sync_to_async(list)(
-        Restaurant.objects.filter(
-            server_ip__isnull=False,
-            is_sync=True,
+    await get_sync_queue().put(
+        SyncJob(
+            id=sync_job_id,
+            employee_id=employee.id,
+            server_type='Report',
+            user_choice='rest_all',
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
         )
     )
-    sync_statuses = await start_synchronized_restaurants(restaurants)
-    message_for_send, _ = await create_sync_report(sync_statuses)
-    sync_report = await report_save_in_db(
-        employee,
-        'Report',
-        sync_statuses,
-        'rest_all',
+    await state.clear()
+
+
+@router.callback_query(SyncRestState.sync_choice, F.data == 'rest_changed')
+async def process_sync_rest_changed(
+        query: types.CallbackQuery,
+        employee: CustomUser,
+        state: FSMContext,
+        sync_job_id: str,
+):
+    await query.message.edit_text(
+        'Поставил синхронизацию изменившихся ресторанов в очередь',
+        reply_markup=None,
+    )
+    logger.info('Выбраны изменившиеся рестораны для синхронизации')
+    await get_sync_queue().put(
+        SyncJob(
+            id=sync_job_id,
+            employee_id=employee.id,
+            server_type='Report',
+            user_choice='rest_all',
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
+            changed_only=True,
+        )
     )
+    await state.clear()
+
+
+@router.callback_query(SyncRestState.sync_choice, F.data == 'rest_topology')
+async def process_sync_rest_topology(
+        query: types.CallbackQuery,
+        employee: CustomUser,
+        state: FSMContext,
+        sync_job_id: str,
+):
     await query.message.edit_text(
-        message_for_send,
-        reply_markup=await keyboards.get_report_keyboard(sync_report.id),
+        'Поставил синхронизацию транзитов и всех ресторанов в очередь',
+        reply_markup=None,
+    )
+    logger.info('Выбраны транзиты и все рестораны для синхронизации')
+    await get_sync_queue().put(
+        SyncJob(
+            id=sync_job_id,
+            employee_id=employee.id,
+            server_type='All',
+            user_choice='topology',
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
+        )
     )
     await state.clear()
 
 
 async def start_synchronized_restaurants(
-        restaurants: list[Restaurant]
+        restaurants: list[Restaurant],
+        on_result: Callable[[SyncStatus], Awaitable[Any]] | None = None,
 ) -> list[SyncStatus]:
     logger.info('Запуск синхронизации ресторанов')
-    conn = aiohttp.TCPConnector(ssl=settings.SSL_CONTEXT)
-    session_timeout = aiohttp.ClientTimeout(total=settings.SYNC_TIMEOUT)
-
-    async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=conn,
-            raise_for_status=True,
-            timeout=session_timeout,
-    ) as session:
-        tasks = []
-        for restaurant in restaurants:
-            rest_web_server_url = f'https://{restaurant.server_ip}:9000/'
-            task = asyncio.create_task(
-                sync_referents(session, rest_web_server_url, restaurant.name)
-            )
-            tasks.append(task)
-        sync_report = list(await asyncio.gather(*tasks))
-        logger.info('Синхронизация завершена')
+    targets = [restaurant_to_target(restaurant) for restaurant in restaurants]
+    sync_report = await SyncEngine().run(targets, on_result)
+    logger.info('Синхронизация завершена')
     return sync_report
@@ -1,9 +1,8 @@
-import asyncio
 import logging
 
-import aiohttp
-
-from aiohttp import ClientTimeout
+from typing import Any
+from typing import Callable
+from typing import Awaitable
 
 from aiogram import F
 from aiogram import Router
@@ -13,16 +12,16 @@ from aiogram.fsm.state import State
 from aiogram.fsm.state import StatesGroup
 from aiogram.fsm.context import FSMContext
 
-from django.conf import settings
 from asgiref.sync import sync_to_async
 
 from src.models import CustomUser
 from src.models import Server
 from src.bot import keyboards
+from src.bot.scheme import SyncJob
 from src.bot.scheme import SyncStatus
-from src.bot.utils import sync_referents
-from src.bot.handlers.synchronizations.sync_report import report_save_in_db
-from src.bot.handlers.synchronizations.sync_report import create_sync_report
+from src.bot.handlers.synchronizations.engine import SyncEngine
+from src.bot.handlers.synchronizations.engine import transit_to_target
+from src.bot.handlers.synchronizations.jobs import get_sync_queue
 
 logger = logging.getLogger('support_bot')
 router = Router(name='sync_transits_handlers')
@@ -53,56 +52,52 @@ async def process_start_sync_tr(
 ):
     logger.debug('query: %s', query)
     transits_group = query.data.split('_')[1]
-    sync_statuses = await start_synchronized_transits(transits_group)
-    message_for_send, _ = await create_sync_report(sync_statuses)
-    sync_report = await report_save_in_db(
-        employee,
-        'Transit',
-        sync_statuses,
-        transits_group,
+    changed_only = transits_group == 'changed'
+    if changed_only:
+        transits_group = 'all'
+    queued_text = f'Поставил синхронизацию транзитов {transits_group.upper()}'
+    if changed_only:
+        queued_text += ' (только изменившиеся)'
+    await query.answer()
+    await query.message.edit_text(
+        f'{queued_text} в очередь',
+        reply_markup=None,
     )
-    await query.message.delete()
-    await query.message.answer(
-        message_for_send,
-        reply_markup=await keyboards.get_report_keyboard(sync_report.id),
+    await get_sync_queue().put(
+        SyncJob(
+            employee_id=employee.id,
+            server_type='Transit',
+            user_choice=transits_group,
+            chat_id=query.message.chat.id,
+            message_id=query.message.message_id,
+            changed_only=changed_only,
+        )
     )
     await state.clear()
 
 
-async def start_synchronized_transits(transit_owner: str) -> list[SyncStatus]:
+async def start_synchronized_transits(
+        transit_owner: str,
+        on_result: Callable[[SyncStatus], Awaitable[Any]] | None = None,
+) -> list[SyncStatus]:
     logger.info('Запуск синхронизации транзитов %s', transit_owner)
-    conn = aiohttp.TCPConnector(ssl=settings.SSL_CONTEXT)
     transits = await get_transits_server_by_owner(transit_owner)
-
-    async with aiohttp.ClientSession(
-            trust_env=True,
-            connector=conn,
-            raise_for_status=True,
-            timeout=ClientTimeout(total=settings.SYNC_TIMEOUT)
-    ) as session:
-        tasks = []
-        for transit in transits:
-            tr_web_server_url = f'https://{transit.ip}:{transit.web_server}/'
-            task = asyncio.create_task(
-                sync_referents(session, tr_web_server_url, transit.name)
-            )
-            tasks.append(task)
-
-        sync_report = list(await asyncio.gather(*tasks))
-        logger.debug('sync_report: %s', sync_report)
+    targets = [transit_to_target(transit) for transit in transits]
+    sync_report = await SyncEngine().run(targets, on_result)
+    logger.debug('sync_report: %s', sync_report)
     return sync_report
 
 
 @sync_to_async
 def get_transits_server_by_owner(transit_owner: str) -> list[Server]:
     logger.info('Получаем список транзитов из базы по владельцу')
-    transits = Server.objects.filter(
+    transits = Server.objects.select_related('franchise_owner').filter(
         franchise_owner__alias=transit_owner,
         server_type__name='Transit',
         is_sync=True,
     )
     if transit_owner == 'all':
-        transits = Server.objects.filter(
+        transits = Server.objects.select_related('franchise_owner').filter(
             franchise_owner__alias__in=('yum', 'irb', 'fz'),
             server_type__name='Transit',
             is_sync=True,
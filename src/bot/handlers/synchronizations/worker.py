@@ -0,0 +1,614 @@
+import time
+import asyncio
+import logging
+
+from typing import Any
+from typing import Callable
+from typing import Awaitable
+from dataclasses import asdict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.utils import timezone
+from django.contrib.auth.hashers import make_password
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup
+
+from src.models import Server
+from src.models import CustomUser
+from src.models import Restaurant
+from src.models import SyncReport
+from src.bot import keyboards
+from src.entities.MassSyncLock import MASS_SYNC_CHOICES
+from src.entities.MassSyncLock import get_mass_sync_lock
+from src.bot.scheme import SyncJob
+from src.bot.scheme import SyncStatus
+from src.bot.scheme import SyncTarget
+from src.bot.handlers.synchronizations.jobs import MemorySyncQueue
+from src.bot.handlers.synchronizations.jobs import RedisSyncQueue
+from src.bot.handlers.synchronizations.engine import SyncEngine
+from src.bot.handlers.synchronizations.engine import server_to_target
+from src.bot.handlers.synchronizations.engine import get_topology_upstreams
+from src.bot.handlers.synchronizations.delta import save_last_sync
+from src.bot.handlers.synchronizations.delta import get_skipped_status
+from src.bot.handlers.synchronizations.delta import format_skipped_count
+from src.bot.handlers.synchronizations.delta import split_changed_servers
+from src.bot.handlers.synchronizations.health import save_sync_times
+from src.bot.handlers.synchronizations.health import get_host_timeouts
+from src.bot.handlers.synchronizations.health import get_unreachable_hosts
+from src.bot.handlers.synchronizations.shards import get_shard_count
+from src.bot.handlers.synchronizations.shards import make_shard_jobs
+from src.bot.handlers.synchronizations.shards import get_shards_run_status
+from src.bot.handlers.synchronizations.progress import SyncProgress
+from src.bot.handlers.synchronizations.sync_report import report_save_in_db
+from src.bot.handlers.synchronizations.sync_report import SyncResultWriter
+from src.bot.handlers.synchronizations.sync_report import create_sync_report
+from src.bot.handlers.synchronizations.sync_transits import \
+    get_transits_server_by_owner
+
+logger = logging.getLogger('support_bot')
+
+# tg_id обязателен и уникален, у пользователя синхронизаций без бота
+# id вне диапазона телеграма: не совпадет с сотрудником и tg_id=0
+SYNC_SERVICE_USER_TG_ID = 2 ** 63 - 1
+
+
+class SyncWorker:
+    """Выполнение задач синхронизации из очереди.
+    Запуск можно отменить через очередь по id задачи, при отмене
+    и остановке процесса полученные результаты сохраняются в отчет.
+    Большой запуск с Redis делится на шарды между воркерами.
+    Запуск с spread (по расписанию) идет все окно, поэтому выполняется
+    параллельно и не задерживает ручные синхронизации
+    """
+
+    def __init__(
+            self,
+            queue: MemorySyncQueue | RedisSyncQueue | None,
+            bot: Bot | None,
+    ):
+        self.queue = queue
+        self.bot = bot
+        self._current: asyncio.Task | None = None
+        self._spread_runs: set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def run_forever(self):
+        logger.info('Воркер синхронизации запущен')
+        await self.queue.requeue_unfinished()
+        while not self._stopping:
+            job = await self.queue.get_shard()
+            if job is None:
+                job = await self.queue.get(timeout=1)
+            if job is None:
+                continue
+            if self._stopping:
+                # без ack задача из Redis вернется в очередь при запуске
+                break
+            job_task = asyncio.create_task(self.run_job(job))
+            if job.spread:
+                self._spread_runs.add(job_task)
+                job_task.add_done_callback(self._spread_runs.discard)
+                continue
+            self._current = job_task
+            try:
+                await self._current
+            finally:
+                self._current = None
+
+    async def run_job(self, job: SyncJob):
+        try:
+            if not job.parent_id and await self.queue.is_cancelled(job.id):
+                logger.info('Синхронизацию %s отменили в очереди', job.id)
+                await finish_running_reports(job, 'cancelled')
+                await release_mass_sync(job)
+                await self.notify(job, '⛔ Синхронизация отменена')
+                return
+            await self.process(job)
+        except Exception as err:
+            logger.exception(err)
+            await self.notify(job, '😱 Синхронизация завершилась ошибкой')
+        finally:
+            await self.queue.ack(job)
+
+    async def stop(self, timeout: float | None = None):
+        """Ждем текущие синхронизации timeout секунд, затем прерываем"""
+        self._stopping = True
+        running = set(self._spread_runs)
+        if self._current is not None:
+            running.add(self._current)
+        if not running:
+            return
+        timeout = settings.SYNC_DRAIN_TIMEOUT if timeout is None else timeout
+        logger.info('Жду завершения синхронизации до %s c', timeout)
+        _, pending = await asyncio.wait(running, timeout=timeout)
+        for job_task in pending:
+            job_task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def process(
+            self,
+            job: SyncJob,
+            on_result: Callable[[SyncStatus], Awaitable[Any]] | None = None,
+    ) -> SyncReport:
+        """on_result вызывается для каждого результата, включая пропущенные"""
+        logger.info('Обработка задачи синхронизации %s', job)
+        if job.parent_id:
+            return await self.process_shard(job)
+        refresh_task = None
+        if job.user_choice in MASS_SYNC_CHOICES:
+            # запуск с spread длится все окно расписания, дольше TTL
+            refresh_task = asyncio.create_task(refresh_mass_sync(job))
+        try:
+            return await self.process_run(job, on_result)
+        finally:
+            if refresh_task:
+                refresh_task.cancel()
+            await release_mass_sync(job)
+
+    async def process_run(
+            self,
+            job: SyncJob,
+            on_result: Callable[[SyncStatus], Awaitable[Any]] | None = None,
+    ) -> SyncReport:
+        servers = await get_sync_servers(job)
+        skipped_servers = []
+        if job.changed_only:
+            servers, skipped_servers = split_changed_servers(servers)
+        targets = [server_to_target(server) for server in servers]
+        sync_report = await save_sync_job_report(job, [])
+        if job.user_choice in MASS_SYNC_CHOICES:
+            await get_mass_sync_lock().attach_report(job.id, sync_report.id)
+        progress = None
+        if job.chat_id and job.message_id:
+            progress = SyncProgress(
+                self.bot,
+                job.chat_id,
+                job.message_id,
+                get_sync_title(job),
+                len(targets),
+                reply_markup=await keyboards.get_sync_cancel_keyboard(job.id),
+            )
+            await self.notify(job, progress.as_text(), progress.reply_markup)
+
+        async def on_run_result(sync_status: SyncStatus):
+            if progress:
+                await progress.update(sync_status)
+            if on_result:
+                await on_result(sync_status)
+
+        shard_count = 1
+        if self.queue and not self.queue.is_local:
+            shard_count = get_shard_count(len(targets))
+        try:
+            if shard_count > 1:
+                status, sync_statuses = await self.run_shards(
+                    job,
+                    sync_report,
+                    targets,
+                    shard_count,
+                    on_run_result,
+                )
+            else:
+                status, sync_statuses = await self.run_targets(
+                    job,
+                    sync_report,
+                    targets,
+                    on_run_result,
+                )
+        except asyncio.CancelledError:
+            logger.warning('Синхронизация %s прервана', job.id)
+            await finish_sync_report(sync_report, 'interrupted')
+            raise
+
+        message_for_send = ''
+        skipped_statuses = [
+            get_skipped_status(server, server_to_target(server))
+            for server in skipped_servers
+        ]
+        if status == 'cancelled':
+            message_for_send = '⛔ Синхронизация отменена\n'
+            skipped_statuses = []
+        if status == 'interrupted':
+            message_for_send = '⚠️ Синхронизация прервана, отчет неполный\n'
+        results_writer = SyncResultWriter(sync_report)
+        for sync_status in skipped_statuses:
+            await results_writer.add(sync_status)
+            if on_result:
+                await on_result(sync_status)
+        await results_writer.flush()
+        await finish_sync_report(sync_report, status)
+        # пропущенные сервера не ошибки, в итоге они отдельной строкой
+        sync_report_message, _ = await create_sync_report(sync_statuses)
+        sync_report_message += format_skipped_count(skipped_statuses)
+        await self.notify(
+            job,
+            message_for_send + sync_report_message,
+            await keyboards.get_report_keyboard(sync_report.id),
+        )
+        return sync_report
+
+    async def process_shard(self, job: SyncJob) -> SyncReport:
+        """Шард запуска: цели приходят в задаче от координатора,
+        результаты пишутся в общий отчет и по одному передаются
+        координатору через очередь
+        """
+        targets = job.targets
+        sync_report = await SyncReport.objects.aget(id=job.report_id)
+
+        async def on_shard_result(sync_status: SyncStatus):
+            await self.queue.put_shard_message(
+                job.parent_id,
+                {'result': asdict(sync_status)},
+            )
+
+        status = 'interrupted'
+        try:
+            if await self.queue.is_cancelled(job.run_id):
+                status = 'cancelled'
+            else:
+                status, _ = await self.run_targets(
+                    job,
+                    sync_report,
+                    targets,
+                    on_shard_result,
+                )
+        finally:
+            await self.queue.put_shard_message(
+                job.parent_id,
+                {'shard': job.shard_index, 'status': status},
+            )
+        logger.info(
+            'Шард %s/%s синхронизации %s: %s, серверов %s',
+            job.shard_index + 1,
+            job.shard_count,
+            job.parent_id,
+            status,
+            len(targets),
+        )
+        return sync_report
+
+    async def run_targets(
+            self,
+            job: SyncJob,
+            sync_report: SyncReport,
+            targets: list[SyncTarget],
+            on_result: Callable[[SyncStatus], Awaitable[Any]],
+    ) -> tuple[str, list[SyncStatus]]:
+        """Синхронизация серверов в этом процессе с записью в отчет"""
+        upstreams = None
+        if job.server_type == 'All':
+            upstreams = get_topology_upstreams(targets)
+        results_writer = SyncResultWriter(sync_report)
+
+        async def on_engine_result(sync_status: SyncStatus):
+            await results_writer.add(sync_status)
+            await on_result(sync_status)
+
+        sync_engine = SyncEngine(
+            unreachable_hosts=await get_unreachable_hosts(targets),
+            host_timeouts=await get_host_timeouts(targets),
+            spread=job.spread,
+        )
+        try:
+            cancelled = await self.run_cancellable(
+                job,
+                sync_engine.run(targets, on_engine_result, upstreams),
+            )
+        except asyncio.CancelledError:
+            await save_run_results(targets, sync_engine, results_writer)
+            raise
+        sync_statuses = await save_run_results(
+            targets,
+            sync_engine,
+            results_writer,
+        )
+        if cancelled:
+            return 'cancelled', sync_statuses
+        return 'completed', sync_statuses
+
+    async def run_shards(
+            self,
+            job: SyncJob,
+            sync_report: SyncReport,
+            targets: list[SyncTarget],
+            shard_count: int,
+            on_result: Callable[[SyncStatus], Awaitable[Any]],
+    ) -> tuple[str, list[SyncStatus]]:
+        """Раздаем шарды воркерам через очередь и собираем результаты.
+        Пока шарды ждут в очереди, координатор выполняет их сам,
+        поэтому запуск не зависнет и при единственном воркере
+        """
+        logger.info(
+            'Синхронизация %s делится на %s шардов',
+            job.id,
+            shard_count,
+        )
+        for shard_job in make_shard_jobs(
+            job,
+            sync_report.id,
+            shard_count,
+            targets,
+        ):
+            await self.queue.put_shard(shard_job)
+        collected = asyncio.Event()
+        helper = asyncio.create_task(self.help_shards(collected))
+        try:
+            run_result = await self.collect_shards(
+                job,
+                shard_count,
+                on_result,
+            )
+        except BaseException:
+            helper.cancel()
+            await asyncio.gather(helper, return_exceptions=True)
+            raise
+        finally:
+            await self.queue.drop_shard_messages(job.id)
+        collected.set()
+        # шард другого запуска, если координатор его взял, доводим до конца
+        await helper
+        return run_result
+
+    async def help_shards(self, collected: asyncio.Event):
+        while not collected.is_set():
+            shard_job = await self.queue.get_shard()
+            if shard_job is not None:
+                await self.run_job(shard_job)
+                continue
+            try:
+                await asyncio.wait_for(collected.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+
+    async def collect_shards(
+            self,
+            job: SyncJob,
+            shard_count: int,
+            on_result: Callable[[SyncStatus], Awaitable[Any]],
+    ) -> tuple[str, list[SyncStatus]]:
+        sync_statuses = []
+        shard_statuses = {}
+        last_message_at = time.monotonic()
+        # пока не вышло окно spread, паузы между стартами серверов
+        # бывают дольше SYNC_SHARD_IDLE_TIMEOUT и простоем не считаются
+        offsets_end_at = last_message_at + job.spread
+        while len(shard_statuses) < shard_count:
+            message = await self.queue.get_shard_message(job.id, timeout=1)
+            if message is None:
+                idle = time.monotonic() - max(last_message_at, offsets_end_at)
+                if idle > settings.SYNC_SHARD_IDLE_TIMEOUT:
+                    logger.error(
+                        'Шарды синхронизации %s не отвечают %.0f c, '
+                        'завершено %s из %s',
+                        job.id,
+                        idle,
+                        len(shard_statuses),
+                        shard_count,
+                    )
+                    return 'interrupted', sync_statuses
+                continue
+            last_message_at = time.monotonic()
+            if 'shard' in message:
+                shard_statuses[message['shard']] = message['status']
+                continue
+            sync_status = SyncStatus(**message['result'])
+            sync_statuses.append(sync_status)
+            await on_result(sync_status)
+        return (
+            get_shards_run_status(list(shard_statuses.values())),
+            sync_statuses,
+        )
+
+    async def run_cancellable(self, job: SyncJob, sync_run: Awaitable) -> bool:
+        """Выполняем запуск до конца или до отмены, True если отменили"""
+        if self.queue is None:
+            await sync_run
+            return False
+        sync_task = asyncio.ensure_future(sync_run)
+        cancel_watcher = asyncio.create_task(self.wait_cancel(job))
+        try:
+            await asyncio.wait(
+                {sync_task, cancel_watcher},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            cancel_watcher.cancel()
+            if not sync_task.done():
+                sync_task.cancel()
+                await asyncio.gather(sync_task, return_exceptions=True)
+        if sync_task.cancelled():
+            logger.info('Синхронизация %s отменена', job.id)
+            return True
+        sync_task.result()
+        return False
+
+    async def wait_cancel(self, job: SyncJob):
+        while not await self.queue.is_cancelled(job.run_id):
+            await asyncio.sleep(settings.SYNC_CANCEL_CHECK_INTERVAL)
+
+    async def notify(
+            self,
+            job: SyncJob,
+            text: str,
+            reply_markup: InlineKeyboardMarkup | None = None,
+    ):
+        """Сообщаем инициатору результат в сообщении с прогрессом"""
+        if not job.chat_id:
+            return
+        if job.message_id:
+            try:
+                await self.bot.edit_message_text(
+                    text,
+                    chat_id=job.chat_id,
+                    message_id=job.message_id,
+                    reply_markup=reply_markup,
+                )
+                return
+            except TelegramBadRequest:
+                logger.debug('Не смог отредактировать сообщение с прогрессом')
+        await self.bot.send_message(
+            job.chat_id,
+            text,
+            reply_markup=reply_markup,
+        )
+
+
+async def get_sync_servers(job: SyncJob) -> list[Restaurant | Server]:
+    logger.info('Получаем список серверов для синхронизации')
+    if job.server_type == 'Transit':
+        return await get_transits_server_by_owner(job.user_choice)
+    if job.server_type == 'All':
+        # транзиты раньше ресторанов, рестораны ждут транзиты франшизы
+        franchise = get_topology_franchise(job.user_choice)
+        transits = await get_transits_server_by_owner(franchise)
+        restaurants_choice = 'rest_all'
+        if franchise != 'all':
+            restaurants_choice = f'rest_group_{franchise}'
+        restaurants = await get_sync_restaurants(restaurants_choice)
+        return transits + restaurants
+    return await get_sync_restaurants(job.user_choice, job.restaurant_codes)
+
+
+async def get_sync_restaurants(
+        user_choice: str,
+        restaurant_codes: list[int] | None = None,
+) -> list[Restaurant]:
+    restaurants = Restaurant.objects.select_related('franchise').filter(
+        server_ip__isnull=False,
+        is_sync=True,
+    )
+    if user_choice == 'rest_list':
+        restaurants = restaurants.filter(code__in=restaurant_codes)
+    if user_choice.startswith('rest_group_'):
+        franchise = user_choice.removeprefix('rest_group_')
+        restaurants = restaurants.filter(franchise__alias=franchise)
+    restaurants = await sync_to_async(list)(restaurants)
+    logger.debug('Нашел рестораны: %s', restaurants)
+    return restaurants
+
+
+async def get_sync_service_user() -> CustomUser:
+    """Пользователь отчетов синхронизаций без сотрудника, логин
+    SYNC_SERVICE_USER. Если его нет в БД, создается неактивным
+    """
+    service_user, created = await CustomUser.objects.aget_or_create(
+        login=settings.SYNC_SERVICE_USER,
+        defaults={
+            'name': 'Синхронизация без бота',
+            'tg_id': SYNC_SERVICE_USER_TG_ID,
+            'password': make_password(None),
+            'is_active': False,
+        },
+    )
+    if created:
+        logger.info('Создан пользователь %s', service_user.login)
+    return service_user
+
+
+async def save_sync_job_report(
+        job: SyncJob,
+        sync_statuses: list[SyncStatus],
+) -> SyncReport:
+    employee = await CustomUser.objects.aget(id=job.employee_id)
+    return await report_save_in_db(
+        employee,
+        job.server_type,
+        sync_statuses,
+        job.user_choice,
+        status='running',
+        job_id=job.id,
+        changed_only=job.changed_only,
+    )
+
+
+async def save_run_results(
+        targets: list[SyncTarget],
+        sync_engine: SyncEngine,
+        results_writer: SyncResultWriter,
+) -> list[SyncStatus]:
+    """Сохраняем полученные результаты, в том числе неполного запуска"""
+    completed = [
+        (target, sync_status)
+        for target, sync_status in zip(targets, sync_engine.sync_statuses)
+        if sync_status is not None
+    ]
+    sync_statuses = [sync_status for _, sync_status in completed]
+    await save_sync_times(sync_engine.sync_times)
+    await save_last_sync([target for target, _ in completed], sync_statuses)
+    await results_writer.flush()
+    logger.info(
+        'Сохранено результатов синхронизации %s из %s',
+        len(sync_statuses),
+        len(targets),
+    )
+    return sync_statuses
+
+
+async def refresh_mass_sync(job: SyncJob):
+    """Продлевает блокировку массовой синхронизации на время запуска"""
+    mass_sync_lock = get_mass_sync_lock()
+    while True:
+        await asyncio.sleep(settings.SYNC_MASS_LOCK_TTL / 3)
+        try:
+            await mass_sync_lock.refresh(job.id)
+        except Exception as err:
+            logger.warning(
+                'Не продлил блокировку массовой синхронизации %s: %r',
+                job.id,
+                err,
+            )
+
+
+async def release_mass_sync(job: SyncJob):
+    if job.user_choice in MASS_SYNC_CHOICES:
+        await get_mass_sync_lock().release(job.id)
+
+
+async def finish_running_reports(job: SyncJob, status: str):
+    """Отчет остается в running, если воркер упал во время запуска,
+    а задачу после возврата в очередь отменили до нового старта
+    """
+    async for sync_report in SyncReport.objects.filter(
+        job_id=job.id,
+        status='running',
+    ):
+        await finish_sync_report(sync_report, status)
+
+
+async def finish_sync_report(sync_report: SyncReport, status: str):
+    sync_report.status = status
+    sync_report.finished_at = timezone.now()
+    await sync_report.asave(update_fields=['status', 'finished_at'])
+    logger.info('Синхронизация %s: %s', sync_report.id, status)
+
+
+def get_sync_title(job: SyncJob) -> str:
+    title = get_sync_choice_title(job)
+    if job.changed_only:
+        title += ' (только изменившиеся)'
+    return title
+
+
+def get_topology_franchise(user_choice: str) -> str:
+    """topology - все франшизы, topology_{alias} - одна франшиза"""
+    return user_choice.removeprefix('topology').removeprefix('_') or 'all'
+
+
+def get_sync_choice_title(job: SyncJob) -> str:
+    if job.server_type == 'All':
+        franchise = get_topology_franchise(job.user_choice)
+        if franchise == 'all':
+            return 'Синхронизация транзитов и всех ресторанов'
+        return f'Синхронизация транзитов и ресторанов {franchise.upper()}'
+    if job.server_type == 'Transit':
+        return f'Синхронизация транзитов {job.user_choice.upper()}'
+    if job.user_choice == 'rest_all':
+        return 'Синхронизация всех ресторанов'
+    if job.user_choice == 'rest_list':
+        return 'Синхронизация ресторанов по списку'
+    franchise = job.user_choice.removeprefix('rest_group_')
+    return f'Синхронизация ресторанов {franchise.upper()}'
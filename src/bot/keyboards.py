@@ -20,6 +20,12 @@ async def get_choice_tr_keyboard():
         ],
         [
             InlineKeyboardButton(text='Все', callback_data='tr_all'),
+            InlineKeyboardButton(
+                text='Изменившиеся',
+                callback_data='tr_changed',
+            ),
+        ],
+        [
             InlineKeyboardButton(text='Отмена', callback_data='cancel')
         ],
     ]
@@ -34,6 +40,16 @@ async def get_choice_rest_sync_keyboard():
             InlineKeyboardButton(text='Группу', callback_data='rest_group'),
             InlineKeyboardButton(text='Все', callback_data='rest_all'),
         ],
+        [
+            InlineKeyboardButton(
+                text='Изменившиеся',
+                callback_data='rest_changed',
+            ),
+            InlineKeyboardButton(
+                text='Все с транзитами',
+                callback_data='rest_topology',
+            ),
+        ],
         [
             InlineKeyboardButton(text='Отмена', callback_data='cancel')
         ]
@@ -55,6 +71,19 @@ async def get_choice_rest_owner_keyboard():
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
 
+async def get_sync_cancel_keyboard(job_id: str):
+    logger.debug('Создаю кнопку отмены синхронизации')
+    inline_keyboard = [
+        [
+            InlineKeyboardButton(
+                text='⛔ Отменить',
+                callback_data=f'sync_cancel_{job_id}',
+            ),
+        ]
+    ]
+    return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
+
+
 async def get_report_keyboard(report_id: int):
     logger.debug('Создаю кнопку для показа отчета по синхронизации')
     inline_keyboard = [
@@ -63,6 +92,10 @@ async def get_report_keyboard(report_id: int):
                 text='📋 Показать отчет',
                 callback_data=f'report_{report_id}',
             ),
+            InlineKeyboardButton(
+                text='🔀 Сравнить с прошлой',
+                callback_data=f'sync_diff_{report_id}',
+            ),
         ]
     ]
     return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
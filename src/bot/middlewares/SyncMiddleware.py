@@ -1,26 +1,39 @@
+import uuid
+import time
 import logging
 
 from typing import Any
 from typing import Dict
 from typing import Callable
 from typing import Awaitable
+from datetime import datetime
 
 from aiogram import BaseMiddleware
 from aiogram import html
 from aiogram.types import CallbackQuery
 
+from django.conf import settings
 from django.utils import timezone
 from django.utils.dateformat import format
 
 from src.models import CustomUser
-from src.models import SyncReport
 from src.bot.utils import has_perm
 from src.bot.keyboards import get_report_keyboard
+from src.entities.MassSyncLock import MassSyncHolder
+from src.entities.MassSyncLock import get_mass_sync_lock
 
 logger = logging.getLogger('middleware_support_bot')
 
+SYNC_CALLBACKS = ('rest_all', 'rest_group', 'rest_changed', 'rest_topology')
+# Запускают массовую синхронизацию, остальные только ждут ее окончания
+MASS_SYNC_CALLBACKS = ('rest_all', 'rest_changed', 'rest_topology')
+
 
 class SyncMiddleware(BaseMiddleware):
+    """Одна массовая синхронизация на все реплики бота: блокировка
+    берется при выборе синхронизации, id задачи передается хендлеру
+    в sync_job_id, воркер освобождает блокировку после запуска
+    """
 
     async def __call__(
         self,
@@ -30,7 +43,7 @@ class SyncMiddleware(BaseMiddleware):
     ) -> Any:
         logger.debug('SyncMiddleware')
         employee: CustomUser = data['employee']
-        if event.data not in ('rest_all', 'rest_group'):
+        if event.data not in SYNC_CALLBACKS:
             return await handler(event, data)
 
         if not await has_perm('sync', employee):
@@ -38,24 +51,55 @@ class SyncMiddleware(BaseMiddleware):
             await event.message.answer('Нет прав на выполнения масс синхры')
             return
 
-        report = await SyncReport.objects.select_related('new_employee') \
-            .filter(user_choice__in=('all', 'rest_all')) \
-            .order_by('-start_at') \
-            .afirst()
+        mass_sync_lock = get_mass_sync_lock()
+        if event.data in MASS_SYNC_CALLBACKS:
+            holder = MassSyncHolder(
+                job_id=uuid.uuid4().hex,
+                employee_name=employee.name,
+                started_at=time.time(),
+            )
+            current_holder = await mass_sync_lock.acquire(holder)
+            if current_holder is None:
+                data['sync_job_id'] = holder.job_id
+                try:
+                    return await handler(event, data)
+                except Exception:
+                    await mass_sync_lock.release(holder.job_id)
+                    raise
+        else:
+            current_holder = await mass_sync_lock.get()
+            if current_holder is None:
+                return await handler(event, data)
 
-        if not report:
-            logger.debug('нет подходящего отчета по синхронизации')
-            return await handler(event, data)
+        logger.warning(
+            'Массовая синхронизация %s еще идет или не прошла пауза',
+            current_holder.job_id,
+        )
+        reply_markup = None
+        if current_holder.report_id:
+            reply_markup = await get_report_keyboard(current_holder.report_id)
+        await event.message.delete()
+        await event.message.answer(
+            get_mass_sync_busy_text(current_holder),
+            reply_markup=reply_markup,
+        )
 
-        if (timezone.now() - report.start_at).total_seconds() < 600:
-            logger.warning('С запуска синхронизации прошло меньше 10 минут')
-            await event.message.delete()
-            report_start_at = format(report.start_at, 'd-m-Y H:i:s')
-            await event.message.answer(
-                'Запуск массовой синхронизации только раз в 10 минут\n\n'
-                f'Последний запуск от: {html.code(report.new_employee.name)}\n'
-                f'Время запуска: {html.code(report_start_at)}',
-                reply_markup=await get_report_keyboard(report.id)
-            )
-            return
-        return await handler(event, data)
+
+def get_mass_sync_busy_text(holder: MassSyncHolder) -> str:
+    started_at = datetime.fromtimestamp(
+        holder.started_at,
+        tz=timezone.get_current_timezone(),
+    )
+    text = 'Массовая синхронизация еще выполняется\n\n'
+    if holder.finished:
+        minutes_left = max(int(holder.cooldown_left // 60) + 1, 1)
+        text = (
+            'Запуск массовой синхронизации только раз в '
+            f'{settings.SYNC_MASS_COOLDOWN // 60} минут, '
+            f'следующий через {minutes_left} мин\n\n'
+        )
+    return (
+        text
+        + f'Последний запуск от: {html.code(holder.employee_name)}\n'
+        f'Время запуска: {html.code(format(started_at, "d-m-Y H:i:s"))}'
+    )
@@ -0,0 +1,242 @@
+import time
+import asyncio
+import logging
+
+from typing import Callable
+from typing import Awaitable
+from dataclasses import dataclass
+
+from aiogram import Bot
+from aiogram.types import ReplyKeyboardRemove
+from aiogram.types import InlineKeyboardMarkup
+from aiogram.exceptions import TelegramAPIError
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramNetworkError
+from aiogram.exceptions import TelegramServerError
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.exceptions import TelegramEntityTooLarge
+
+from django.conf import settings
+
+from src.entities.User import User
+from src.bot.bot_client import get_bot
+
+logger = logging.getLogger('support_bot')
+
+CHAT_BURST = 3
+NETWORK_RETRY_DELAY = 1.0
+# бакеты чатов чистятся, когда их больше этого числа
+CHAT_BUCKETS_PRUNE_SIZE = 1000
+# дольше любой одной доставки с повторами
+CHAT_BUCKET_IDLE = 300
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity про запас.
+    Ожидающие получают токены по очереди
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.rate,
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Телеграм ответил 429, токены не выдаются retry_after секунд"""
+        self.paused_until = max(
+            self.paused_until,
+            time.monotonic() + seconds,
+        )
+        self.tokens = 0.0
+
+    def is_idle(self, seconds: float) -> bool:
+        """Токены не брали seconds секунд и запас восстановился:
+        новый бакет вместо этого не даст лишних отправок
+        """
+        now = time.monotonic()
+        if self._lock.locked() or now < self.paused_until:
+            return False
+        if now - self.updated_at < seconds:
+            return False
+        tokens = self.tokens + (now - self.updated_at) * self.rate
+        return tokens >= self.capacity
+
+
+@dataclass
+class DeliveryOutcome:
+    chat_id: int
+    name: str
+    status: str = 'sent'
+    attempts: int = 0
+    error: str = ''
+    retryable: bool = False
+
+    @property
+    def is_sent(self) -> bool:
+        return self.status == 'sent'
+
+
+class NotificationSender:
+    """Рассылка уведомлений параллельно под лимитами Bot API:
+    TG_NOTIFY_RATE сообщений в секунду на бота и TG_NOTIFY_CHAT_RATE
+    в один чат. На 429 ждет retry_after и отправляет повторно
+    """
+
+    def __init__(
+            self,
+            bot: Bot | None = None,
+            rate: float | None = None,
+            chat_rate: float | None = None,
+            retry_attempts: int | None = None,
+    ):
+        self.bot = bot
+        self.chat_rate = chat_rate or settings.TG_NOTIFY_CHAT_RATE
+        self.retry_attempts = (
+            retry_attempts or settings.TG_NOTIFY_RETRY_ATTEMPTS
+        )
+        self.bucket = TokenBucket(rate or settings.TG_NOTIFY_RATE)
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self._prune_at = CHAT_BUCKETS_PRUNE_SIZE
+
+    async def send_message(
+            self,
+            recipients: list[User],
+            message: str,
+            keyboard: InlineKeyboardMarkup | ReplyKeyboardRemove = None,
+    ) -> list[DeliveryOutcome]:
+        bot = self.bot or get_bot()
+        return await asyncio.gather(*(
+            self.deliver(
+                recipient.user.tg_id,
+                recipient.user.name,
+                lambda chat_id: bot.send_message(
+                    chat_id,
+                    message,
+                    reply_markup=keyboard,
+                ),
+            )
+            for recipient in recipients
+        ))
+
+    async def deliver(
+            self,
+            chat_id: int,
+            name: str,
+            send: Callable[[int], Awaitable],
+    ) -> DeliveryOutcome:
+        """Ошибки отправки не выбрасываются, а попадают в DeliveryOutcome"""
+        outcome = DeliveryOutcome(chat_id, name)
+        chat_bucket = self.get_chat_bucket(chat_id)
+        while True:
+            await chat_bucket.acquire()
+            await self.bucket.acquire()
+            outcome.attempts += 1
+            try:
+                await send(chat_id)
+                logger.debug('Уведомление для %s отправлено', name)
+                return outcome
+            except TelegramRetryAfter as err:
+                logger.warning(
+                    'Лимит Bot API, повтор для %s через %s c',
+                    name,
+                    err.retry_after,
+                )
+                self.bucket.pause(err.retry_after)
+                chat_bucket.pause(err.retry_after)
+                outcome.error = err.message
+            except TelegramForbiddenError as err:
+                logger.warning('Заблокировал бота %s', name)
+                outcome.status = 'blocked'
+                outcome.error = err.message
+                return outcome
+            except (TelegramBadRequest, TelegramEntityTooLarge) as err:
+                logger.warning('Не смог отправить уведомление %s', name)
+                outcome.status = 'failed'
+                outcome.error = err.message
+                return outcome
+            except (TelegramNetworkError, TelegramServerError) as err:
+                logger.warning('Не отправил уведомление %s: %s', name, err)
+                outcome.error = err.message
+                await asyncio.sleep(NETWORK_RETRY_DELAY * outcome.attempts)
+            except TelegramAPIError as err:
+                logger.warning('Ошибка Bot API для %s: %s', name, err)
+                outcome.status = 'failed'
+                outcome.error = err.message
+                return outcome
+            if outcome.attempts >= self.retry_attempts:
+                logger.error(
+                    'Уведомление для %s не отправлено за %s попыток',
+                    name,
+                    outcome.attempts,
+                )
+                outcome.status = 'failed'
+                outcome.retryable = True
+                return outcome
+
+    def get_chat_bucket(self, chat_id: int) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            if len(self.chat_buckets) >= self._prune_at:
+                self.prune_chat_buckets()
+            self.chat_buckets[chat_id] = TokenBucket(
+                self.chat_rate,
+                CHAT_BURST,
+            )
+        return self.chat_buckets[chat_id]
+
+    def prune_chat_buckets(self):
+        """Бакет на каждый чат, которому писал процесс, копился бы
+        без предела. Следующая чистка, когда бакетов станет вдвое больше
+        оставшихся, чтобы не перебирать их на каждый новый чат
+        """
+        idle_chats = [
+            chat_id for chat_id, bucket in self.chat_buckets.items()
+            if bucket.is_idle(CHAT_BUCKET_IDLE)
+        ]
+        for chat_id in idle_chats:
+            del self.chat_buckets[chat_id]
+        self._prune_at = max(
+            CHAT_BUCKETS_PRUNE_SIZE,
+            2 * len(self.chat_buckets),
+        )
+        logger.debug(
+            'Удалено бакетов чатов: %s, осталось %s',
+            len(idle_chats),
+            len(self.chat_buckets),
+        )
+
+
+_notification_sender: NotificationSender | None = None
+_notification_sender_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_notification_sender() -> NotificationSender:
+    """Лимиты общие на процесс. Как и Bot, отправитель привязан
+    к циклу событий, из другого цикла создается новый
+    """
+    global _notification_sender, _notification_sender_loop
+    loop = asyncio.get_running_loop()
+    if _notification_sender is None or _notification_sender_loop is not loop:
+        _notification_sender = NotificationSender()
+        _notification_sender_loop = loop
+    return _notification_sender
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+
+from datetime import timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import ReplyKeyboardRemove
+from aiogram.types import InlineKeyboardMarkup
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from src.models import Notification
+from src.entities.User import User
+from src.bot.bot_client import get_bot
+from src.bot.services import send_documents
+from src.bot.notifications import DeliveryOutcome
+from src.bot.notifications import NotificationSender
+from src.bot.notifications import get_notification_sender
+
+logger = logging.getLogger('support_bot')
+
+DRAIN_TIMEOUT = 10
+
+
+async def enqueue_notifications(
+        recipients: list[User],
+        message: str,
+        keyboard: InlineKeyboardMarkup | ReplyKeyboardRemove = None,
+        priority: int = Notification.NORMAL,
+) -> list[Notification]:
+    reply_markup = dump_reply_markup(keyboard)
+    notifications = await Notification.objects.abulk_create([
+        Notification(
+            chat_id=recipient.user.tg_id,
+            recipient_name=recipient.user.name,
+            text=message,
+            reply_markup=reply_markup,
+            priority=priority,
+        )
+        for recipient in recipients
+    ])
+    logger.debug(
+        'В очередь добавлено уведомлений: %s, приоритет %s',
+        len(notifications),
+        priority,
+    )
+    wake_notification_dispatcher()
+    return notifications
+
+
+async def enqueue_chat_notification(
+        chat_id: int,
+        message: str,
+        documents: dict | None = None,
+        priority: int = Notification.NORMAL,
+) -> Notification:
+    """Уведомление в группу или канал, документы уходят после текста"""
+    notification = await Notification.objects.acreate(
+        chat_id=chat_id,
+        recipient_name=str(chat_id),
+        text=message,
+        documents=documents or None,
+        priority=priority,
+    )
+    logger.debug('В очередь добавлено уведомление в чат %s', chat_id)
+    wake_notification_dispatcher()
+    return notification
+
+
+def dump_reply_markup(
+        keyboard: InlineKeyboardMarkup | ReplyKeyboardRemove | None,
+) -> dict | None:
+    if keyboard is None:
+        return None
+    return keyboard.model_dump(mode='json', exclude_none=True)
+
+
+def load_reply_markup(
+        reply_markup: dict | None,
+) -> InlineKeyboardMarkup | ReplyKeyboardRemove | None:
+    if not reply_markup:
+        return None
+    if 'inline_keyboard' in reply_markup:
+        return InlineKeyboardMarkup.model_validate(reply_markup)
+    return ReplyKeyboardRemove.model_validate(reply_markup)
+
+
+class NotificationDispatcher:
+    """Отправка уведомлений из очереди Notification пачками.
+    Пачка выбирается по приоритету, поэтому эскалации уходят раньше
+    обычных и массовых уведомлений, даже если очередь большая.
+    Выбранные уведомления откладываются на TG_OUTBOX_LEASE секунд:
+    если процесс упадет во время отправки, они вернутся в очередь
+    и могут быть отправлены повторно
+    """
+
+    def __init__(
+            self,
+            sender: NotificationSender | None = None,
+            batch_size: int | None = None,
+            poll_interval: float | None = None,
+    ):
+        self.sender = sender
+        self.batch_size = batch_size or settings.TG_OUTBOX_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.TG_OUTBOX_POLL_INTERVAL
+        self.wakeup = asyncio.Event()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._stopping = False
+        self._current: asyncio.Task | None = None
+
+    async def run_forever(self):
+        logger.info('Отправка уведомлений из очереди запущена')
+        self.loop = asyncio.get_running_loop()
+        while not self._stopping:
+            self.wakeup.clear()
+            self._current = asyncio.create_task(self.dispatch_batch())
+            try:
+                dispatched = await self._current
+            except Exception as err:
+                logger.exception(err)
+                dispatched = 0
+            finally:
+                self._current = None
+            if dispatched >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+
+    async def stop(self, timeout: float = DRAIN_TIMEOUT):
+        """Дожидаемся отправки текущей пачки"""
+        self._stopping = True
+        self.wakeup.set()
+        if self._current is None:
+            return
+        logger.info('Жду отправки уведомлений до %s c', timeout)
+        await asyncio.wait({self._current}, timeout=timeout)
+
+    async def dispatch_batch(self) -> int:
+        notifications = await claim_notifications(self.batch_size)
+        if not notifications:
+            return 0
+        sender = self.sender or get_notification_sender()
+        bot = get_bot()
+
+        def make_send(notification: Notification):
+            return lambda chat_id: bot.send_message(
+                chat_id,
+                notification.text,
+                reply_markup=load_reply_markup(notification.reply_markup),
+            )
+
+        outcomes = await asyncio.gather(*(
+            sender.deliver(
+                notification.chat_id,
+                notification.recipient_name or str(notification.chat_id),
+                make_send(notification),
+            )
+            for notification in notifications
+        ))
+        await save_outcomes(notifications, outcomes)
+        # документы после сохранения статуса: ошибка в документах
+        # не должна приводить к повторной отправке текста
+        await asyncio.gather(*(
+            send_notification_documents(bot, notification)
+            for notification, outcome in zip(notifications, outcomes)
+            if outcome.is_sent and notification.documents
+        ))
+        return len(notifications)
+
+
+async def send_notification_documents(bot: Bot, notification: Notification):
+    try:
+        await send_documents(bot, notification.chat_id, notification.documents)
+    except TelegramAPIError as err:
+        logger.warning(
+            'Не отправил документы уведомления %s в %s: %s',
+            notification.id,
+            notification.chat_id,
+            err,
+        )
+
+
+async def claim_notifications(limit: int) -> list[Notification]:
+    """Захват пачки уведомлений условным UPDATE: уведомление получает
+    срок аренды, только если его еще никто не взял. Остаются только
+    строки с нашим сроком аренды, поэтому два диспетчера (например,
+    старый и новый бот во время деплоя) не отправят одно уведомление
+    дважды
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=settings.TG_OUTBOX_LEASE)
+    pending = Notification.objects.filter(
+        status='pending',
+        next_attempt_at__lte=now,
+    )
+    candidate_ids = [
+        notification_id async for notification_id in pending.order_by(
+            'priority',
+            'id',
+        ).values_list('id', flat=True)[:limit]
+    ]
+    if not candidate_ids:
+        return []
+    claimed = await pending.filter(id__in=candidate_ids).aupdate(
+        attempts=F('attempts') + 1,
+        next_attempt_at=lease_until,
+    )
+    if claimed < len(candidate_ids):
+        logger.debug(
+            'Уведомлений взято другим диспетчером: %s',
+            len(candidate_ids) - claimed,
+        )
+    return [
+        notification async for notification in Notification.objects.filter(
+            id__in=candidate_ids,
+            status='pending',
+            next_attempt_at=lease_until,
+        ).order_by('priority', 'id')
+    ]
+
+
+async def save_outcomes(
+        notifications: list[Notification],
+        outcomes: list[DeliveryOutcome],
+):
+    now = timezone.now()
+    sent_ids = []
+    for notification, outcome in zip(notifications, outcomes):
+        if outcome.is_sent:
+            sent_ids.append(notification.id)
+            continue
+        update = {'last_error': outcome.error[:255]}
+        if (
+            outcome.retryable
+            and notification.attempts < settings.TG_OUTBOX_MAX_ATTEMPTS
+        ):
+            update['next_attempt_at'] = now + timedelta(
+                seconds=settings.TG_OUTBOX_RETRY_DELAY
+                * 2 ** (notification.attempts - 1),
+            )
+        else:
+            update['status'] = 'dead'
+            logger.error(
+                'Уведомление %s для %s не доставлено: %s',
+                notification.id,
+                outcome.name,
+                outcome.error,
+            )
+        await Notification.objects.filter(
+            id=notification.id,
+        ).aupdate(**update)
+    if sent_ids:
+        await Notification.objects.filter(id__in=sent_ids).aupdate(
+            status='sent',
+            sent_at=now,
+            last_error='',
+        )
+    logger.info(
+        'Отправлено уведомлений из очереди: %s из %s',
+        len(sent_ids),
+        len(notifications),
+    )
+
+
+_notification_dispatcher: NotificationDispatcher | None = None
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    global _notification_dispatcher
+    if _notification_dispatcher is None:
+        _notification_dispatcher = NotificationDispatcher()
+    return _notification_dispatcher
+
+
+def wake_notification_dispatcher():
+    """Будит диспетчер в этом процессе, иначе уведомление
+    уйдет не позже чем через TG_OUTBOX_POLL_INTERVAL
+    """
+    if _notification_dispatcher is None:
+        return
+    if _notification_dispatcher.loop is asyncio.get_running_loop():
+        _notification_dispatcher.wakeup.set()
@@ -1,3 +1,5 @@
+import uuid
+
 from datetime import datetime
 
 from dataclasses import field
@@ -12,6 +14,77 @@ class SyncStatus:
     web_link: str
     status: str = 'ok'
     msg: str = 'In Progress'
+    attempts: int = 1
+    error_class: str = ''
+    http_status: int | None = None
+    elapsed: float = 0.0
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class SyncTarget:
+    server_name: str
+    web_link: str
+    host: str
+    franchise_id: int | None = None
+    server_id: int | None = None
+    port: int = 9000
+    server_type: str = 'Report'
+
+
+@dataclass
+class SyncJob:
+    employee_id: int
+    server_type: str
+    user_choice: str
+    chat_id: int | None = None
+    message_id: int | None = None
+    restaurant_codes: list[int] = field(default_factory=list)
+    changed_only: bool = False
+    spread: float = 0.0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    parent_id: str = ''
+    report_id: int | None = None
+    shard_index: int = 0
+    shard_count: int = 1
+    # цели шарда выбирает координатор, шард не читает их из БД заново
+    targets: list[SyncTarget] = field(default_factory=list)
+
+    def __post_init__(self):
+        # из очереди Redis цели приходят словарями
+        self.targets = [
+            SyncTarget(**target) if isinstance(target, dict) else target
+            for target in self.targets
+        ]
+
+    @property
+    def run_id(self) -> str:
+        """Id запуска: у шарда это id исходной задачи"""
+        return self.parent_id or self.id
+
+
+@dataclass
+class SyncStats:
+    total: int = 0
+    ok: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    connections_created: int = 0
+    connections_reused: int = 0
+    handshake_time: float = 0.0
+    handshake_time_saved: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.total / self.elapsed
+
+    @property
+    def error_rate(self) -> float:
+        if not self.total:
+            return 0.0
+        return self.errors / self.total
 
 
 @dataclass
@@ -54,3 +127,25 @@ class TGDocument:
     documents: dict = field(default_factory=dict)
     is_error: bool = False
     error_msg: str = ''
+
+
+@dataclass
+class DocumentRelayStats:
+    relayed: int = 0
+    relayed_bytes: int = 0
+    downloaded: int = 0
+    downloaded_bytes: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def saved_bytes(self) -> int:
+        """Пересланные по file_id файлы не скачиваются и не загружаются"""
+        return self.relayed_bytes * 2
+
+    def add_relayed(self, messages: list):
+        for message in messages:
+            self.relayed += 1
+            file = message.document or (message.photo or [None])[-1]
+            if file and file.file_size:
+                self.relayed_bytes += file.file_size
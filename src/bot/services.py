@@ -1,9 +1,14 @@
+import asyncio
 import logging
 import os
 import re
+import time
+
+import aiohttp
 
 from aiogram import Bot
-from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.exceptions import TelegramEntityTooLarge
 from aiogram.types import Message, BufferedInputFile
 from aiogram.utils.media_group import MediaGroupBuilder
@@ -16,12 +21,16 @@ from django.utils import dateformat
 
 from src.bot import dialogs
 from src.bot.scheme import TGDocument
+from src.bot.scheme import DocumentRelayStats
+from src.bot.bot_client import get_bot
 from src.entities.User import User
 from src.exceptions import DocumentsNotFoundError, NoSelectedEngineerError
 from src.models import CustomUser, SDTask, CustomGroup, Dispatcher, Restaurant
 
 logger = logging.getLogger('support_bot')
 
+MEDIA_GROUP_LIMIT = 10
+
 
 async def get_group_managers_by_support_group(
         support_group: str,
@@ -123,29 +132,128 @@ async def get_buffered_file(
     return BufferedInputFile(io_file.read(), filename=doc_name)
 
 
-async def create_documents_media_group(tg_documents: dict) -> list:
-    """Создаем медиа-группу из полученных ранее документов"""
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
-    media_group = MediaGroupBuilder(caption='Приложенные документы')
+def is_photo_document(doc_name: str) -> bool:
+    """Фото get_documents сохраняет под именами image_*.jpg"""
+    return doc_name.startswith('image_') and doc_name.endswith('.jpg')
+
+
+def split_documents_to_media_groups(tg_documents: dict) -> list[dict]:
+    """Телеграм не смешивает фото и документы в одной медиа-группе
+    и принимает в группе не больше MEDIA_GROUP_LIMIT вложений
+    """
+    photos = []
+    documents = []
     for doc_name, doc_id in tg_documents.items():
-        buffered_file = await get_buffered_file(bot, doc_name, doc_id)
-        media_group.add_document(buffered_file)
-    await bot.session.close()
+        if is_photo_document(doc_name):
+            photos.append((doc_name, doc_id))
+        else:
+            documents.append((doc_name, doc_id))
+    media_groups = []
+    for items in (photos, documents):
+        for start in range(0, len(items), MEDIA_GROUP_LIMIT):
+            media_groups.append(dict(items[start:start + MEDIA_GROUP_LIMIT]))
+    return media_groups
+
+
+def create_documents_media_group(
+        tg_documents: dict,
+        caption: str | None = None,
+) -> list:
+    """Медиа-группа из file_id без скачивания документов"""
+    media_group = MediaGroupBuilder(caption=caption)
+    for doc_name, doc_id in tg_documents.items():
+        if is_photo_document(doc_name):
+            media_group.add_photo(media=doc_id)
+        else:
+            media_group.add_document(media=doc_id)
     return media_group.build()
 
 
-async def sending_documents_one_by_one(
+async def send_documents(
         bot: Bot,
-        sd_task: SDTask,
+        chat_id: int,
         tg_documents: dict,
+        caption: str | None = 'Приложенные документы',
+) -> DocumentRelayStats:
+    """Пересылка документов по file_id. Скачиваем и загружаем заново
+    только документы, file_id которых телеграм не принял
+    """
+    relay_stats = DocumentRelayStats()
+    started_at = time.monotonic()
+    for media_group in split_documents_to_media_groups(tg_documents):
+        if len(media_group) > 1:
+            try:
+                messages = await bot.send_media_group(
+                    chat_id=chat_id,
+                    media=create_documents_media_group(media_group, caption),
+                )
+                relay_stats.add_relayed(messages)
+                caption = None
+                continue
+            except TelegramBadRequest as err:
+                logger.warning(
+                    'Медиа-группа по file_id не отправлена: %s',
+                    err.message,
+                )
+        for doc_name, doc_id in media_group.items():
+            await send_document(
+                bot,
+                chat_id,
+                doc_name,
+                doc_id,
+                relay_stats,
+                caption,
+            )
+            caption = None
+    relay_stats.elapsed = time.monotonic() - started_at
+    logger.info(
+        'Документы отправлены за %.2f c: по file_id %s '
+        '(не передано через бота %s байт), скачано заново %s (%s байт), '
+        'не отправлено %s',
+        relay_stats.elapsed,
+        relay_stats.relayed,
+        relay_stats.saved_bytes,
+        relay_stats.downloaded,
+        relay_stats.downloaded_bytes,
+        relay_stats.failed,
+    )
+    return relay_stats
+
+
+async def send_document(
+        bot: Bot,
+        chat_id: int,
+        doc_name: str,
+        doc_id: str,
+        relay_stats: DocumentRelayStats,
+        caption: str | None = None,
 ):
-    """Отправка документов по одному"""
-    for doc_name, doc_id in tg_documents.items():
-        buffered_file = await get_buffered_file(bot, doc_name, doc_id)
-        await bot.send_document(
-            chat_id=sd_task.new_performer.tg_id,
-            document=buffered_file,
+    try:
+        if is_photo_document(doc_name):
+            message = await bot.send_photo(chat_id, doc_id, caption=caption)
+        else:
+            message = await bot.send_document(
+                chat_id,
+                doc_id,
+                caption=caption,
+            )
+        relay_stats.add_relayed([message])
+        return
+    except TelegramBadRequest as err:
+        logger.warning(
+            'Телеграм не принял file_id %s: %s, скачиваю',
+            doc_name,
+            err.message,
         )
+    try:
+        buffered_file = await get_buffered_file(bot, doc_name, doc_id)
+        await bot.send_document(chat_id, buffered_file, caption=caption)
+    except (TelegramBadRequest, TelegramEntityTooLarge) as err:
+        logger.error('Не смог отправить %s: %s', doc_name, err.message)
+        relay_stats.failed += 1
+        return
+    relay_stats.downloaded += 1
+    relay_stats.downloaded_bytes += len(buffered_file.data)
 
 
 async def send_documents_out_task(
@@ -153,7 +261,6 @@ async def send_documents_out_task(
         dispatcher: bool = True,
 ):
     logger.info('Отправляю документы из задачи')
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
     tg_documents = eval(sd_task.tg_docs)
     if dispatcher:
         tg_documents = await get_documents_from_dispatcher_task(
@@ -161,17 +268,11 @@ async def send_documents_out_task(
         )
     if not tg_documents:
         raise DocumentsNotFoundError('Нет документов в задаче')
-    media_group = await create_documents_media_group(tg_documents)
-    try:
-        await bot.send_media_group(
-            chat_id=sd_task.new_performer.tg_id,
-            media=media_group,
-        )
-    except TelegramEntityTooLarge:
-        logger.warning('Размер вложений слишком большой')
-        await sending_documents_one_by_one(bot, sd_task, tg_documents)
-    await bot.session.close()
-    logger.info('Документы отправлены')
+    await send_documents(
+        get_bot(),
+        sd_task.new_performer.tg_id,
+        tg_documents,
+    )
 
 
 async def get_documents_from_dispatcher_task(
@@ -206,30 +307,67 @@ async def select_engineer_on_shift(
     return selected_engineer
 
 
-async def save_doc_from_tg_to_disk(task_number: str, tg_docs: dict):
+async def save_doc_from_tg_to_disk(
+        task_number: str,
+        tg_docs: dict,
+) -> list[tuple[str, str]]:
+    """Скачивание документов задачи в media/docs/<номер задачи>.
+    Файлы качаются параллельно, не больше TG_ARCHIVE_CONCURRENCY
+    одновременно, и пишутся на диск кусками по мере получения
+    """
     logger.info('Сохраняю документы: %s', tg_docs)
     if not tg_docs:
         logger.debug('Нет информации о документах')
-        return
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
+        return []
+    bot = get_bot()
     save_to = os.path.join('media/docs/', task_number)
-    if not os.path.exists(save_to):
-        os.makedirs(save_to)
+    os.makedirs(save_to, exist_ok=True)
+    semaphore = asyncio.Semaphore(settings.TG_ARCHIVE_CONCURRENCY)
 
-    save_report = []
-    for doc_name, doc_id in tg_docs.items():
-        tg_file = await bot.get_file(doc_id)
+    async def save_doc(doc_name: str, doc_id: str) -> tuple[str, str] | None:
         save_path = os.path.join(save_to, doc_name)
-        try:
-            await bot.download_file(tg_file.file_path, save_path)
-            save_report.append((doc_name, save_path))
-        except FileNotFoundError:
-            logger.error('Проблемы при сохранении %s', save_path)
-    logger.info('Документы сохранены')
-    await bot.session.close()
+        async with semaphore:
+            if await download_doc_to_disk(bot, doc_id, save_path):
+                return doc_name, save_path
+
+    saved_docs = await asyncio.gather(*(
+        save_doc(doc_name, doc_id) for doc_name, doc_id in tg_docs.items()
+    ))
+    save_report = [saved_doc for saved_doc in saved_docs if saved_doc]
+    logger.info(
+        'Документы сохранены: %s из %s',
+        len(save_report),
+        len(tg_docs),
+    )
     return save_report
 
 
+async def download_doc_to_disk(bot: Bot, doc_id: str, save_path: str) -> bool:
+    """Файл пишется во временный .part и переименовывается после
+    загрузки, недокачанный документ в папке задачи не остается
+    """
+    part_path = f'{save_path}.part'
+    try:
+        tg_file = await bot.get_file(doc_id)
+        await bot.download_file(
+            tg_file.file_path,
+            part_path,
+            chunk_size=settings.TG_ARCHIVE_CHUNK_SIZE,
+        )
+        os.replace(part_path, save_path)
+        return True
+    except (
+            TelegramAPIError,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+            OSError,
+    ) as error:
+        logger.error('Проблемы при сохранении %s: %r', save_path, error)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        return False
+
+
 async def prepare_tasks_as_file_for_send(
         report_title: str,
         tasks: list[SDTask],
@@ -4,9 +4,11 @@ from aiogram import html
 
 from src.models import SDTask
 from src.models import WorkShift
+from src.models import Notification
 from src.entities.User import User
 from src.entities.Message import Message
 from src.entities.SupportEngineer import SupportEngineer
+from src.bot.services import save_doc_from_tg_to_disk
 from src.bot.services import get_group_managers_by_support_group
 
 logger = logging.getLogger('support_bot_tasks')
@@ -29,11 +31,13 @@ async def check_task_activate_step_1(task_number: str):
     await Message.send_tg_notification(
         managers,
         notify,
+        priority=Notification.ESCALATION,
     )
     await Message.send_tg_notification(
         [User(task.new_applicant)],
         f'Не взяли в работу задачу {task.number} за 10 минут.\n'
         f'Сообщил старшим',
+        priority=Notification.ESCALATION,
     )
 
 
@@ -44,11 +48,15 @@ async def check_task_activate_step_2(task_number: str):
     if task.new_performer:
         logger.info('На задачу назначен инженер')
         return
-    await Message.send_notify_to_seniors_engineers(notify)
+    await Message.send_notify_to_seniors_engineers(
+        notify,
+        priority=Notification.ESCALATION,
+    )
     await Message.send_tg_notification(
         [User(task.new_applicant)],
         f'Не взяли в работу задачу {task.number} за 20 минут.\n'
         f'Сообщил Ведущим',
+        priority=Notification.ESCALATION,
     )
 
 
@@ -67,14 +75,21 @@ async def check_task_deadline(task_number: str):
             task_number,
         )
         notify = f'🧨Прошло два часа, а на задаче {task_number} нет инженера!'
-        await Message.send_notify_to_seniors_engineers(notify)
+        await Message.send_notify_to_seniors_engineers(
+            notify,
+            priority=Notification.ESCALATION,
+        )
         return
     support_engineer = SupportEngineer(task.new_performer)
     await Message.send_notify_to_group_managers(
         await support_engineer.group_id,
         notify,
+        priority=Notification.ESCALATION,
+    )
+    await Message.send_notify_to_seniors_engineers(
+        notify,
+        priority=Notification.ESCALATION,
     )
-    await Message.send_notify_to_seniors_engineers(notify)
 
 
 async def check_end_of_shift(shift_id: int):
@@ -101,10 +116,32 @@ async def check_end_of_shift(shift_id: int):
     await Message.send_notify_to_group_managers(
         await support_engineer.group_id,
         notify,
+        priority=Notification.NORMAL,
     )
     await Message.send_tg_notification(
         [support_engineer],
         '🔴 Прошло 9 часов, а у тебя не закрыта смена.\n\n'
         'Для закрытия смены используй команду /end_shift',
+        priority=Notification.NORMAL,
     )
     logger.debug('Проверка завершена')
+
+
+async def archive_task_documents(
+        task_id: int,
+        task_number: str,
+        tg_docs: dict,
+):
+    """Документы закрытой задачи сохраняются на диск после закрытия,
+    диспетчер не ждет скачивания файлов
+    """
+    logger.info('Архивация документов задачи %s', task_number)
+    save_report = await save_doc_from_tg_to_disk(task_number, tg_docs)
+    if not save_report:
+        logger.warning('Документы задачи %s не сохранены', task_number)
+        return
+    # формат doc_path разбирается через make_tuple в src.utils
+    await SDTask.objects.filter(id=task_id).aupdate(
+        doc_path=str(save_report).strip('[]') + ',',
+    )
+    logger.info('Документы задачи %s сохранены', task_number)
@@ -0,0 +1,77 @@
+import asyncio
+
+from dataclasses import dataclass
+
+import pytest
+import aiohttp
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+
+from src.bot.scheme import SyncStatus
+from src.bot.handlers.synchronizations import engine
+
+
+@pytest.fixture(scope='session')
+def django_db():
+    """Тестовая БД: для sqlite в памяти, для остальных отдельная test_
+    база, рабочая БД не затрагивается. Таблицы создаются по моделям
+    без миграций
+    """
+    old_name = connection.settings_dict['NAME']
+    old_migration_modules = settings.MIGRATION_MODULES
+    settings.MIGRATION_MODULES = {
+        app_config.label: None for app_config in apps.get_app_configs()
+    }
+    try:
+        connection.creation.create_test_db(verbosity=0, serialize=False)
+    finally:
+        settings.MIGRATION_MODULES = old_migration_modules
+    yield connection
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+@dataclass
+class SyncReferentsCall:
+    server_name: str
+    web_link: str
+    timeout: aiohttp.ClientTimeout | None
+    started_at: float
+
+
+class FakeSyncReferents:
+    """Подменяет sync_referents в движке: запоминает вызовы и по умолчанию
+    отвечает ok. Поведение задаётся в respond(sync_status), который может
+    поменять статус или подождать
+    """
+
+    def __init__(self):
+        self.calls: list[SyncReferentsCall] = []
+        self.respond = None
+
+    async def __call__(self, session, web_link, server_name, timeout=None):
+        self.calls.append(SyncReferentsCall(
+            server_name,
+            web_link,
+            timeout,
+            asyncio.get_running_loop().time(),
+        ))
+        sync_status = SyncStatus(server_name, web_link)
+        if self.respond is not None:
+            await self.respond(sync_status)
+        return sync_status
+
+    @property
+    def synced(self) -> list[str]:
+        return [call.server_name for call in self.calls]
+
+    def count(self, server_name: str) -> int:
+        return self.synced.count(server_name)
+
+
+@pytest.fixture
+def fake_sync_referents(monkeypatch):
+    fake = FakeSyncReferents()
+    monkeypatch.setattr(engine, 'sync_referents', fake)
+    return fake
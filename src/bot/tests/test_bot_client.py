@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import pytest
+
+from django.conf import settings
+
+from src.bot.bot_client import get_bot
+from src.bot.bot_client import close_bot
+
+
+class TestBotClient:
+    @pytest.mark.asyncio
+    async def test_shared_bot(self, monkeypatch):
+        monkeypatch.setattr(settings, 'TG_BOT_TOKEN', '123456:TEST')
+        monkeypatch.setattr(settings, 'TG_BOT_POOL_SIZE', 5)
+        bot = get_bot()
+        try:
+            assert get_bot() is bot
+            session = await bot.session.create_session()
+            assert session.connector.limit == 5
+        finally:
+            await close_bot()
+        assert bot.session._session.closed
+        assert get_bot() is not bot
+        await close_bot()
+
+    @pytest.mark.asyncio
+    async def test_bot_per_loop(self, monkeypatch):
+        monkeypatch.setattr(settings, 'TG_BOT_TOKEN', '123456:TEST')
+        thread_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=thread_loop.run_forever)
+        thread.start()
+
+        async def get_thread_bot():
+            bot = get_bot()
+            await bot.session.create_session()
+            return bot
+
+        try:
+            bot = get_bot()
+            await bot.session.create_session()
+            thread_bot = await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(
+                    get_thread_bot(),
+                    thread_loop,
+                ),
+            )
+            assert thread_bot is not bot
+            assert get_bot() is bot, 'вызов из другого цикла не заменяет Bot'
+
+            await close_bot()
+
+            assert bot.session._session.closed
+            assert thread_bot.session._session.closed
+        finally:
+            thread_loop.call_soon_threadsafe(thread_loop.stop)
+            thread.join()
+            thread_loop.close()
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pytest
+
+from src.bot.utils import MainServerMatcher
+from src.entities.RK7Simulator import RK7Simulator
+from src.bot.utils import find_main_server_in_stream
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+async def iter_chunks(page: bytes, chunk_size: int):
+    for start in range(0, len(page), chunk_size):
+        yield page[start:start + chunk_size]
+
+
+class TestConnProbe:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize('chunk_size', [1, 7, 4096, 1 << 20])
+    async def test_fixtures(self, chunk_size):
+        transit_page = (FIXTURES / 'connects_transit.html').read_bytes()
+        no_transit_page = (FIXTURES / 'connects_no_transit.html').read_bytes()
+
+        matcher = await find_main_server_in_stream(
+            iter_chunks(transit_page, chunk_size),
+        )
+        assert matcher.main_server.startswith('REP_CENT')
+        assert await find_main_server_in_stream(
+            iter_chunks(no_transit_page, chunk_size),
+        ) is None
+
+    def test_markup_is_ignored(self):
+        matcher = MainServerMatcher()
+        assert matcher.feed(b'<td class="TRANSIT"><a href="/CENT">') is False
+        assert matcher.feed(b'link</a></td>') is False
+
+    def test_text_split_between_chunks(self):
+        matcher = MainServerMatcher()
+        assert matcher.feed(b'<td>FZ_REP_TRA') is False
+        assert matcher.feed(b'NSIT_01</td>') is True
+        assert matcher.main_server == 'FZ_REP_TRANSIT_01'
+
+    @pytest.mark.asyncio
+    async def test_simulator_pages(self):
+        simulator = RK7Simulator(hosts=300, no_transit_rate=0.5, seed=1)
+        behaviours = {host.behaviour for host in simulator.hosts.values()}
+        assert behaviours == {'ok', 'no_transit'}
+        assert all(
+            not address.endswith(('.0', '.255'))
+            for address in simulator.addresses
+        )
+
+        matcher = await find_main_server_in_stream(
+            iter_chunks(simulator.connects_page, 4096),
+        )
+        assert matcher.main_server == 'REP_CENT_01'
+        assert await find_main_server_in_stream(
+            iter_chunks(simulator.connects_page_no_transit, 4096),
+        ) is None
@@ -0,0 +1,85 @@
+import time
+import asyncio
+
+import pytest
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from src.models import CustomUser
+from src.bot.scheme import SyncJob
+from src.entities.MassSyncLock import MassSyncHolder
+from src.entities.MassSyncLock import MemoryMassSyncLock
+from src.bot.handlers.synchronizations import worker as worker_module
+from src.management.commands import sync_referents as \
+    sync_referents_command
+
+
+class TestMassSyncLock:
+    @pytest.mark.asyncio
+    async def test_lock_and_cooldown(self, monkeypatch):
+        monkeypatch.setattr(settings, 'SYNC_MASS_COOLDOWN', 600)
+        mass_sync_lock = MemoryMassSyncLock()
+        first = MassSyncHolder('job_1', 'Иванов', time.time())
+        second = MassSyncHolder('job_2', 'Петров', time.time())
+
+        assert await mass_sync_lock.acquire(first) is None
+        await mass_sync_lock.attach_report('job_1', 10)
+        current_holder = await mass_sync_lock.acquire(second)
+        assert current_holder.job_id == 'job_1'
+        assert current_holder.report_id == 10
+        assert not current_holder.finished
+
+        await mass_sync_lock.release('job_2')
+        assert (await mass_sync_lock.get()).job_id == 'job_1'
+        await mass_sync_lock.release('job_1')
+        current_holder = await mass_sync_lock.acquire(second)
+        assert current_holder.finished, 'пауза после старта'
+
+        monkeypatch.setattr(settings, 'SYNC_MASS_COOLDOWN', 0)
+        mass_sync_lock = MemoryMassSyncLock()
+        assert await mass_sync_lock.acquire(first) is None
+        await mass_sync_lock.release('job_1')
+        assert await mass_sync_lock.acquire(second) is None
+
+    @pytest.mark.asyncio
+    async def test_refresh_while_running(self, monkeypatch):
+        monkeypatch.setattr(settings, 'SYNC_MASS_LOCK_TTL', 0.06)
+        mass_sync_lock = MemoryMassSyncLock()
+        monkeypatch.setattr(
+            worker_module,
+            'get_mass_sync_lock',
+            lambda: mass_sync_lock,
+        )
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='all')
+        await mass_sync_lock.acquire(
+            MassSyncHolder(job.id, 'Иванов', time.time()),
+        )
+
+        refresh_task = asyncio.create_task(
+            worker_module.refresh_mass_sync(job),
+        )
+        await asyncio.sleep(0.2)
+        assert (await mass_sync_lock.get()).job_id == job.id
+        refresh_task.cancel()
+        await asyncio.sleep(0.1)
+        assert await mass_sync_lock.get() is None
+
+    @pytest.mark.asyncio
+    async def test_headless_run_respects_lock(self, monkeypatch):
+        mass_sync_lock = MemoryMassSyncLock()
+        monkeypatch.setattr(
+            sync_referents_command,
+            'get_mass_sync_lock',
+            lambda: mass_sync_lock,
+        )
+        await mass_sync_lock.acquire(
+            MassSyncHolder('bot_job', 'Иванов', time.time()),
+        )
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='all')
+
+        with pytest.raises(CommandError, match='bot_job'):
+            await sync_referents_command.acquire_mass_sync(
+                job,
+                CustomUser(name='sync'),
+            )
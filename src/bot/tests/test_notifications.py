@@ -0,0 +1,70 @@
+import time
+import asyncio
+
+from collections import Counter
+
+import pytest
+
+from aiogram.methods import SendMessage
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.exceptions import TelegramForbiddenError
+
+from src.bot import notifications
+from src.bot.notifications import TokenBucket
+from src.bot.notifications import NotificationSender
+
+
+class TestNotificationSender:
+    @pytest.mark.asyncio
+    async def test_token_bucket(self):
+        bucket = TokenBucket(rate=100, capacity=5)
+        started_at = time.monotonic()
+        for _ in range(15):
+            await bucket.acquire()
+
+        assert time.monotonic() - started_at == pytest.approx(0.1, abs=0.05)
+
+    @pytest.mark.asyncio
+    async def test_retry_after_and_outcomes(self):
+        notification_sender = NotificationSender(
+            rate=1000,
+            chat_rate=1000,
+            retry_attempts=3,
+        )
+        method = SendMessage(chat_id=1, text='')
+        attempts = Counter()
+
+        async def send(chat_id: int):
+            attempts[chat_id] += 1
+            if chat_id == 1 and attempts[chat_id] == 1:
+                raise TelegramRetryAfter(method, 'Too Many Requests', 0)
+            if chat_id == 2:
+                raise TelegramForbiddenError(method, 'bot was blocked')
+            if chat_id == 3:
+                raise TelegramRetryAfter(method, 'Too Many Requests', 0)
+
+        outcomes = await asyncio.gather(*(
+            notification_sender.deliver(chat_id, str(chat_id), send)
+            for chat_id in (1, 2, 3, 4)
+        ))
+
+        assert [(o.status, o.attempts) for o in outcomes] == [
+            ('sent', 2),
+            ('blocked', 1),
+            ('failed', 3),
+            ('sent', 1),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_idle_chat_buckets_pruned(self, monkeypatch):
+        monkeypatch.setattr(notifications, 'CHAT_BUCKETS_PRUNE_SIZE', 2)
+        monkeypatch.setattr(notifications, 'CHAT_BUCKET_IDLE', 0)
+        notification_sender = NotificationSender(rate=1000, chat_rate=1)
+        notification_sender.get_chat_bucket(1)
+        await notification_sender.get_chat_bucket(2).acquire()
+
+        notification_sender.get_chat_bucket(3)
+
+        assert set(notification_sender.chat_buckets) == {2, 3}, \
+            'бакет с потраченным токеном остается'
+        assert notification_sender._prune_at == 2
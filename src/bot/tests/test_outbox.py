@@ -0,0 +1,137 @@
+import asyncio
+
+from datetime import timedelta
+
+import pytest
+
+from aiogram import types
+
+from django.conf import settings
+from django.utils import timezone
+
+from src.models import Notification
+from src.bot.outbox import save_outcomes
+from src.bot.outbox import dump_reply_markup
+from src.bot.outbox import load_reply_markup
+from src.bot.outbox import claim_notifications
+from src.bot.notifications import DeliveryOutcome
+
+
+@pytest.fixture
+def notifications(django_db):
+    Notification.objects.all().delete()
+    yield
+    Notification.objects.all().delete()
+
+
+class TestNotificationOutbox:
+    def test_reply_markup(self):
+        keyboard = types.InlineKeyboardMarkup(inline_keyboard=[[
+            types.InlineKeyboardButton(text='Взять', callback_data='task_1'),
+        ]])
+
+        assert load_reply_markup(dump_reply_markup(keyboard)) == keyboard
+        assert isinstance(
+            load_reply_markup(dump_reply_markup(types.ReplyKeyboardRemove())),
+            types.ReplyKeyboardRemove,
+        )
+        assert load_reply_markup(dump_reply_markup(None)) is None
+
+    @pytest.mark.asyncio
+    async def test_claim_by_priority_with_lease(
+            self,
+            notifications,
+            monkeypatch,
+    ):
+        monkeypatch.setattr(settings, 'TG_OUTBOX_LEASE', 60)
+        bulk = await Notification.objects.acreate(
+            chat_id=1,
+            text='bulk',
+            priority=Notification.BULK,
+        )
+        escalation = await Notification.objects.acreate(
+            chat_id=2,
+            text='escalation',
+            priority=Notification.ESCALATION,
+        )
+        await Notification.objects.acreate(
+            chat_id=3,
+            text='later',
+            next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        claimed = await claim_notifications(10)
+
+        assert [n.id for n in claimed] == [escalation.id, bulk.id]
+        assert all(n.attempts == 1 for n in claimed)
+        assert all(n.next_attempt_at > timezone.now() for n in claimed)
+        # под арендой уведомления не достаются второму диспетчеру
+        assert await claim_notifications(10) == []
+
+    @pytest.mark.asyncio
+    async def test_concurrent_claims_do_not_overlap(self, notifications):
+        created = await Notification.objects.abulk_create([
+            Notification(chat_id=chat_id, text='test')
+            for chat_id in range(10)
+        ])
+
+        # запросы двух диспетчеров чередуются: оба выбирают одни
+        # и те же строки до того, как первый успеет их арендовать
+        first, second = await asyncio.gather(
+            claim_notifications(10),
+            claim_notifications(10),
+        )
+
+        first_ids = {notification.id for notification in first}
+        second_ids = {notification.id for notification in second}
+        assert not first_ids & second_ids
+        assert first_ids | second_ids == {n.id for n in created}
+
+    @pytest.mark.asyncio
+    async def test_retry_and_dead_letter(self, notifications, monkeypatch):
+        monkeypatch.setattr(settings, 'TG_OUTBOX_MAX_ATTEMPTS', 2)
+        monkeypatch.setattr(settings, 'TG_OUTBOX_RETRY_DELAY', 30)
+        notification = await Notification.objects.acreate(chat_id=1, text='1')
+        failed = DeliveryOutcome(
+            chat_id=1,
+            name='1',
+            status='failed',
+            error='Bad Gateway',
+            retryable=True,
+        )
+
+        await save_outcomes(await claim_notifications(1), [failed])
+        await notification.arefresh_from_db()
+        assert notification.status == 'pending'
+        assert notification.last_error == 'Bad Gateway'
+        assert notification.next_attempt_at > (
+            timezone.now() + timedelta(seconds=25)
+        )
+
+        notification.next_attempt_at = timezone.now()
+        await notification.asave()
+        await save_outcomes(await claim_notifications(1), [failed])
+        await notification.arefresh_from_db()
+        assert notification.attempts == 2
+        assert notification.status == 'dead'
+
+    @pytest.mark.asyncio
+    async def test_sent_and_blocked(self, notifications):
+        sent = await Notification.objects.acreate(chat_id=1, text='1')
+        blocked = await Notification.objects.acreate(chat_id=2, text='2')
+
+        await save_outcomes(await claim_notifications(10), [
+            DeliveryOutcome(chat_id=1, name='1'),
+            DeliveryOutcome(
+                chat_id=2,
+                name='2',
+                status='blocked',
+                error='bot was blocked by the user',
+            ),
+        ])
+        await sent.arefresh_from_db()
+        await blocked.arefresh_from_db()
+
+        assert sent.status == 'sent'
+        assert sent.sent_at is not None
+        assert blocked.status == 'dead'
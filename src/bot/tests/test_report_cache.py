@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+from collections import Counter
+
+import pytest
+
+from aiogram import types
+
+from src.entities.ReportCache import ReportCache
+
+
+class FakeDocumentMessage:
+    def __init__(self):
+        self.sent = []
+
+    async def answer_document(self, document, caption: str):
+        self.sent.append(document)
+        file_id = document if isinstance(document, str) else (
+            f'file_{len(self.sent)}'
+        )
+        return SimpleNamespace(
+            document=SimpleNamespace(file_id=file_id),
+        )
+
+
+class TestReportCache:
+    @pytest.mark.asyncio
+    async def test_file_id_reused(self):
+        report_cache = ReportCache(max_bytes=1024)
+        message = FakeDocumentMessage()
+        builds = Counter()
+
+        async def build(data: bytes):
+            builds[data] += 1
+            return types.BufferedInputFile(data, filename='report.json')
+
+        for _ in range(2):
+            await report_cache.answer_document(
+                message,
+                lambda: build(b'{"report": 1}'),
+                caption='',
+                key='sync_report_1',
+            )
+            await report_cache.answer_document(
+                message,
+                lambda: build(b'{"shift": 1}'),
+                caption='',
+            )
+
+        assert builds == {b'{"report": 1}': 1, b'{"shift": 1}': 2}
+        assert isinstance(message.sent[0], types.BufferedInputFile)
+        assert message.sent[2:] == ['file_1', 'file_2']
+
+    def test_evicted_by_size(self):
+        report_cache = ReportCache(max_bytes=100)
+        report_cache.put(
+            types.BufferedInputFile(b'1' * 60, filename='a.json'),
+            key='a',
+        )
+        report_cache.put(types.BufferedInputFile(b'2' * 60, filename='b.json'))
+
+        assert not report_cache.has('a')
+        assert report_cache.size == 60
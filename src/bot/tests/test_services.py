@@ -0,0 +1,122 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+import aiohttp
+
+from aiogram.exceptions import TelegramBadRequest
+
+from django.conf import settings
+
+from src.bot import services
+from src.bot.services import send_documents
+from src.bot.services import save_doc_from_tg_to_disk
+from src.bot.services import split_documents_to_media_groups
+
+
+class FakeDocumentsBot:
+    """file_id с префиксом stale телеграм не принимает,
+    файлы с префиксом broken обрываются при скачивании
+    """
+
+    def __init__(self):
+        self.downloaded = []
+        self.active_downloads = 0
+        self.peak_downloads = 0
+
+    async def send_media_group(self, chat_id: int, media: list):
+        if any(item.media.startswith('stale') for item in media):
+            raise TelegramBadRequest(None, 'wrong file identifier')
+        return [self._message() for _ in media]
+
+    async def send_document(self, chat_id: int, document, caption=None):
+        if isinstance(document, str) and document.startswith('stale'):
+            raise TelegramBadRequest(None, 'wrong file identifier')
+        return self._message()
+
+    async def send_photo(self, chat_id: int, photo, caption=None):
+        return await self.send_document(chat_id, photo, caption)
+
+    async def get_file(self, file_id: str):
+        return SimpleNamespace(file_path=file_id)
+
+    async def download_file(
+            self,
+            file_path: str,
+            destination: str | None = None,
+            chunk_size: int = 65536,
+    ):
+        self.downloaded.append(file_path)
+        if destination is None:
+            return SimpleNamespace(read=lambda: b'0' * 10)
+        self.active_downloads += 1
+        self.peak_downloads = max(self.peak_downloads, self.active_downloads)
+        try:
+            with open(destination, 'wb') as file:
+                for _ in range(3):
+                    await asyncio.sleep(0.01)
+                    if file_path.startswith('broken'):
+                        raise aiohttp.ClientPayloadError('connection lost')
+                    file.write(b'0' * chunk_size)
+        finally:
+            self.active_downloads -= 1
+
+    @staticmethod
+    def _message():
+        return SimpleNamespace(
+            document=SimpleNamespace(file_size=100),
+            photo=None,
+        )
+
+
+class TestDocumentRelay:
+    def test_split_documents(self):
+        tg_documents = {f'image_act_{n}.jpg': f'photo_{n}' for n in range(12)}
+        tg_documents['act.pdf'] = 'document_1'
+
+        media_groups = split_documents_to_media_groups(tg_documents)
+
+        assert [len(media_group) for media_group in media_groups] == [10, 2, 1]
+        assert media_groups[-1] == {'act.pdf': 'document_1'}
+
+    @pytest.mark.asyncio
+    async def test_download_only_stale(self):
+        bot = FakeDocumentsBot()
+        relay_stats = await send_documents(
+            bot,
+            1,
+            {
+                'image_act_1.jpg': 'photo_1',
+                'image_act_2.jpg': 'stale_photo_2',
+                'act_1.pdf': 'document_1',
+                'act_2.pdf': 'document_2',
+            },
+        )
+
+        assert bot.downloaded == ['stale_photo_2']
+        assert relay_stats.relayed == 3
+        assert relay_stats.saved_bytes == 600
+        assert relay_stats.downloaded_bytes == 10
+
+    @pytest.mark.asyncio
+    async def test_archive_documents(self, monkeypatch, tmp_path):
+        bot = FakeDocumentsBot()
+        monkeypatch.setattr(services, 'get_bot', lambda: bot)
+        monkeypatch.setattr(settings, 'TG_ARCHIVE_CONCURRENCY', 2)
+        monkeypatch.setattr(settings, 'TG_ARCHIVE_CHUNK_SIZE', 4)
+        monkeypatch.chdir(tmp_path)
+        tg_docs = {f'act_{n}.pdf': f'document_{n}' for n in range(5)}
+        tg_docs['act_broken.pdf'] = 'broken_document'
+
+        save_report = await save_doc_from_tg_to_disk('SD1234567', tg_docs)
+
+        assert bot.peak_downloads == 2
+        assert [doc_name for doc_name, _ in save_report] == [
+            f'act_{n}.pdf' for n in range(5)
+        ]
+        saved_files = sorted(
+            path.name for path in (tmp_path / 'media/docs/SD1234567').iterdir()
+        )
+        assert saved_files == [f'act_{n}.pdf' for n in range(5)]
+        assert (tmp_path / save_report[0][1]).stat().st_size == 12
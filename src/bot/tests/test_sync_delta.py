@@ -0,0 +1,46 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import pytest
+
+from django.conf import settings
+
+from src.bot.scheme import SyncStatus
+from src.bot.handlers.synchronizations.delta import is_sync_needed
+from src.bot.handlers.synchronizations.delta import format_skipped_count
+from src.bot.handlers.synchronizations.sync_report import \
+    create_sync_report
+
+
+class TestDeltaSync:
+    def test_is_sync_needed(self, monkeypatch):
+        monkeypatch.setattr(settings, 'SYNC_DELTA_MAX_AGE', 24)
+        now = datetime(2024, 9, 1, 12, tzinfo=timezone.utc)
+        synced_at = now - timedelta(hours=1)
+
+        assert is_sync_needed(None, None, now)
+        assert not is_sync_needed(synced_at, None, now)
+        assert not is_sync_needed(synced_at, synced_at - timedelta(1), now)
+        assert is_sync_needed(synced_at, now - timedelta(minutes=5), now)
+        assert is_sync_needed(now - timedelta(hours=25), None, now)
+
+    @pytest.mark.asyncio
+    async def test_skipped_count_in_report_message(self):
+        sync_statuses = [
+            SyncStatus('rest_1', 'http://1', 'ok'),
+            SyncStatus('rest_2', 'http://2', 'error', 'timeout'),
+        ]
+        skipped_statuses = [SyncStatus('rest_3', 'http://3', 'skipped')]
+
+        message, sync_report = await create_sync_report(sync_statuses)
+
+        assert message == (
+            'Результат синхронизации:\n'
+            'Успешно: <code>1</code>Ошибок: <code>1</code>'
+        )
+        assert len(sync_report['error']) == 1
+        assert format_skipped_count([]) == ''
+        assert format_skipped_count(skipped_statuses) == (
+            '\nПропущено (без изменений): <code>1</code>'
+        )
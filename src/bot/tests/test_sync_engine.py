@@ -0,0 +1,521 @@
+import json
+import asyncio
+
+from types import SimpleNamespace
+from collections import Counter
+from dataclasses import asdict
+
+import pytest
+import aiohttp
+
+from aiohttp import web
+
+from django.conf import settings
+
+from src.models import CustomUser
+from src.models import ServerType
+from src.models import SyncReport
+from src.bot.scheme import SyncJob
+from src.bot.scheme import SyncStatus
+from src.bot.scheme import SyncTarget
+from src.bot.utils import sync_referents
+from src.bot.handlers.synchronizations.engine import SyncEngine
+from src.bot.handlers.synchronizations.engine import get_topology_upstreams
+from src.bot.handlers.synchronizations.client import SyncHttpClient
+from src.bot.handlers.synchronizations.progress import SyncProgress
+from src.bot.handlers.synchronizations.retry import RetryPolicy
+from src.bot.handlers.synchronizations.jobs import MemorySyncQueue
+from src.bot.handlers.synchronizations.jobs import RedisSyncQueue
+from src.bot.handlers.synchronizations.worker import SyncWorker
+from src.bot.handlers.synchronizations.worker import get_sync_title
+from src.bot.handlers.synchronizations.worker import get_topology_franchise
+from src.bot.handlers.synchronizations import cancel as cancel_module
+from src.bot.handlers.synchronizations.shards import select_shard
+from src.bot.handlers.synchronizations.shards import make_shard_jobs
+from src.entities.SyncPhaseStats import SyncPhaseStats
+from src.entities.MassSyncLock import MASS_SYNC_CHOICES
+
+
+def make_targets(count: int, hosts: int, franchises: int) -> list:
+    return [
+        SyncTarget(
+            server_name=f'server_{number}',
+            web_link=f'https://10.0.0.{number % hosts}:9000/',
+            host=f'10.0.0.{number % hosts}',
+            franchise_id=number % franchises,
+        )
+        for number in range(count)
+    ]
+
+
+class TestSyncEngine:
+    @pytest.mark.asyncio
+    async def test_limits(self, fake_sync_referents):
+        active = Counter()
+        peaks = Counter()
+
+        async def respond(sync_status: SyncStatus):
+            host = sync_status.web_link.split('/')[2].split(':')[0]
+            keys = ('global', f'host_{host}')
+            for key in keys:
+                active[key] += 1
+                peaks[key] = max(peaks[key], active[key])
+            await asyncio.sleep(0.01)
+            for key in keys:
+                active[key] -= 1
+            if sync_status.server_name.endswith('7'):
+                sync_status.status = 'error'
+
+        fake_sync_referents.respond = respond
+        targets = make_targets(60, hosts=5, franchises=3)
+        sync_engine = SyncEngine(global_limit=8, host_limit=2)
+        sync_statuses = await sync_engine.run(targets)
+
+        assert [st.server_name for st in sync_statuses] == \
+               [target.server_name for target in targets]
+        assert peaks['global'] <= 8
+        assert max(
+            peak for key, peak in peaks.items() if key.startswith('host_')
+        ) <= 2
+        assert sync_engine.stats.total == 60
+        assert sync_engine.stats.errors == 6
+        assert sync_engine.stats.ok == 54
+        assert sync_engine.stats.error_rate == pytest.approx(0.1)
+        assert sync_engine.stats.throughput > 0
+
+    @pytest.mark.asyncio
+    async def test_retry_only_transient_errors(self, fake_sync_referents):
+        async def respond(sync_status: SyncStatus):
+            server_name = sync_status.server_name
+            if server_name == 'server_0' and \
+                    fake_sync_referents.count(server_name) < 3:
+                sync_status.status = 'error'
+                sync_status.error_class = 'ServerDisconnectedError'
+            if server_name == 'server_1':
+                sync_status.status = 'error'
+                sync_status.error_class = 'ClientResponseError'
+                sync_status.http_status = 401
+
+        fake_sync_referents.respond = respond
+        policy = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.02)
+        sync_engine = SyncEngine(retry_policy=policy)
+        sync_statuses = await sync_engine.run(
+            make_targets(2, hosts=1, franchises=1),
+        )
+
+        assert sync_statuses[0].status == 'ok'
+        assert sync_statuses[0].attempts == 3
+        assert sync_statuses[1].status == 'error'
+        assert sync_statuses[1].attempts == 1
+        assert Counter(fake_sync_referents.synced) == \
+               {'server_0': 3, 'server_1': 1}
+
+    @pytest.mark.asyncio
+    async def test_timeout_backoff(self, fake_sync_referents, monkeypatch):
+        async def respond(sync_status: SyncStatus):
+            if len(fake_sync_referents.calls) == 1:
+                sync_status.status = 'error'
+                sync_status.error_class = 'TimeoutError'
+
+        fake_sync_referents.respond = respond
+        monkeypatch.setattr(settings, 'SYNC_TIMEOUT_MAX', 5.0)
+        policy = RetryPolicy(attempts=3, base_delay=0.01, max_delay=0.02)
+        sync_engine = SyncEngine(
+            retry_policy=policy,
+            host_timeouts={
+                ('10.0.0.0', 9000): aiohttp.ClientTimeout(total=3.0),
+            },
+        )
+        sync_statuses = await sync_engine.run(
+            make_targets(1, hosts=1, franchises=1),
+        )
+
+        assert sync_statuses[0].status == 'ok'
+        assert [
+            call.timeout.total for call in fake_sync_referents.calls
+        ] == [3.0, 5.0]
+        assert len(sync_engine.sync_times[('10.0.0.0', 9000)]) == 1
+
+    @pytest.mark.asyncio
+    async def test_restaurants_wait_for_franchise_transits(
+            self,
+            fake_sync_referents,
+    ):
+        async def respond(sync_status: SyncStatus):
+            if sync_status.server_name == 'transit_1':
+                sync_status.status = 'error'
+                sync_status.error_class = 'ClientResponseError'
+
+        fake_sync_referents.respond = respond
+        targets = [
+            SyncTarget('transit_1', 'https://10.0.1.1:9000/', '10.0.1.1',
+                       franchise_id=1, server_type='Transit'),
+            SyncTarget('transit_2', 'https://10.0.1.2:9000/', '10.0.1.2',
+                       franchise_id=2, server_type='Transit'),
+            SyncTarget('rest_1', 'https://10.0.0.1:9000/', '10.0.0.1',
+                       franchise_id=1),
+            SyncTarget('rest_2', 'https://10.0.0.2:9000/', '10.0.0.2',
+                       franchise_id=2),
+            SyncTarget('rest_3', 'https://10.0.0.3:9000/', '10.0.0.3',
+                       franchise_id=3),
+        ]
+        upstreams = get_topology_upstreams(targets)
+        assert upstreams == {2: [0], 3: [1]}
+
+        sync_statuses = await SyncEngine().run(targets, upstreams=upstreams)
+
+        assert [st.status for st in sync_statuses] == \
+               ['error', 'ok', 'error', 'ok', 'ok']
+        assert sync_statuses[2].error_class == 'UpstreamFailed'
+        synced = fake_sync_referents.synced
+        assert 'rest_1' not in synced
+        assert synced.index('rest_2') > synced.index('transit_2')
+
+    @pytest.mark.asyncio
+    async def test_spread_start(self, fake_sync_referents):
+        sync_engine = SyncEngine(spread=0.5)
+        run_started_at = asyncio.get_running_loop().time()
+        await sync_engine.run(make_targets(5, hosts=5, franchises=1))
+
+        offsets = sorted(
+            call.started_at - run_started_at
+            for call in fake_sync_referents.calls
+        )
+        assert offsets[-1] >= 0.2
+        assert offsets[-1] - offsets[0] >= 0.1
+
+    @pytest.mark.asyncio
+    async def test_unreachable_hosts_fail_fast(self, fake_sync_referents):
+        targets = make_targets(4, hosts=2, franchises=1)
+        sync_engine = SyncEngine(unreachable_hosts={('10.0.0.1', 9000)})
+        sync_statuses = await sync_engine.run(targets)
+
+        assert [st.status for st in sync_statuses] == \
+               ['ok', 'error', 'ok', 'error']
+        assert sync_statuses[1].error_class == 'HostUnreachable'
+        assert set(fake_sync_referents.synced) == {'server_0', 'server_2'}
+        assert sync_engine.stats.errors == 2
+
+
+class FakeBot:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(
+            self,
+            text,
+            chat_id,
+            message_id,
+            reply_markup=None,
+    ):
+        self.edits.append(text)
+
+
+class TestSyncProgress:
+    @pytest.mark.asyncio
+    async def test_edits_are_throttled(self):
+        bot = FakeBot()
+        progress = SyncProgress(
+            bot,
+            1,
+            1,
+            'Синхронизация',
+            100,
+            interval=0.05,
+        )
+        for number in range(99):
+            status = 'error' if number % 10 == 0 else 'ok'
+            await progress.update(SyncStatus('rest', 'link', status=status))
+        assert not bot.edits
+
+        await asyncio.sleep(0.06)
+        await progress.update(SyncStatus('rest', 'link', status='ok'))
+        assert not bot.edits, 'последний результат не редактирует'
+
+        progress.total = 1000
+        await progress.update(SyncStatus('rest', 'link', status='ok'))
+        assert len(bot.edits) == 1
+        assert '101/1000' in bot.edits[0]
+        assert progress.errors == 10
+
+
+class TestSyncCancel:
+    @pytest.mark.asyncio
+    async def test_cancel_keeps_finished_results(
+            self,
+            fake_sync_referents,
+            monkeypatch,
+    ):
+        async def respond(sync_status: SyncStatus):
+            if sync_status.server_name != 'server_0':
+                await asyncio.sleep(10)
+
+        fake_sync_referents.respond = respond
+        monkeypatch.setattr(settings, 'SYNC_CANCEL_CHECK_INTERVAL', 0.01)
+        queue = MemorySyncQueue()
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+        sync_engine = SyncEngine()
+        targets = make_targets(3, hosts=3, franchises=1)
+
+        async def cancel_after_first_result(sync_status: SyncStatus):
+            await queue.cancel(job.id)
+
+        cancelled = await SyncWorker(queue, None).run_cancellable(
+            job,
+            sync_engine.run(targets, cancel_after_first_result),
+        )
+
+        assert cancelled
+        assert [
+            sync_status and sync_status.server_name
+            for sync_status in sync_engine.sync_statuses
+        ] == ['server_0', None, None]
+
+    @pytest.mark.asyncio
+    async def test_cancel_needs_perm_or_initiator(
+            self,
+            django_db,
+            monkeypatch,
+    ):
+        async def has_perm(perm_codename: str, employee: CustomUser):
+            return False
+
+        monkeypatch.setattr(cancel_module, 'has_perm', has_perm)
+        queue = MemorySyncQueue()
+        monkeypatch.setattr(cancel_module, 'get_sync_queue', lambda: queue)
+        initiator, _ = await CustomUser.objects.aget_or_create(
+            login='cancel_initiator',
+            defaults={'name': 'Иванов', 'tg_id': 3},
+        )
+        stranger, _ = await CustomUser.objects.aget_or_create(
+            login='cancel_stranger',
+            defaults={'name': 'Петров', 'tg_id': 4},
+        )
+        await SyncReport.objects.acreate(
+            new_employee=initiator,
+            server_type=(
+                await ServerType.objects.aget_or_create(name='Report')
+            )[0],
+            user_choice='rest_all',
+            status='running',
+            job_id='job_1',
+        )
+        answers = []
+
+        async def answer(text: str):
+            answers.append(text)
+
+        query = SimpleNamespace(
+            data='sync_cancel_job_1',
+            from_user=SimpleNamespace(full_name='user'),
+            answer=answer,
+        )
+
+        await cancel_module.cancel_sync(query, stranger)
+        assert not await queue.is_cancelled('job_1')
+
+        await cancel_module.cancel_sync(query, initiator)
+        assert await queue.is_cancelled('job_1')
+        assert answers[0] == 'Нет прав на отмену синхронизации'
+
+    @pytest.mark.asyncio
+    async def test_cancelled_in_queue_closes_report(self, django_db):
+        queue = MemorySyncQueue()
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+        sync_report = await SyncReport.objects.acreate(
+            server_type=(
+                await ServerType.objects.aget_or_create(name='Report')
+            )[0],
+            user_choice='rest_group_irb',
+            status='running',
+            job_id=job.id,
+        )
+        await queue.put(job)
+        await queue.cancel(job.id)
+
+        await SyncWorker(queue, None).run_job(await queue.get(timeout=1))
+
+        await sync_report.arefresh_from_db()
+        assert sync_report.status == 'cancelled'
+        assert sync_report.finished_at is not None
+
+
+class TestSyncWorker:
+    def test_topology_choice(self):
+        assert get_topology_franchise('topology') == 'all'
+        assert get_topology_franchise('topology_irb') == 'irb'
+        job = SyncJob(employee_id=1, server_type='All',
+                      user_choice='topology')
+        assert get_sync_title(job) == \
+               'Синхронизация транзитов и всех ресторанов'
+        assert job.user_choice in MASS_SYNC_CHOICES
+
+    @pytest.mark.asyncio
+    async def test_ack_job_taken_elsewhere(self):
+        queue = RedisSyncQueue('localhost', 6379)
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+        try:
+            await queue.ack(job)
+        finally:
+            await queue.close()
+
+    @pytest.mark.asyncio
+    async def test_manual_job_runs_during_spread_run(self):
+        queue = MemorySyncQueue()
+        sync_worker = SyncWorker(queue, None)
+        spread_job = SyncJob(
+            employee_id=1,
+            server_type='Report',
+            user_choice='rest_all',
+            spread=3600,
+        )
+        manual_job = SyncJob(employee_id=2, server_type='Report',
+                             user_choice='rest_group_irb')
+        spread_started = asyncio.Event()
+        manual_done = asyncio.Event()
+
+        async def process(job: SyncJob):
+            if job.spread:
+                spread_started.set()
+                await asyncio.sleep(3600)
+            manual_done.set()
+
+        sync_worker.process = process
+        await queue.put(spread_job)
+        await queue.put(manual_job)
+        worker_task = asyncio.create_task(sync_worker.run_forever())
+        try:
+            await asyncio.wait_for(manual_done.wait(), timeout=3)
+            assert spread_started.is_set()
+            assert len(sync_worker._spread_runs) == 1
+        finally:
+            await sync_worker.stop(timeout=0)
+            await asyncio.wait_for(worker_task, timeout=3)
+        assert not sync_worker._spread_runs
+
+
+class TestSyncShards:
+    def test_shards_cover_targets(self):
+        targets = make_targets(300, hosts=40, franchises=7)
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+        shard_jobs = make_shard_jobs(job, 1, 4, targets)
+        shards = [shard_job.targets for shard_job in shard_jobs]
+        assert shards == [
+            select_shard(targets, shard_job) for shard_job in shard_jobs
+        ]
+        restored_job = SyncJob(**json.loads(json.dumps(asdict(shard_jobs[0]))))
+        assert restored_job.targets == shards[0], 'цели переживают очередь'
+        assert sorted(
+            target.server_name for shard in shards for target in shard
+        ) == sorted(target.server_name for target in targets)
+        shard_hosts = [{target.host for target in shard} for shard in shards]
+        assert sum(map(len, shard_hosts)) == 40, 'хост только в одном шарде'
+
+        job.server_type = 'All'
+        shard_franchises = [
+            {target.franchise_id for target in select_shard(targets, shard)}
+            for shard in make_shard_jobs(job, 1, 4, targets)
+        ]
+        assert sum(map(len, shard_franchises)) == 7
+
+    @pytest.mark.asyncio
+    async def test_collect_shards(self):
+        queue = MemorySyncQueue()
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+        for shard_job in make_shard_jobs(job, 1, 2, []):
+            status = SyncStatus(f'rest_{shard_job.shard_index}', 'link')
+            await queue.put_shard_message(job.id, {'result': vars(status)})
+            await queue.put_shard_message(
+                job.id,
+                {'shard': shard_job.shard_index, 'status': 'completed'},
+            )
+        received = []
+
+        async def on_result(sync_status: SyncStatus):
+            received.append(sync_status.server_name)
+
+        status, sync_statuses = await SyncWorker(queue, None).collect_shards(
+            job,
+            2,
+            on_result,
+        )
+        assert status == 'completed'
+        assert received == ['rest_0', 'rest_1']
+        assert len(sync_statuses) == 2
+
+    @pytest.mark.asyncio
+    async def test_spread_run_is_not_idle(self, monkeypatch):
+        monkeypatch.setattr(settings, 'SYNC_SHARD_IDLE_TIMEOUT', 0)
+        queue = MemorySyncQueue()
+        sync_worker = SyncWorker(queue, None)
+        job = SyncJob(employee_id=1, server_type='Report', user_choice='')
+
+        async def on_result(sync_status: SyncStatus):
+            pass
+
+        status, _ = await sync_worker.collect_shards(job, 1, on_result)
+        assert status == 'interrupted'
+
+        job.spread = 3.0
+
+        async def finish_shard_late():
+            await asyncio.sleep(1.5)
+            await queue.put_shard_message(
+                job.id,
+                {'shard': 0, 'status': 'completed'},
+            )
+
+        finish_task = asyncio.create_task(finish_shard_late())
+        status, _ = await sync_worker.collect_shards(job, 1, on_result)
+        await finish_task
+        assert status == 'completed'
+
+
+class TestSyncPhaseStats:
+    def test_percentiles_per_phase(self):
+        timings = [
+            {'connect': float(number), 'forcesyncrefs': 10.0}
+            for number in range(1, 101)
+        ]
+        timings.append({'forcesyncrefs': 10.0})
+        phase_stats = SyncPhaseStats.for_timings(timings)
+
+        assert [stat.phase for stat in phase_stats] == [
+            'connect',
+            'forcesyncrefs',
+        ]
+        connect, forcesyncrefs = phase_stats
+        assert connect.count == 100
+        assert connect.p50 == pytest.approx(50.5)
+        assert connect.p99 == pytest.approx(99.0, abs=0.1)
+        assert connect.max == 100.0
+        assert forcesyncrefs.count == 101
+        assert forcesyncrefs.p95 == 10.0
+
+    @pytest.mark.asyncio
+    async def test_trace_timings(self, unused_tcp_port):
+        async def handle(request):
+            await asyncio.sleep(0.05)
+            return web.Response(text='<td>TRANSIT</td>')
+
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', unused_tcp_port)
+        await site.start()
+        http_client = SyncHttpClient()
+        try:
+            sync_status = await sync_referents(
+                await http_client.get_session(),
+                f'http://127.0.0.1:{unused_tcp_port}/',
+                'rest',
+            )
+        finally:
+            await http_client.close()
+            await runner.cleanup()
+
+        assert sync_status.status == 'ok'
+        assert set(sync_status.timings) >= {'connects_page', 'forcesyncrefs'}
+        assert sync_status.timings['connects_page'] >= 40
+        assert sync_status.timings['forcesyncrefs'] >= 40
@@ -0,0 +1,46 @@
+import pytest
+
+from django.conf import settings
+
+from src.models import HostHealth
+from src.bot.handlers.synchronizations.health import update_sync_time
+from src.bot.handlers.synchronizations.health import get_sync_timeout
+from src.bot.handlers.synchronizations.health import update_host_health
+
+
+class TestHostHealth:
+    def test_update_host_health(self):
+        health = HostHealth(host='10.0.0.1', port=9000)
+        assert health.last_checked_at is None, 'строка без проверки'
+        update_host_health(health, None, 'timeout')
+        update_host_health(health, None, 'timeout')
+        assert health.consecutive_failures == 2
+        assert health.last_seen_at is None
+
+        update_host_health(health, 100.0, '')
+        update_host_health(health, 200.0, '')
+        assert health.consecutive_failures == 0
+        assert health.last_error == ''
+        assert health.last_seen_at == health.last_checked_at
+        assert health.latency_ms == pytest.approx(130.0)
+
+    def test_sync_timeout(self, monkeypatch):
+        monkeypatch.setattr(settings, 'SYNC_TIMEOUT', 7)
+        monkeypatch.setattr(settings, 'SYNC_TIMEOUT_MIN', 2.0)
+        monkeypatch.setattr(settings, 'SYNC_TIMEOUT_MAX', 20.0)
+        monkeypatch.setattr(settings, 'SYNC_CONNECT_TIMEOUT_MIN', 0.5)
+        assert get_sync_timeout(None).sock_read == 7
+
+        health = HostHealth(host='10.0.0.1', port=9000, latency_ms=50.0)
+        update_sync_time(health, 100.0)
+        assert health.sync_time_var_ms == 50.0
+        timeout = get_sync_timeout(health)
+        assert timeout.sock_read == 2.0
+        assert timeout.sock_connect == 0.5
+        assert timeout.total == 2.5
+
+        for sample_ms in (9000.0, 12000.0, 15000.0):
+            update_sync_time(health, sample_ms)
+        assert health.sync_time_ms > 100.0
+        assert get_sync_timeout(health).sock_read == 20.0
+        assert get_sync_timeout(health).total == 20.0
@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+from asgiref.sync import sync_to_async
+
+from src.models import CustomUser
+from src.models import ServerType
+from src.bot.scheme import SyncStatus
+from src.entities.SyncReportDiff import SyncReportDiff
+from src.bot.handlers.synchronizations.sync_report import format_report_diff
+from src.bot.handlers.synchronizations.sync_report import \
+    report_save_in_db
+from src.bot.handlers.synchronizations.sync_report import \
+    prepare_report_as_file
+
+
+class TestSyncReportDiff:
+    def test_format_report_diff(self):
+        report_diff = SyncReportDiff(
+            report_id=2,
+            previous_report_id=1,
+            new_errors=[
+                {'server_name': 'A', 'msg': 'timeout', 'prev_msg': 'ok'},
+            ],
+            recovered=[{'server_name': 'B'}],
+            still_failing=[
+                {'server_name': 'C', 'msg': '403', 'prev_msg': '401'},
+                {'server_name': 'D', 'msg': 'x', 'prev_msg': 'x'},
+            ],
+        )
+        message = format_report_diff(report_diff)
+
+        assert [error['server_name'] for error in report_diff.changed_errors] \
+               == ['C']
+        assert 'A - timeout\n' in message
+        assert 'C - 401 → 403' in message
+        assert 'D - ' not in message
+
+    def test_no_previous_report(self):
+        message = format_report_diff(SyncReportDiff(report_id=1))
+        assert message == 'Нет предыдущей синхронизации для сравнения'
+
+    @pytest.mark.asyncio
+    async def test_changed_only_compared_with_changed_only(self, django_db):
+        employee, _ = await CustomUser.objects.aget_or_create(
+            login='report_test',
+            defaults={'name': 'Иванов', 'tg_id': 2},
+        )
+        await ServerType.objects.aget_or_create(name='Report')
+
+        async def save_report(changed_only: bool, status: str):
+            return await report_save_in_db(
+                employee,
+                'Report',
+                [SyncStatus('rest_1', 'http://1', status, status)],
+                'rest_group_delta',
+                changed_only=changed_only,
+            )
+
+        changed_report = await save_report(True, 'error')
+        await save_report(False, 'ok')
+        sync_report = await save_report(True, 'ok')
+
+        report_diff = await sync_to_async(SyncReportDiff.for_report)(
+            sync_report,
+        )
+
+        assert sync_report.changed_only
+        assert report_diff.previous_report_id == changed_report.id
+        assert report_diff.recovered == [
+            {'server_name': 'rest_1', 'web_link': 'http://1'},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_compared_with_completed_report(self, django_db):
+        employee, _ = await CustomUser.objects.aget_or_create(
+            login='report_test',
+            defaults={'name': 'Иванов', 'tg_id': 2},
+        )
+        await ServerType.objects.aget_or_create(name='Report')
+
+        async def save_report(status: str, sync_statuses: list[SyncStatus]):
+            return await report_save_in_db(
+                employee,
+                'Report',
+                sync_statuses,
+                'rest_group_cancel',
+                status=status,
+            )
+
+        completed_report = await save_report('completed', [
+            SyncStatus('rest_1', 'http://1', 'error', 'timeout'),
+            SyncStatus('rest_2', 'http://2', 'ok', 'ok'),
+        ])
+        await save_report('cancelled', [
+            SyncStatus('rest_1', 'http://1', 'ok', 'ok'),
+        ])
+        sync_report = await save_report('completed', [
+            SyncStatus('rest_1', 'http://1', 'error', 'timeout'),
+            SyncStatus('rest_2', 'http://2', 'ok', 'ok'),
+        ])
+
+        report_diff = await sync_to_async(SyncReportDiff.for_report)(
+            sync_report,
+        )
+
+        assert report_diff.previous_report_id == completed_report.id
+        assert not report_diff.new_errors
+        assert not report_diff.recovered
+        assert [
+            error['server_name'] for error in report_diff.still_failing
+        ] == ['rest_1']
+
+
+class TestSyncReportFile:
+    @pytest.mark.asyncio
+    async def test_report_json_keeps_layout(self, django_db):
+        employee, _ = await CustomUser.objects.aget_or_create(
+            login='report_test',
+            defaults={'name': 'Иванов', 'tg_id': 2},
+        )
+        sync_report = await report_save_in_db(
+            employee,
+            (await ServerType.objects.aget_or_create(name='Report'))[0].name,
+            [
+                SyncStatus('rest_1', 'http://1', 'ok', 'ok', attempts=2),
+                SyncStatus('rest_2', 'http://2', 'error', 'timeout'),
+                SyncStatus('rest_3', 'http://3', 'skipped', 'без изменений'),
+            ],
+            'rest_all',
+        )
+
+        document = await prepare_report_as_file(sync_report.id)
+        final_report = json.loads(document.data)
+
+        assert list(final_report)[:4] == [
+            'initiator',
+            'start_at',
+            'server_type',
+            'report',
+        ]
+        assert list(final_report['report']) == ['errors', 'completed']
+        assert final_report['report']['completed'] == [{
+            'server_name': 'rest_1',
+            'web_link': 'http://1',
+            'status': 'ok',
+            'msg': 'ok',
+        }]
+        assert final_report['skipped'][0]['server_name'] == 'rest_3'
+        assert final_report['summary'] == {
+            'errors': 1,
+            'completed': 1,
+            'skipped': 1,
+        }
+        assert final_report['details'][0]['attempts'] == 2
+        assert final_report['changed_only'] is False
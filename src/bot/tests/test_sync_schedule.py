@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+
+from django.conf import settings
+
+from src.models import CustomUser
+from src.models import SyncSchedule
+from src.models import FranchiseOwner
+from src.entities.MassSyncLock import MemoryMassSyncLock
+from src.bot.handlers.synchronizations.engine import get_start_offsets
+from src.bot.handlers.synchronizations.jobs import MemorySyncQueue
+from src.bot.handlers.synchronizations import schedule as schedule_module
+from src.bot.handlers.synchronizations.worker import SYNC_SERVICE_USER_TG_ID
+
+
+class TestSyncSchedule:
+    def test_start_offsets(self):
+        offsets = get_start_offsets(100, 600.0)
+        slots = sorted(int(offset // 6.0) for offset in offsets)
+        assert slots == list(range(100))
+        assert get_start_offsets(3, 0.0) == [0.0, 0.0, 0.0]
+
+    def test_schedule_window(self):
+        schedule = SyncSchedule(
+            server_type='Report',
+            window_start=datetime(2024, 1, 1, 23, 30).time(),
+            window_end=datetime(2024, 1, 1, 1, 0).time(),
+        )
+        assert schedule.window_seconds == 90 * 60
+        assert schedule.user_choice == 'rest_all'
+
+        schedule.franchise = FranchiseOwner(name='IRB', alias='irb')
+        assert schedule.user_choice == 'rest_group_irb'
+        schedule.server_type = 'Transit'
+        assert schedule.user_choice == 'irb'
+        schedule.server_type = 'All'
+        assert schedule.user_choice == 'topology_irb'
+        schedule.franchise = None
+        assert schedule.user_choice == 'topology'
+
+    @pytest.mark.asyncio
+    async def test_run_schedule_puts_job_in_queue(
+            self,
+            django_db,
+            monkeypatch,
+    ):
+        sync_queue = MemorySyncQueue()
+        monkeypatch.setattr(
+            schedule_module,
+            'get_sync_queue',
+            lambda: sync_queue,
+        )
+        monkeypatch.setattr(
+            schedule_module,
+            'get_mass_sync_lock',
+            lambda: MemoryMassSyncLock(),
+        )
+        schedule = await SyncSchedule.objects.acreate(
+            name='Ночная',
+            server_type='Report',
+            window_start=datetime(2024, 1, 1, 23, 0).time(),
+            window_end=datetime(2024, 1, 1, 23, 30).time(),
+        )
+
+        await schedule_module.run_sync_schedule(schedule.id)
+
+        job = await sync_queue.get(timeout=1)
+        assert job.user_choice == 'rest_all'
+        assert job.spread == 30 * 60
+        await schedule.arefresh_from_db()
+        assert schedule.last_run_at is not None
+        service_user = await CustomUser.objects.aget(id=job.employee_id)
+        assert service_user.login == settings.SYNC_SERVICE_USER
+        assert service_user.tg_id == SYNC_SERVICE_USER_TG_ID
+        assert not service_user.is_active
@@ -1,7 +1,9 @@
 import re
+import time
 import asyncio
 import logging
 
+from typing import AsyncIterator
 from urllib.parse import urljoin
 
 import aiohttp
@@ -14,8 +16,6 @@ from aiogram import html
 from aiogram import types
 from aiogram.utils.payload import decode_payload
 
-from bs4 import BeautifulSoup
-
 from django.contrib.auth.models import Permission
 from django.contrib.auth.models import Group as DjangoGroup
 
@@ -28,55 +28,136 @@ from src.bot.keyboards import get_user_activate_keyboard
 
 logger = logging.getLogger('support_bot')
 
+PROBE_CHUNK_SIZE = 4096
+
 
 async def sync_referents(
         session: ClientSession,
         web_server_url: str,
         server_name: str,
+        timeout: aiohttp.ClientTimeout | None = None,
 ) -> SyncStatus:
+    """timeout - таймауты сервера, по умолчанию таймаут сессии.
+    В sync_status.timings время фаз в мс, в том числе до ошибки
+    """
     logger.info('Запуск синхронизации для: %s', web_server_url)
     sync_status = SyncStatus(web_link=web_server_url, server_name=server_name)
     try:
         link_to_sync = urljoin(web_server_url, '/rk7api/v1/forcesyncrefs.xml')
-        check_conn = await check_conn_to_main_server(session, web_server_url)
+        check_conn = await check_conn_to_main_server(
+            session,
+            web_server_url,
+            timeout,
+            sync_status.timings,
+        )
         if not check_conn:
             sync_status.status = 'error'
             sync_status.msg = 'Нет соединения с вышестоящим транзитом'
-        async with session.get(link_to_sync) as response:
-            logger.debug('response_status: %s', response.status)
+        request_timings = {}
+        started_at = time.monotonic()
+        try:
+            async with session.get(
+                    link_to_sync,
+                    timeout=timeout or session.timeout,
+                    trace_request_ctx=request_timings,
+            ) as response:
+                logger.debug('response_status: %s', response.status)
+        finally:
+            add_request_timings(
+                sync_status.timings,
+                'forcesyncrefs',
+                started_at,
+                request_timings,
+            )
         return sync_status
-    except asyncio.TimeoutError:
+    except asyncio.TimeoutError as error:
         sync_status.status = 'error'
         sync_status.msg = 'Отсутствует подключение к серверу (timeout)'
+        sync_status.error_class = type(error).__name__
         return sync_status
     except aiohttp.ClientConnectionError as error:
         logger.debug('ClientConnectionError: %s', error.args)
         sync_status.status = 'error'
         sync_status.msg = 'Отсутствует подключение к серверу'
+        sync_status.error_class = type(error).__name__
         return sync_status
-    except aiohttp.ClientResponseError:
+    except aiohttp.ClientResponseError as error:
         sync_status.status = 'error'
         sync_status.msg = 'Ошибка авторизации'
+        sync_status.error_class = type(error).__name__
+        sync_status.http_status = error.status
         return sync_status
 
 
+class MainServerMatcher:
+    """Потоковый поиск подключения к вышестоящему серверу (TRANSIT/CENT)
+    в тексте html страницы Connects без построения дерева документа
+    """
+    pattern = re.compile(rb'>[^<]*?(TRANSIT|CENT)[^<]*')
+    max_tail = 1024
+
+    def __init__(self):
+        self._tail = b''
+        self.main_server = ''
+
+    def feed(self, chunk: bytes) -> bool:
+        buffer = self._tail + chunk
+        match = self.pattern.search(buffer)
+        if match:
+            self.main_server = match.group().lstrip(b'>').decode(
+                'utf-8',
+                'replace',
+            ).strip()
+            return True
+        # Сохраняем незакрытый текстовый узел, он может продолжиться
+        # в следующем куске ответа
+        last_tag_end = buffer.rfind(b'>')
+        if last_tag_end == -1 or last_tag_end < buffer.rfind(b'<'):
+            self._tail = b''
+            return False
+        self._tail = buffer[last_tag_end:]
+        if len(self._tail) > self.max_tail:
+            self._tail = b'>' + self._tail[-self.max_tail:]
+        return False
+
+
+async def find_main_server_in_stream(
+        chunks: AsyncIterator[bytes],
+) -> MainServerMatcher | None:
+    matcher = MainServerMatcher()
+    async for chunk in chunks:
+        if matcher.feed(chunk):
+            return matcher
+
+
 async def check_conn_to_main_server(
         session: ClientSession,
-        web_server_url: str
+        web_server_url: str,
+        timeout: aiohttp.ClientTimeout | None = None,
+        timings: dict[str, float] | None = None,
 ) -> bool:
     logger.debug('Старт проверки подключения к вышестоящему серверу')
     conn_tab = urljoin(web_server_url, 'Connects')
 
-    async with session.get(conn_tab) as response:
-        soup = BeautifulSoup(await response.text(), 'lxml')
-
-    main_server = soup.find_all(
-        string=[
-            re.compile('TRANSIT'),
-            re.compile('CENT')
-        ],
-    )
-    logger.debug('main_server: %s', main_server)
+    request_timings = {}
+    started_at = time.monotonic()
+    try:
+        async with session.get(
+                conn_tab,
+                timeout=timeout or session.timeout,
+                trace_request_ctx=request_timings,
+        ) as response:
+            main_server = await find_main_server_in_stream(
+                response.content.iter_chunked(PROBE_CHUNK_SIZE),
+            )
+    finally:
+        if timings is not None:
+            add_request_timings(
+                timings,
+                'connects_page',
+                started_at,
+                request_timings,
+            )
 
     if not main_server:
         logger.warning('Сервер %s не подключен к транзиту', web_server_url)
@@ -85,11 +166,29 @@ async def check_conn_to_main_server(
     logger.debug(
         'Сервер %s подключен к транзиту %s',
         web_server_url,
-        main_server,
+        main_server.main_server,
     )
     return True
 
 
+def add_request_timings(
+        timings: dict[str, float],
+        phase: str,
+        started_at: float,
+        request_timings: dict[str, float],
+):
+    """request_timings заполняет trace config HTTP сессии синхронизаций:
+    ожидание и установка соединения. Остальное время запроса - phase
+    """
+    elapsed = (time.monotonic() - started_at) * 1000
+    for name, value in request_timings.items():
+        timings[name] = round(timings.get(name, 0.0) + value, 1)
+    timings[phase] = round(
+        timings.get(phase, 0.0) + elapsed - sum(request_timings.values()),
+        1,
+    )
+
+
 async def user_registration(message: types.Message) -> CustomUser:
     logger.info('Регистрация нового пользователя')
     employee = await CustomUser.objects.acreate(
@@ -14,11 +14,11 @@ from django.conf import settings
 
 from aiogram import Bot
 from aiogram import Dispatcher
-from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from django.http import HttpRequest
 
 from src.bot.handlers import router
+from src.bot.bot_client import create_bot
 from src.bot.middlewares import AuthUpdateMiddleware
 from src.bot.middlewares import SchedulerMiddleware
 from src.bot.middlewares import EmployeeStatusMiddleware
@@ -45,7 +45,7 @@ def tg_webhook_init() -> tuple[Bot, Dispatcher]:
         executors=executors,
         timezone=pytz.timezone('Europe/Moscow'),
     )
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
+    bot = create_bot()
     dp = Dispatcher(storage=MemoryStorage(), skip_updates=True)
     dp.include_router(router)
     dp.update.outer_middleware(AuthUpdateMiddleware())
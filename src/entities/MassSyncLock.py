@@ -0,0 +1,173 @@
+import json
+import time
+import logging
+
+from dataclasses import asdict
+from dataclasses import dataclass
+
+from redis import asyncio as aioredis
+
+from django.conf import settings
+
+logger = logging.getLogger('support_bot')
+
+MASS_SYNC_CHOICES = ('all', 'rest_all', 'topology')
+
+# Меняем поля держателя, только если блокировка его.
+# ttl: -1 оставить срок, 0 удалить, иначе новый срок в мс
+UPDATE_HOLDER_SCRIPT = '''
+local value = redis.call('get', KEYS[1])
+if not value then return 0 end
+local holder = cjson.decode(value)
+if holder['job_id'] ~= ARGV[1] then return 0 end
+local ttl = tonumber(ARGV[3])
+if ttl == 0 then return redis.call('del', KEYS[1]) end
+for field, field_value in pairs(cjson.decode(ARGV[2])) do
+    holder[field] = field_value
+end
+if ttl < 0 then
+    redis.call('set', KEYS[1], cjson.encode(holder), 'KEEPTTL')
+else
+    redis.call('set', KEYS[1], cjson.encode(holder), 'PX', ttl)
+end
+return 1
+'''
+ACQUIRE_SCRIPT = '''
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return false
+end
+return redis.call('get', KEYS[1])
+'''
+
+
+@dataclass
+class MassSyncHolder:
+    job_id: str
+    employee_name: str
+    started_at: float
+    report_id: int | None = None
+    finished: bool = False
+
+    @property
+    def cooldown_left(self) -> float:
+        return self.started_at + settings.SYNC_MASS_COOLDOWN - time.time()
+
+
+class MemoryMassSyncLock:
+    """Блокировка массовой синхронизации в памяти процесса бота"""
+
+    def __init__(self):
+        self._holder: MassSyncHolder | None = None
+        self._expire_at = 0.0
+
+    async def acquire(self, holder: MassSyncHolder) -> MassSyncHolder | None:
+        """None если взяли блокировку, иначе текущий держатель"""
+        current = await self.get()
+        if current is not None:
+            return current
+        self._holder = holder
+        self._expire_at = time.time() + settings.SYNC_MASS_LOCK_TTL
+        logger.info('Массовая синхронизация %s начата', holder.job_id)
+
+    async def close(self):
+        pass
+
+    async def get(self) -> MassSyncHolder | None:
+        if self._holder and time.time() >= self._expire_at:
+            self._holder = None
+        return self._holder
+
+    async def attach_report(self, job_id: str, report_id: int):
+        holder = await self.get()
+        if holder and holder.job_id == job_id:
+            holder.report_id = report_id
+
+    async def refresh(self, job_id: str):
+        holder = await self.get()
+        if holder and holder.job_id == job_id and not holder.finished:
+            self._expire_at = time.time() + settings.SYNC_MASS_LOCK_TTL
+
+    async def release(self, job_id: str):
+        """До конца паузы после старта блокировка остается"""
+        holder = await self.get()
+        if not holder or holder.job_id != job_id:
+            return
+        holder.finished = True
+        self._expire_at = holder.started_at + settings.SYNC_MASS_COOLDOWN
+        logger.info('Массовая синхронизация %s завершена', job_id)
+
+
+class RedisMassSyncLock:
+    """Блокировка массовой синхронизации в Redis, общая для реплик
+    бота и воркеров. Пока синхронизация идет, воркер продлевает ключ,
+    если воркер упал, ключ живет еще SYNC_MASS_LOCK_TTL
+    """
+    lock_key = 'sync:mass:lock'
+
+    def __init__(self, host: str, port: int):
+        self.redis = aioredis.Redis(host=host, port=port)
+        self._acquire = self.redis.register_script(ACQUIRE_SCRIPT)
+        self._update_holder = self.redis.register_script(UPDATE_HOLDER_SCRIPT)
+
+    async def acquire(self, holder: MassSyncHolder) -> MassSyncHolder | None:
+        """None если взяли блокировку, иначе текущий держатель"""
+        raw_holder = await self._acquire(
+            keys=[self.lock_key],
+            args=[
+                json.dumps(asdict(holder)),
+                settings.SYNC_MASS_LOCK_TTL * 1000,
+            ],
+        )
+        if raw_holder is None:
+            logger.info('Массовая синхронизация %s начата', holder.job_id)
+            return
+        return MassSyncHolder(**json.loads(raw_holder))
+
+    async def get(self) -> MassSyncHolder | None:
+        raw_holder = await self.redis.get(self.lock_key)
+        if raw_holder is None:
+            return
+        return MassSyncHolder(**json.loads(raw_holder))
+
+    async def attach_report(self, job_id: str, report_id: int):
+        await self._update_holder(
+            keys=[self.lock_key],
+            args=[job_id, json.dumps({'report_id': report_id}), -1],
+        )
+
+    async def refresh(self, job_id: str):
+        """Продление на SYNC_MASS_LOCK_TTL, пока синхронизация идет"""
+        await self._update_holder(
+            keys=[self.lock_key],
+            args=[job_id, '{}', settings.SYNC_MASS_LOCK_TTL * 1000],
+        )
+
+    async def release(self, job_id: str):
+        """До конца паузы после старта блокировка остается"""
+        holder = await self.get()
+        if not holder or holder.job_id != job_id:
+            return
+        ttl = max(int(holder.cooldown_left * 1000), 0)
+        await self._update_holder(
+            keys=[self.lock_key],
+            args=[job_id, json.dumps({'finished': True}), ttl],
+        )
+        logger.info('Массовая синхронизация %s завершена', job_id)
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+_mass_sync_lock: MemoryMassSyncLock | RedisMassSyncLock | None = None
+
+
+def get_mass_sync_lock() -> MemoryMassSyncLock | RedisMassSyncLock:
+    global _mass_sync_lock
+    if _mass_sync_lock is None:
+        _mass_sync_lock = MemoryMassSyncLock()
+        if settings.REDIS_HOST:
+            _mass_sync_lock = RedisMassSyncLock(
+                settings.REDIS_HOST,
+                settings.REDIS_PORT,
+            )
+    return _mass_sync_lock
@@ -4,17 +4,16 @@ from asgiref.sync import sync_to_async
 
 from django.conf import settings
 
-from aiogram import Bot
-from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 from aiogram.types import ReplyKeyboardRemove, InlineKeyboardMarkup
 
 from src.bot import services
 from src.bot import keyboards, dialogs
+from src.bot.outbox import enqueue_notifications
+from src.bot.outbox import enqueue_chat_notification
 from src.entities.FieldEngineer import FieldEngineer
 from src.entities.SupportEngineer import SupportEngineer
 from src.entities.User import User
-from src.models import SDTask, CustomGroup
+from src.models import SDTask, CustomGroup, Notification
 
 logger = logging.getLogger('support_bot')
 
@@ -25,22 +24,13 @@ class Message:
     async def send_to_chat(
             chat_id: int,
             message: str,
-            media_group: list,
-    ):
-        """Отправка уведомлений в группу или канал телеграм"""
+            documents: dict,
+    ) -> Notification:
+        """Уведомление с документами в группу или канал телеграм
+        через очередь Notification. Документы пересылаются по file_id
+        """
         logger.info('Отправка сообщения в группы %s', chat_id)
-        bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
-        try:
-            logger.debug('Уведомление для: %s', chat_id)
-            await bot.send_message(chat_id, message)
-            await bot.send_media_group(chat_id, media_group)
-        except TelegramBadRequest:
-            logger.warning('Не смог отправить уведомление')
-        except TelegramForbiddenError:
-            logger.warning('Заблокировал бота')
-        finally:
-            await bot.session.close()
-            logger.info('Отправка уведомлений завершена')
+        return await enqueue_chat_notification(chat_id, message, documents)
 
     @staticmethod
     async def send_tg_notification(
@@ -48,39 +38,35 @@ class Message:
             message: str,
             *,
             keyboard: InlineKeyboardMarkup | ReplyKeyboardRemove = None,
-    ):
-        """Отправка уведомления в телеграм"""
+            priority: int = Notification.NORMAL,
+    ) -> list[Notification]:
+        """Уведомление в телеграм через очередь Notification.
+        Отправляет фоновый NotificationDispatcher процесса бота
+        """
         logger.info('Отправка уведомления')
         if not recipients:
             logger.warning('Пустой список для отправки уведомлений')
-            return
-        bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
-        for recipient in recipients:
-            try:
-                logger.debug('Уведомление для: %s', recipient.user.name)
-                await bot.send_message(
-                    recipient.user.tg_id,
-                    message,
-                    reply_markup=keyboard,
-                )
-            except TelegramBadRequest:
-                logger.warning(
-                    'Не смог отправить уведомление %s',
-                    recipient.user.name,
-                )
-            except TelegramForbiddenError:
-                logger.warning('Заблокировал бота %s', recipient.user.name)
-        await bot.session.close()
-        logger.info('Отправка уведомлений завершена')
+            return []
+        return await enqueue_notifications(
+            recipients,
+            message,
+            keyboard,
+            priority,
+        )
 
     @staticmethod
-    async def send_notify_to_seniors_engineers(message: str, keyboard=None):
+    async def send_notify_to_seniors_engineers(
+            message: str,
+            keyboard=None,
+            priority: int = Notification.NORMAL,
+    ):
         logger.info('Отправка уведомлений Ведущим Инженерам')
         senior_engineers = await services.get_senior_engineers()
         await Message.send_tg_notification(
             senior_engineers,
             message,
             keyboard=keyboard,
+            priority=priority,
         )
 
     @staticmethod
@@ -88,6 +74,7 @@ class Message:
             group_id: int,
             message: str,
             keyboard=None,
+            priority: int = Notification.NORMAL,
     ):
         logger.info('Менеджерам группы')
         group_managers = await services.get_group_managers_by_group_id(
@@ -97,6 +84,7 @@ class Message:
             group_managers,
             message,
             keyboard=keyboard,
+            priority=priority,
         )
 
     @staticmethod
@@ -146,7 +134,6 @@ class Message:
             documents: dict,
     ):
         additional_chat_id = settings.TG_ADDITIONAL_CHAT_ID
-        media_group = await services.create_documents_media_group(documents)
         text_performer = await dialogs.additional_chat_for_performer()
         text_additional_chat = await dialogs.additional_chat_message(
             task_number,
@@ -159,7 +146,7 @@ class Message:
         await Message.send_to_chat(
             additional_chat_id,
             text_additional_chat,
-            media_group,
+            documents,
         )
         await Message.send_tg_notification(
             [creator],
@@ -182,7 +169,11 @@ class Message:
             return
         tasks_numbers = [task.number for task in new_tasks]
         message = await dialogs.new_task_notify_for_middle(tasks_numbers)
-        await Message.send_tg_notification([engineer], message)
+        await Message.send_tg_notification(
+            [engineer],
+            message,
+            priority=Notification.BULK,
+        )
 
     @staticmethod
     async def send_start_task_notify(sd_task: SDTask):
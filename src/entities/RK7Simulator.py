@@ -0,0 +1,240 @@
+import ssl
+import math
+import random
+import asyncio
+import logging
+import tempfile
+import ipaddress
+import subprocess
+
+from pathlib import Path
+from dataclasses import dataclass
+
+from aiohttp import web
+
+logger = logging.getLogger('support_bot')
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+HANG_SECONDS = 3600
+CONNECTS_ROW = '<tr><td>{name}</td><td>{address}</td><td>Connected</td></tr>'
+FORCESYNCREFS_RESPONSE = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<RK7QueryResult Status="Ok" CMD="ForceSyncRefs"/>'
+)
+
+
+@dataclass
+class RK7SimulatedHost:
+    address: str
+    behaviour: str = 'ok'
+
+
+class RK7Simulator:
+    """Локальная замена веб серверов RK7 для нагрузочных тестов синхронизации.
+    Каждый сервер слушает свой loopback адрес 127.x.x.x на одном порту,
+    отдает страницу Connects и forcesyncrefs.xml с заданной задержкой.
+    Часть серверов зависает, отвечает 401, не поднимает TLS
+    или не подключена к транзиту
+    """
+
+    def __init__(
+            self,
+            hosts: int = 1000,
+            port: int = 9000,
+            first_address: str = '127.1.0.1',
+            latency_distribution: str = 'lognormal',
+            latency_median: float = 0.05,
+            latency_sigma: float = 0.5,
+            timeout_rate: float = 0.0,
+            tls_error_rate: float = 0.0,
+            auth_error_rate: float = 0.0,
+            no_transit_rate: float = 0.0,
+            connects_page_size: int = 20000,
+            seed: int | None = None,
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f'Неизвестное распределение задержки: {latency_distribution}',
+            )
+        self.port = port
+        self.latency_distribution = latency_distribution
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.random = random.Random(seed)
+        self.hosts = self._create_hosts(
+            hosts,
+            first_address,
+            {
+                'timeout': timeout_rate,
+                'tls_error': tls_error_rate,
+                'auth_error': auth_error_rate,
+                'no_transit': no_transit_rate,
+            },
+        )
+        self.connects_page = self._render_connects_page(
+            connects_page_size,
+            with_transit=True,
+        )
+        self.connects_page_no_transit = self._render_connects_page(
+            connects_page_size,
+            with_transit=False,
+        )
+        self.peak_connections = 0
+        self.requests = 0
+        self._runner: web.AppRunner | None = None
+        self._sampler: asyncio.Task | None = None
+        self._cert_dir: tempfile.TemporaryDirectory | None = None
+
+    @property
+    def addresses(self) -> list[str]:
+        return [host.address for host in self.hosts.values()]
+
+    async def start(self):
+        # tls_error сервера получают TLS ClientHello вместо HTTP
+        logging.getLogger('aiohttp.server').setLevel(logging.CRITICAL)
+        app = web.Application()
+        app.router.add_get('/Connects', self.handle_connects)
+        app.router.add_get(
+            '/rk7api/v1/forcesyncrefs.xml',
+            self.handle_forcesyncrefs,
+        )
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        ssl_context = self._create_ssl_context()
+        for host in self.hosts.values():
+            site = web.TCPSite(
+                self._runner,
+                host.address,
+                self.port,
+                ssl_context=None if host.behaviour == 'tls_error'
+                else ssl_context,
+                reuse_address=True,
+            )
+            await site.start()
+        self._sampler = asyncio.create_task(self._sample_connections())
+        logger.info(
+            'Симулятор RK7 запущен: %s серверов на порту %s',
+            len(self.hosts),
+            self.port,
+        )
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+        if self._cert_dir:
+            self._cert_dir.cleanup()
+        logger.info('Симулятор RK7 остановлен')
+
+    async def handle_connects(self, request: web.Request) -> web.Response:
+        host = await self._simulate(request)
+        page = self.connects_page
+        if host.behaviour == 'no_transit':
+            page = self.connects_page_no_transit
+        return web.Response(body=page, content_type='text/html')
+
+    async def handle_forcesyncrefs(self, request: web.Request) -> web.Response:
+        await self._simulate(request)
+        return web.Response(
+            text=FORCESYNCREFS_RESPONSE,
+            content_type='application/xml',
+        )
+
+    def get_latency(self) -> float:
+        if self.latency_distribution == 'fixed':
+            return self.latency_median
+        if self.latency_distribution == 'uniform':
+            return self.random.uniform(0, self.latency_median * 2)
+        return self.random.lognormvariate(
+            math.log(self.latency_median),
+            self.latency_sigma,
+        )
+
+    async def _simulate(self, request: web.Request) -> RK7SimulatedHost:
+        self.requests += 1
+        address = request.transport.get_extra_info('sockname')[0]
+        host = self.hosts[address]
+        if host.behaviour == 'timeout':
+            await asyncio.sleep(HANG_SECONDS)
+        await asyncio.sleep(self.get_latency())
+        if host.behaviour == 'auth_error':
+            raise web.HTTPUnauthorized()
+        return host
+
+    def _create_hosts(
+            self,
+            count: int,
+            first_address: str,
+            failure_rates: dict[str, float],
+    ) -> dict[str, RK7SimulatedHost]:
+        hosts = {}
+        address = ipaddress.IPv4Address(first_address)
+        while len(hosts) < count:
+            if address.packed[-1] not in (0, 255):
+                hosts[str(address)] = RK7SimulatedHost(
+                    str(address),
+                    self._choose_behaviour(failure_rates),
+                )
+            address += 1
+        return hosts
+
+    def _choose_behaviour(self, failure_rates: dict[str, float]) -> str:
+        point = self.random.random()
+        for behaviour, rate in failure_rates.items():
+            if point < rate:
+                return behaviour
+            point -= rate
+        return 'ok'
+
+    def _render_connects_page(self, size: int, with_transit: bool) -> bytes:
+        rows = []
+        if with_transit:
+            rows.append(
+                CONNECTS_ROW.format(name='REP_CENT_01', address='10.0.0.1'),
+            )
+        number = 0
+        page_size = 0
+        while page_size < size:
+            row = CONNECTS_ROW.format(
+                name=f'CASH_{number:03}',
+                address=f'10.0.{number // 250}.{number % 250 + 1}',
+            )
+            rows.append(row)
+            page_size += len(row)
+            number += 1
+        page = (
+            '<html><head><title>Connects</title></head><body><table>'
+            + ''.join(rows)
+            + '</table></body></html>'
+        )
+        return page.encode('utf-8')
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """Самоподписанный сертификат, бот проверку сертификата отключает"""
+        self._cert_dir = tempfile.TemporaryDirectory()
+        cert_dir = Path(self._cert_dir.name)
+        subprocess.run(
+            [
+                'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                '-days', '1', '-subj', '/CN=rk7-simulator',
+                '-keyout', str(cert_dir / 'key.pem'),
+                '-out', str(cert_dir / 'cert.pem'),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(
+            cert_dir / 'cert.pem',
+            cert_dir / 'key.pem',
+        )
+        return ssl_context
+
+    async def _sample_connections(self):
+        while True:
+            self.peak_connections = max(
+                self.peak_connections,
+                len(self._runner.server.connections),
+            )
+            await asyncio.sleep(0.005)
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+
+from typing import Callable
+from typing import Awaitable
+from dataclasses import field
+from dataclasses import dataclass
+from collections import OrderedDict
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+
+from django.conf import settings
+
+logger = logging.getLogger('support_bot')
+
+
+@dataclass
+class ReportArtifact:
+    digest: str
+    filename: str
+    data: bytes | None
+    file_id: str | None = None
+    keys: set[str] = field(default_factory=set)
+
+    @property
+    def size(self) -> int:
+        return len(self.data or b'') + len(self.file_id or '')
+
+    @property
+    def document(self) -> str | types.BufferedInputFile:
+        if self.file_id:
+            return self.file_id
+        return types.BufferedInputFile(self.data, filename=self.filename)
+
+
+class ReportCache:
+    """Документы отчетов по sha256 содержимого, вытеснение LRU
+    по суммарному размеру. После первой отправки вместо файла хранится
+    file_id телеграма, повторная отправка не загружает файл заново.
+    По ключу кешируются только неизменяемые отчеты
+    """
+
+    def __init__(self, max_bytes: int | None = None):
+        self.max_bytes = max_bytes or settings.REPORT_CACHE_MAX_BYTES
+        self.size = 0
+        self._artifacts: OrderedDict[str, ReportArtifact] = OrderedDict()
+        self._keys: dict[str, str] = {}
+
+    def has(self, key: str) -> bool:
+        return self._keys.get(key) in self._artifacts
+
+    def get(self, key: str) -> ReportArtifact | None:
+        digest = self._keys.get(key)
+        if digest not in self._artifacts:
+            return
+        self._artifacts.move_to_end(digest)
+        return self._artifacts[digest]
+
+    def put(
+            self,
+            document: types.BufferedInputFile,
+            key: str | None = None,
+    ) -> ReportArtifact:
+        digest = hashlib.sha256(
+            document.filename.encode() + b'\0' + document.data,
+        ).hexdigest()
+        artifact = self._artifacts.get(digest)
+        if artifact is None:
+            artifact = ReportArtifact(digest, document.filename, document.data)
+            self._artifacts[digest] = artifact
+            self.size += artifact.size
+        self._artifacts.move_to_end(digest)
+        if key:
+            artifact.keys.add(key)
+            self._keys[key] = digest
+        self._evict()
+        return artifact
+
+    def set_file_id(self, artifact: ReportArtifact, file_id: str):
+        if self._artifacts.get(artifact.digest) is not artifact:
+            return
+        self.size -= artifact.size
+        artifact.file_id = file_id
+        artifact.data = None
+        self.size += artifact.size
+
+    def forget(self, artifact: ReportArtifact):
+        if self._artifacts.pop(artifact.digest, None) is None:
+            return
+        self.size -= artifact.size
+        for key in artifact.keys:
+            self._keys.pop(key, None)
+
+    async def answer_document(
+            self,
+            message: types.Message,
+            build: Callable[[], Awaitable[types.BufferedInputFile]],
+            caption: str,
+            key: str | None = None,
+    ) -> types.Message:
+        """build вызывается, только если документа нет в кеше"""
+        artifact = self.get(key) if key else None
+        if artifact is None:
+            artifact = self.put(await build(), key)
+        else:
+            logger.debug('Документ %s из кеша отчетов', key)
+        try:
+            sent = await message.answer_document(
+                artifact.document,
+                caption=caption,
+            )
+        except TelegramBadRequest:
+            if not artifact.file_id:
+                raise
+            logger.warning('Телеграм не принял file_id %s', artifact.filename)
+            self.forget(artifact)
+            artifact = self.put(await build(), key)
+            sent = await message.answer_document(
+                artifact.document,
+                caption=caption,
+            )
+        self.set_file_id(artifact, sent.document.file_id)
+        return sent
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self._artifacts) > 1:
+            _, artifact = self._artifacts.popitem(last=False)
+            self.size -= artifact.size
+            for key in artifact.keys:
+                self._keys.pop(key, None)
+            logger.debug('Вытеснен из кеша отчетов %s', artifact.filename)
+
+
+_report_cache: ReportCache | None = None
+
+
+def get_report_cache() -> ReportCache:
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache()
+    return _report_cache
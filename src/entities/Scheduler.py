@@ -14,13 +14,22 @@ from django.conf import settings
 from django.utils import timezone
 
 from src.models import SDTask
+from src.models import SyncSchedule
 from src.bot.tasks import check_task_activate_step_1
 from src.bot.tasks import check_task_activate_step_2
 from src.bot.tasks import check_task_deadline
 from src.bot.tasks import check_end_of_shift
+from src.bot.tasks import archive_task_documents
 
 logger = logging.getLogger('support_bot')
 
+# ссылкой, чтобы не импортировать обработчики синхронизации в шедулер
+SYNC_SCHEDULE_FUNC = (
+    'src.bot.handlers.synchronizations.schedule:run_sync_schedule'
+)
+SYNC_SCHEDULE_JOB_PREFIX = 'sync_schedule_'
+SYNC_SCHEDULE_MISFIRE_GRACE_TIME = 600
+
 
 class Scheduler:
 
@@ -77,6 +86,26 @@ class Scheduler:
         )
         logger.info('Проверки добавлены')
 
+    async def add_archive_task_documents(self, task: SDTask, tg_docs: dict):
+        """Скачивание документов закрытой задачи на диск в фоне.
+        Задача выполняется сразу, а после перезапуска бота с Redis
+        хранилищем - при старте шедулера, сколько бы ни опоздала
+        """
+        if not tg_docs:
+            return
+        job_name = f'job_{task.number}_archive'
+        logger.info('Создание задачи шедулера с именем %s', job_name)
+        self.aio_scheduler.add_job(
+            func=archive_task_documents,
+            trigger='date',
+            run_date=timezone.now(),
+            args=(task.id, task.number, tg_docs),
+            id=job_name,
+            replace_existing=True,
+            misfire_grace_time=None,
+        )
+        logger.info('Задача создана')
+
     async def add_check_shift(self, shift_id: int):
         logger.debug(
             'Добавляю задачу на проверку окончания смены через 9 часов')
@@ -92,10 +121,50 @@ class Scheduler:
             logger.debug(
                 'Не смог добавить задачу. Такая задача уже существует.')
 
+    async def start_sync_schedules(self):
+        """Расписания синхронизации перечитываем из БД периодически,
+        изменения в админке применяются без перезапуска бота
+        """
+        await self.update_sync_schedules()
+        self.aio_scheduler.add_job(
+            self.update_sync_schedules,
+            trigger='interval',
+            seconds=settings.SYNC_SCHEDULES_RELOAD_INTERVAL,
+            id='update_sync_schedules',
+            jobstore='local',
+            replace_existing=True,
+        )
+
+    async def update_sync_schedules(self):
+        """Задача с запуском в начале окна на каждое активное расписание"""
+        job_ids = set()
+        async for schedule in SyncSchedule.objects.filter(is_active=True):
+            job_id = f'{SYNC_SCHEDULE_JOB_PREFIX}{schedule.id}'
+            job_ids.add(job_id)
+            self.aio_scheduler.add_job(
+                func=SYNC_SCHEDULE_FUNC,
+                trigger='cron',
+                hour=schedule.window_start.hour,
+                minute=schedule.window_start.minute,
+                timezone='Europe/Moscow',
+                args=(schedule.id,),
+                id=job_id,
+                replace_existing=True,
+                coalesce=True,
+                misfire_grace_time=SYNC_SCHEDULE_MISFIRE_GRACE_TIME,
+            )
+        for job in self.aio_scheduler.get_jobs():
+            if job.id.startswith(SYNC_SCHEDULE_JOB_PREFIX) \
+                    and job.id not in job_ids:
+                logger.info('Удаляю задачу отключенного расписания %s', job.id)
+                job.remove()
+        logger.debug('Расписаний синхронизации: %s', len(job_ids))
+
     @staticmethod
     def get_job_store():
         job_store = {
-            'default': MemoryJobStore()
+            'default': MemoryJobStore(),
+            'local': MemoryJobStore(),
         }
         if settings.REDIS_HOST == 'redis':
             job_store['default'] = RedisJobStore(
@@ -5,7 +5,6 @@ from asgiref.sync import sync_to_async
 from django.utils import timezone
 
 from src import exceptions
-from src.bot import services
 from src.entities.User import User
 
 from src.models import SDTask
@@ -214,19 +213,13 @@ class SupportEngineer(User):
     async def dispatcher_close_task(
             self,
             task_id: int,
-            task_number: str,
             approved_sub_tasks: list,
-            tg_docs: dict,
             closing_comment: str,
     ) -> SDTask:
+        """Документы задачи сохраняются на диск отдельной задачей
+        шедулера archive_task_documents, закрытие их не ждет
+        """
         logger.info('Закрытие задачи диспетчером')
-        files_save_info = await services.save_doc_from_tg_to_disk(
-            task_number,
-            tg_docs,
-        )
-        if files_save_info:
-            files_save_info = str(files_save_info).strip('[]') + ','
-
         if approved_sub_tasks:
             approved_sub_tasks = ','.join(approved_sub_tasks)
 
@@ -234,7 +227,6 @@ class SupportEngineer(User):
             'status': 'COMPLETED',
             'closing_comment': closing_comment,
             'sub_task_number': approved_sub_tasks,
-            'doc_path': files_save_info,
             'finish_at': timezone.now()
         }
         task = await self.update_sd_task(task_id, task_update)
@@ -0,0 +1,66 @@
+import statistics
+
+from dataclasses import dataclass
+from collections import defaultdict
+
+from src.models import SyncReport
+
+SYNC_PHASES = {
+    'queue': 'Ожидание соединения',
+    'connect': 'Подключение (TCP + TLS)',
+    'connects_page': 'Страница Connects',
+    'forcesyncrefs': 'forcesyncrefs.xml',
+}
+
+
+@dataclass
+class SyncPhaseStats:
+    """Перцентили времени фазы синхронизации по серверам отчета, мс.
+    Фаза считается только по серверам, где она была: при
+    переиспользовании соединения подключения нет
+    """
+    phase: str
+    label: str
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+    @classmethod
+    def for_report(cls, sync_report: SyncReport) -> list['SyncPhaseStats']:
+        return cls.for_timings(
+            sync_report.results.values_list('timings', flat=True),
+        )
+
+    @classmethod
+    def for_timings(cls, timings: list[dict]) -> list['SyncPhaseStats']:
+        phase_values = defaultdict(list)
+        for server_timings in timings:
+            for phase, value in server_timings.items():
+                phase_values[phase].append(value)
+        return [
+            cls.for_values(phase, phase_values[phase])
+            for phase in SYNC_PHASES
+            if phase_values[phase]
+        ]
+
+    @classmethod
+    def for_values(cls, phase: str, values: list[float]) -> 'SyncPhaseStats':
+        p50 = p95 = p99 = values[0]
+        if len(values) > 1:
+            cut_points = statistics.quantiles(
+                values,
+                n=100,
+                method='inclusive',
+            )
+            p50, p95, p99 = cut_points[49], cut_points[94], cut_points[98]
+        return cls(
+            phase=phase,
+            label=SYNC_PHASES[phase],
+            count=len(values),
+            p50=round(p50, 1),
+            p95=round(p95, 1),
+            p99=round(p99, 1),
+            max=round(max(values), 1),
+        )
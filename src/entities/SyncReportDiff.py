@@ -0,0 +1,87 @@
+import logging
+
+from dataclasses import field
+from dataclasses import dataclass
+
+from django.db.models import Exists
+from django.db.models import OuterRef
+from django.db.models import Subquery
+
+from src.models import SyncReport
+from src.models import SyncResult
+
+logger = logging.getLogger('support_bot')
+
+
+@dataclass
+class SyncReportDiff:
+    """Изменения результатов синхронизации относительно предыдущего
+    запуска с тем же выбором пользователя. Сравнение идет запросами
+    к SyncResult по ошибкам, успешные результаты целиком не загружаются
+    """
+    report_id: int
+    previous_report_id: int | None = None
+    new_errors: list[dict] = field(default_factory=list)
+    recovered: list[dict] = field(default_factory=list)
+    still_failing: list[dict] = field(default_factory=list)
+
+    @property
+    def changed_errors(self) -> list[dict]:
+        return [
+            error for error in self.still_failing
+            if error['msg'] != error['prev_msg']
+        ]
+
+    @classmethod
+    def for_report(cls, sync_report: SyncReport) -> 'SyncReportDiff':
+        diff = cls(report_id=sync_report.id)
+        previous_report = get_previous_sync_report(sync_report)
+        if previous_report is None:
+            return diff
+        diff.previous_report_id = previous_report.id
+        previous_results = SyncResult.objects.filter(
+            report=previous_report,
+            server_name=OuterRef('server_name'),
+        )
+        errors = sync_report.results.filter(status='error').annotate(
+            prev_status=Subquery(previous_results.values('status')[:1]),
+            prev_msg=Subquery(previous_results.values('msg')[:1]),
+        ).order_by('server_name').values(
+            'server_name',
+            'web_link',
+            'msg',
+            'prev_status',
+            'prev_msg',
+        )
+        for error in errors:
+            if error['prev_status'] == 'error':
+                diff.still_failing.append(error)
+            else:
+                diff.new_errors.append(error)
+        diff.recovered = list(
+            sync_report.results.filter(
+                Exists(previous_results.filter(status='error')),
+                status='ok',
+            ).order_by('server_name').values('server_name', 'web_link')
+        )
+        logger.debug(
+            'Сравнение отчетов %s и %s: новых ошибок %s, восстановилось %s',
+            previous_report.id,
+            sync_report.id,
+            len(diff.new_errors),
+            len(diff.recovered),
+        )
+        return diff
+
+
+def get_previous_sync_report(sync_report: SyncReport) -> SyncReport | None:
+    """Отмененный, прерванный или еще идущий запуск с неполными
+    результатами для сравнения не годится
+    """
+    return SyncReport.objects.filter(
+        status='completed',
+        server_type_id=sync_report.server_type_id,
+        user_choice=sync_report.user_choice,
+        changed_only=sync_report.changed_only,
+        id__lt=sync_report.id,
+    ).order_by('-id').first()
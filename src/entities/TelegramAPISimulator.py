@@ -0,0 +1,322 @@
+import ssl
+import json
+import math
+import zlib
+import time
+import random
+import asyncio
+import logging
+import tempfile
+import subprocess
+
+from pathlib import Path
+
+from aiohttp import web
+
+logger = logging.getLogger('support_bot')
+
+WRONG_FILE_ID = 'wrong file identifier/HTTP URL specified'
+
+
+class TelegramAPISimulator:
+    """Локальная замена Bot API для нагрузочных тестов уведомлений.
+    Отвечает на sendMessage по TLS с заданной задержкой и считает,
+    сколько TCP соединений открыли клиенты. Сверх rate_limit сообщений
+    в секунду отвечает 429 с retry_after, как Bot API.
+    Документы: getFile и скачивание файлов по file_path, sendDocument
+    и sendMediaGroup по file_id или с загрузкой файла. Передача файлов
+    идет со скоростью bandwidth байт в секунду, часть file_id
+    (stale_file_id_rate) нельзя отправить повторно, только скачать
+    """
+
+    def __init__(
+            self,
+            host: str = '127.0.0.1',
+            port: int = 9443,
+            latency_median: float = 0.02,
+            latency_sigma: float = 0.3,
+            rate_limit: int = 0,
+            file_size: int = 1024 * 1024,
+            bandwidth: int = 10 * 1024 * 1024,
+            stale_file_id_rate: float = 0.0,
+            seed: int | None = None,
+    ):
+        self.host = host
+        self.port = port
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.rate_limit = rate_limit
+        self.file_size = file_size
+        self.bandwidth = bandwidth
+        self.stale_file_id_rate = stale_file_id_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self.downloaded_bytes = 0
+        self.uploaded_bytes = 0
+        self._window = (0, 0)
+        self.connections = 0
+        self.peak_connections = 0
+        self._transports = set()
+        self._runner: web.AppRunner | None = None
+        self._sampler: asyncio.Task | None = None
+        self._cert_dir: tempfile.TemporaryDirectory | None = None
+
+    @property
+    def url(self) -> str:
+        return f'https://{self.host}:{self.port}'
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(
+            '/bot{token}/sendMessage',
+            self.handle_send_message,
+        )
+        app.router.add_post('/bot{token}/getFile', self.handle_get_file)
+        app.router.add_post(
+            '/bot{token}/sendDocument',
+            self.handle_send_document,
+        )
+        app.router.add_post(
+            '/bot{token}/sendPhoto',
+            self.handle_send_photo,
+        )
+        app.router.add_post(
+            '/bot{token}/sendMediaGroup',
+            self.handle_send_media_group,
+        )
+        app.router.add_get('/file/bot{token}/{path:.*}', self.handle_file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner,
+            self.host,
+            self.port,
+            ssl_context=self._create_ssl_context(),
+            reuse_address=True,
+        )
+        await site.start()
+        self._sampler = asyncio.create_task(self._sample_connections())
+        logger.info('Симулятор Bot API запущен на %s', self.url)
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+        if self._runner:
+            await self._runner.cleanup()
+        if self._cert_dir:
+            self._cert_dir.cleanup()
+        logger.info('Симулятор Bot API остановлен')
+
+    def reset_stats(self):
+        self.requests = 0
+        self.rate_limited = 0
+        self.downloaded_bytes = 0
+        self.uploaded_bytes = 0
+        self.connections = 0
+        self.peak_connections = 0
+        self._transports.clear()
+
+    async def handle_send_message(self, request: web.Request) -> web.Response:
+        self._count_request(request)
+        data = await request.post()
+        if self._is_rate_limited():
+            self.rate_limited += 1
+            return web.json_response(
+                {
+                    'ok': False,
+                    'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': 1},
+                },
+                status=429,
+            )
+        await self._sleep_latency()
+        return web.json_response({
+            'ok': True,
+            'result': {
+                'message_id': self.requests,
+                'date': int(time.time()),
+                'chat': {'id': int(data['chat_id']), 'type': 'private'},
+                'text': data.get('text', ''),
+            },
+        })
+
+    async def handle_get_file(self, request: web.Request) -> web.Response:
+        self._count_request(request)
+        data = await request.post()
+        await self._sleep_latency()
+        return web.json_response({
+            'ok': True,
+            'result': {
+                'file_id': data['file_id'],
+                'file_unique_id': data['file_id'],
+                'file_size': self.file_size,
+                'file_path': f'documents/{data["file_id"]}',
+            },
+        })
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        self._count_request(request)
+        await self._sleep_latency()
+        await asyncio.sleep(self.file_size / self.bandwidth)
+        self.downloaded_bytes += self.file_size
+        return web.Response(body=b'0' * self.file_size)
+
+    async def handle_send_document(self, request: web.Request) -> web.Response:
+        return await self._send_file(request, 'document')
+
+    async def handle_send_photo(self, request: web.Request) -> web.Response:
+        return await self._send_file(request, 'photo')
+
+    async def handle_send_media_group(
+            self,
+            request: web.Request,
+    ) -> web.Response:
+        self._count_request(request)
+        data = await request.post()
+        media = json.loads(data['media'])
+        messages = []
+        for item in media:
+            file_id = item['media']
+            if file_id.startswith('attach://'):
+                upload = data[file_id.removeprefix('attach://')]
+                file_size = await self._receive_upload(upload)
+                file_id = 'uploaded'
+            elif self.is_stale(file_id):
+                return self._bad_request(WRONG_FILE_ID)
+            else:
+                file_size = self.file_size
+            messages.append(
+                self._render_message(
+                    int(data['chat_id']),
+                    item['type'],
+                    file_id,
+                    file_size,
+                )
+            )
+        await self._sleep_latency()
+        return web.json_response({'ok': True, 'result': messages})
+
+    async def _send_file(
+            self,
+            request: web.Request,
+            media_type: str,
+    ) -> web.Response:
+        self._count_request(request)
+        data = await request.post()
+        file = data[media_type]
+        if file.startswith('attach://'):
+            file = data[file.removeprefix('attach://')]
+        elif self.is_stale(file):
+            return self._bad_request(WRONG_FILE_ID)
+        file_size = await self._receive_upload(file)
+        await self._sleep_latency()
+        return web.json_response({
+            'ok': True,
+            'result': self._render_message(
+                int(data['chat_id']),
+                media_type,
+                file if isinstance(file, str) else 'uploaded',
+                file_size,
+            ),
+        })
+
+    def is_stale(self, file_id: str) -> bool:
+        point = zlib.crc32(file_id.encode()) / 0xFFFFFFFF
+        return point < self.stale_file_id_rate
+
+    def _count_request(self, request: web.Request):
+        self.requests += 1
+        if request.transport not in self._transports:
+            self._transports.add(request.transport)
+            self.connections += 1
+
+    async def _sleep_latency(self):
+        await asyncio.sleep(
+            self.random.lognormvariate(
+                math.log(self.latency_median),
+                self.latency_sigma,
+            )
+        )
+
+    async def _receive_upload(self, upload) -> int:
+        if isinstance(upload, str):
+            return self.file_size
+        file_size = len(upload.file.read())
+        self.uploaded_bytes += file_size
+        await asyncio.sleep(file_size / self.bandwidth)
+        return file_size
+
+    def _render_message(
+            self,
+            chat_id: int,
+            media_type: str,
+            file_id: str,
+            file_size: int,
+    ) -> dict:
+        file = {
+            'file_id': file_id,
+            'file_unique_id': file_id,
+            'file_size': file_size,
+        }
+        if media_type == 'photo':
+            media = {'photo': [dict(file, width=1280, height=960)]}
+        else:
+            media = {'document': file}
+        return {
+            'message_id': self.requests,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            **media,
+        }
+
+    @staticmethod
+    def _bad_request(description: str) -> web.Response:
+        return web.json_response(
+            {
+                'ok': False,
+                'error_code': 400,
+                'description': f'Bad Request: {description}',
+            },
+            status=400,
+        )
+
+    def _is_rate_limited(self) -> bool:
+        if not self.rate_limit:
+            return False
+        second = int(time.monotonic())
+        window_second, window_requests = self._window
+        if window_second != second:
+            window_requests = 0
+        self._window = (second, window_requests + 1)
+        return window_requests >= self.rate_limit
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """Самоподписанный сертификат, проверку клиент отключает"""
+        self._cert_dir = tempfile.TemporaryDirectory()
+        cert_dir = Path(self._cert_dir.name)
+        subprocess.run(
+            [
+                'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+                '-days', '1', '-subj', '/CN=bot-api-simulator',
+                '-keyout', str(cert_dir / 'key.pem'),
+                '-out', str(cert_dir / 'cert.pem'),
+            ],
+            check=True,
+            capture_output=True,
+        )
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(
+            cert_dir / 'cert.pem',
+            cert_dir / 'key.pem',
+        )
+        return ssl_context
+
+    async def _sample_connections(self):
+        while True:
+            self.peak_connections = max(
+                self.peak_connections,
+                len(self._runner.server.connections),
+            )
+            await asyncio.sleep(0.005)
@@ -0,0 +1,78 @@
+import re
+import time
+
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from src.bot.utils import PROBE_CHUNK_SIZE
+from src.bot.utils import MainServerMatcher
+
+FIXTURES = Path(settings.BASE_DIR) / 'src' / 'bot' / 'tests' / 'fixtures'
+ROUNDS = 200
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение CPU на проверку страницы Connects одного сервера: '
+        'полный разбор BeautifulSoup против потокового MainServerMatcher'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'pages',
+            nargs='*',
+            type=Path,
+            help='Страницы Connects, по умолчанию фикстуры тестов',
+        )
+        parser.add_argument('--rounds', type=int, default=ROUNDS)
+
+    def handle(self, *args, **options):
+        pages = options['pages'] or sorted(FIXTURES.glob('connects_*.html'))
+        report = run_benchmark(pages, options['rounds'])
+        self.stdout.write(report)
+
+
+def probe_soup(page: bytes) -> bool:
+    soup = BeautifulSoup(page.decode('utf-8'), 'lxml')
+    return bool(
+        soup.find_all(string=[re.compile('TRANSIT'), re.compile('CENT')])
+    )
+
+
+def probe_stream(page: bytes) -> bool:
+    matcher = MainServerMatcher()
+    for start in range(0, len(page), PROBE_CHUNK_SIZE):
+        if matcher.feed(page[start:start + PROBE_CHUNK_SIZE]):
+            return True
+    return False
+
+
+def cpu_per_call(probe, page: bytes, rounds: int) -> float:
+    started_at = time.process_time()
+    for _ in range(rounds):
+        probe(page)
+    return (time.process_time() - started_at) / rounds
+
+
+def run_benchmark(pages: list[Path], rounds: int) -> str:
+    lines = [
+        f'{"page":<28}{"size":>8}{"soup, ms":>12}'
+        f'{"stream, ms":>12}{"x":>8}'
+    ]
+    for page_path in pages:
+        page = page_path.read_bytes()
+        if probe_soup(page) != probe_stream(page):
+            raise CommandError(f'Проверки расходятся на {page_path}')
+        soup_cpu = cpu_per_call(probe_soup, page, rounds) * 1000
+        stream_cpu = cpu_per_call(probe_stream, page, rounds) * 1000
+        lines.append(
+            f'{page_path.name:<28}{len(page):>8}'
+            f'{soup_cpu:>12.3f}{stream_cpu:>12.3f}'
+            f'{soup_cpu / stream_cpu:>8.1f}'
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+from aiogram.utils.media_group import MediaGroupBuilder
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.utils import configure_logging
+from src.entities.TelegramAPISimulator import TelegramAPISimulator
+from src.bot.scheme import DocumentRelayStats
+from src.bot.services import send_documents
+from src.bot.bot_client import create_bot
+from src.management.commands.bench_sync import PROXY_ENV_VARS
+from src.management.commands.bench_sync import get_percentiles
+from src.management.commands.bench_notify import BENCHMARK_TOKEN
+
+logger = logging.getLogger('support_bot')
+
+MODES = ('reupload', 'file_id')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест отправки документов задач на симуляторе Bot API: '
+        'скачивание и повторная загрузка против пересылки по file_id'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=20)
+        parser.add_argument('--documents', type=int, default=2)
+        parser.add_argument('--photos', type=int, default=3)
+        parser.add_argument(
+            '--file-size',
+            type=int,
+            default=1024 * 1024,
+            help='Размер каждого файла в байтах',
+        )
+        parser.add_argument(
+            '--bandwidth',
+            type=int,
+            default=10 * 1024 * 1024,
+            help='Скорость канала до Bot API в байтах в секунду',
+        )
+        parser.add_argument(
+            '--stale-rate',
+            type=float,
+            default=0.0,
+            help='Доля file_id, которые нельзя отправить повторно',
+        )
+        parser.add_argument('--port', type=int, default=9443)
+        parser.add_argument('--latency-median', type=float, default=0.02)
+        parser.add_argument(
+            '--modes',
+            choices=MODES,
+            nargs='+',
+            default=list(MODES),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            configure_logging()
+            logger.setLevel(logging.ERROR)
+            for env_var in PROXY_ENV_VARS:
+                os.environ.pop(env_var, None)
+            report = asyncio.run(run_benchmark(options))
+            self.stdout.write(report)
+        except KeyboardInterrupt:
+            logger.info('Нагрузочный тест прерван')
+
+
+async def run_benchmark(options: dict) -> str:
+    simulator = TelegramAPISimulator(
+        port=options['port'],
+        latency_median=options['latency_median'],
+        file_size=options['file_size'],
+        bandwidth=options['bandwidth'],
+        stale_file_id_rate=options['stale_rate'],
+    )
+    await simulator.start()
+    bot = create_bot(
+        BENCHMARK_TOKEN,
+        simulator.url,
+        ssl_context=settings.SSL_CONTEXT,
+    )
+    tasks_documents = [
+        get_task_documents(task, options['documents'], options['photos'])
+        for task in range(1, options['tasks'] + 1)
+    ]
+    reports = [
+        f'Задач: {len(tasks_documents)}, в задаче документов: '
+        f'{options["documents"]}, фото: {options["photos"]}, '
+        f'размер файла: {options["file_size"]} байт, '
+        f'канал: {options["bandwidth"]} байт/с, '
+        f'file_id нельзя переслать: {options["stale_rate"]:.0%}',
+    ]
+    try:
+        for mode in options['modes']:
+            simulator.reset_stats()
+            relay_stats = DocumentRelayStats()
+            latencies = []
+            started_at = time.monotonic()
+            for task, tg_documents in enumerate(tasks_documents, start=1):
+                task_started_at = time.monotonic()
+                if mode == 'reupload':
+                    await send_reuploaded_documents(bot, task, tg_documents)
+                else:
+                    task_stats = await send_documents(bot, task, tg_documents)
+                    relay_stats.relayed += task_stats.relayed
+                    relay_stats.relayed_bytes += task_stats.relayed_bytes
+                    relay_stats.downloaded += task_stats.downloaded
+                    relay_stats.downloaded_bytes += (
+                        task_stats.downloaded_bytes
+                    )
+                    relay_stats.failed += task_stats.failed
+                latencies.append(time.monotonic() - task_started_at)
+            elapsed = time.monotonic() - started_at
+            p50, p95 = get_percentiles(latencies, (50, 95))
+            lines = [
+                f'Режим {mode}',
+                f'Время: {elapsed:.2f} c',
+                f'Отправка документов задачи, c: p50={p50:.3f} p95={p95:.3f}',
+                f'Запросов к Bot API: {simulator.requests}',
+                f'Скачано ботом: {simulator.downloaded_bytes} байт',
+                f'Загружено ботом: {simulator.uploaded_bytes} байт',
+            ]
+            if mode == 'file_id':
+                lines.append(
+                    f'По file_id: {relay_stats.relayed}, скачано заново: '
+                    f'{relay_stats.downloaded}, '
+                    f'не отправлено: {relay_stats.failed}\n'
+                    f'Не передано через бота: {relay_stats.saved_bytes} байт',
+                )
+            reports.append('\n'.join(lines))
+    finally:
+        await bot.session.close()
+        await simulator.stop()
+    return '\n\n'.join(reports)
+
+
+def get_task_documents(task: int, documents: int, photos: int) -> dict:
+    tg_documents = {
+        f'act_{number}.pdf': f'document_{task}_{number}'
+        for number in range(1, documents + 1)
+    }
+    tg_documents.update({
+        f'image_act_{number}.jpg': f'photo_{task}_{number}'
+        for number in range(1, photos + 1)
+    })
+    return tg_documents
+
+
+async def send_reuploaded_documents(
+        bot: Bot,
+        chat_id: int,
+        tg_documents: dict,
+):
+    """Как документы отправлялись до пересылки по file_id"""
+    media_group = MediaGroupBuilder(caption='Приложенные документы')
+    for doc_name, doc_id in tg_documents.items():
+        tg_file = await bot.get_file(doc_id)
+        io_file = await bot.download_file(tg_file.file_path)
+        media_group.add_document(
+            BufferedInputFile(io_file.read(), filename=doc_name),
+        )
+    await bot.send_media_group(chat_id=chat_id, media=media_group.build())
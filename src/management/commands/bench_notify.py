@@ -0,0 +1,189 @@
+import os
+import time
+import asyncio
+import logging
+
+from collections import Counter
+
+from aiogram.exceptions import TelegramAPIError
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.models import CustomUser
+from src.utils import configure_logging
+from src.entities.User import User
+from src.entities.TelegramAPISimulator import TelegramAPISimulator
+from src.bot.bot_client import init_bot
+from src.bot.bot_client import close_bot
+from src.bot.bot_client import create_bot
+from src.bot.notifications import get_notification_sender
+from src.management.commands.bench_sync import PROXY_ENV_VARS
+
+logger = logging.getLogger('support_bot')
+
+BENCHMARK_TOKEN = '123456:BENCHMARK'
+MODES = ('new_bot', 'shared_bot', 'fanout')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест уведомлений на симуляторе Bot API: '
+        'новый Bot на каждое уведомление, общий Bot процесса '
+        'и рассылка всем получателям одним вызовом под лимитами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notifications', type=int, default=300)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Сколько уведомлений отправляется одновременно '
+                 'в режимах new_bot и shared_bot',
+        )
+        parser.add_argument('--port', type=int, default=9443)
+        parser.add_argument('--latency-median', type=float, default=0.02)
+        parser.add_argument('--latency-sigma', type=float, default=0.3)
+        parser.add_argument(
+            '--api-rate-limit',
+            type=int,
+            default=0,
+            help='Симулятор отвечает 429 сверх стольких сообщений в секунду',
+        )
+        parser.add_argument('--notify-rate', type=float)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--modes',
+            choices=MODES,
+            nargs='+',
+            default=list(MODES),
+        )
+
+    def handle(self, *args, **options):
+        try:
+            configure_logging()
+            # логи уведомлений на каждое сообщение исказят замер
+            logger.setLevel(logging.ERROR)
+            if options['notify_rate']:
+                settings.TG_NOTIFY_RATE = options['notify_rate']
+            for env_var in PROXY_ENV_VARS:
+                os.environ.pop(env_var, None)
+            report = asyncio.run(run_benchmark(options))
+            self.stdout.write(report)
+        except KeyboardInterrupt:
+            logger.info('Нагрузочный тест прерван')
+
+
+async def run_benchmark(options: dict) -> str:
+    simulator = TelegramAPISimulator(
+        port=options['port'],
+        latency_median=options['latency_median'],
+        latency_sigma=options['latency_sigma'],
+        rate_limit=options['api_rate_limit'],
+        seed=options['seed'],
+    )
+    await simulator.start()
+    recipients = [
+        User(CustomUser(name=f'SIM_{number:05}', tg_id=number))
+        for number in range(1, options['notifications'] + 1)
+    ]
+    reports = [
+        f'Уведомлений: {len(recipients)}, '
+        f'одновременно: {options["concurrency"]}, '
+        f'задержка Bot API: {options["latency_median"]} c, '
+        f'TG_NOTIFY_RATE={settings.TG_NOTIFY_RATE}, '
+        f'лимит симулятора: {options["api_rate_limit"] or "нет"}',
+    ]
+    scaling = []
+    try:
+        for mode in options['modes']:
+            simulator.reset_stats()
+            started_at = time.monotonic()
+            outcomes = await send_notifications(
+                mode,
+                simulator.url,
+                recipients,
+                options['concurrency'],
+            )
+            elapsed = time.monotonic() - started_at
+            scaling.append((mode, elapsed))
+            reports.append('\n'.join([
+                f'Режим {mode}',
+                f'Время: {elapsed:.2f} c',
+                f'Уведомлений в секунду: {len(recipients) / elapsed:.1f}',
+                f'Запросов к Bot API: {simulator.requests} '
+                f'(из них 429: {simulator.rate_limited})',
+                f'TCP соединений: {simulator.connections}',
+                f'Пик открытых соединений: {simulator.peak_connections}',
+                'Результаты: ' + ', '.join(
+                    f'{status} - {count}'
+                    for status, count in sorted(outcomes.items())
+                ),
+            ]))
+    finally:
+        await simulator.stop()
+    _, base_elapsed = scaling[0]
+    reports.append('\n'.join(
+        f'  {mode}: ускорение x{base_elapsed / elapsed:.2f}'
+        for mode, elapsed in scaling
+    ))
+    return '\n\n'.join(reports)
+
+
+async def send_notifications(
+        mode: str,
+        api_url: str,
+        recipients: list[User],
+        concurrency: int,
+) -> Counter:
+    semaphore = asyncio.Semaphore(concurrency)
+    outcomes = Counter()
+    if mode != 'new_bot':
+        init_bot(
+            create_bot(
+                BENCHMARK_TOKEN,
+                api_url,
+                ssl_context=settings.SSL_CONTEXT,
+            )
+        )
+
+    async def notify(recipient: User):
+        async with semaphore:
+            if mode == 'new_bot':
+                outcomes[await send_with_new_bot(api_url, recipient)] += 1
+                return
+            for outcome in await get_notification_sender().send_message(
+                [recipient],
+                'Тест',
+            ):
+                outcomes[outcome.status] += 1
+
+    try:
+        if mode == 'fanout':
+            for outcome in await get_notification_sender().send_message(
+                recipients,
+                'Тест',
+            ):
+                outcomes[outcome.status] += 1
+        else:
+            await asyncio.gather(*(
+                notify(recipient) for recipient in recipients
+            ))
+    finally:
+        await close_bot()
+    return outcomes
+
+
+async def send_with_new_bot(api_url: str, recipient: User) -> str:
+    """Как уведомления отправлялись до общего Bot процесса:
+    без повторов, 429 теряет уведомление
+    """
+    bot = create_bot(BENCHMARK_TOKEN, api_url, settings.SSL_CONTEXT)
+    try:
+        await bot.send_message(recipient.user.tg_id, 'Тест')
+        return 'sent'
+    except TelegramAPIError:
+        return 'failed'
+    finally:
+        await bot.session.close()
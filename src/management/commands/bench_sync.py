@@ -0,0 +1,318 @@
+import os
+import time
+import asyncio
+import logging
+import resource
+import statistics
+import multiprocessing
+
+from dataclasses import replace
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.models import Restaurant
+from src.utils import configure_logging
+from src.entities.RK7Simulator import RK7Simulator
+from src.entities.RK7Simulator import LATENCY_DISTRIBUTIONS
+from src.bot.scheme import SyncStatus
+from src.bot.handlers.synchronizations.client import ConnectionStats
+from src.bot.handlers.synchronizations.client import get_sync_http_client
+from src.bot.handlers.synchronizations.client import close_sync_http_client
+from src.bot.handlers.synchronizations.shards import get_shard_index
+from src.bot.handlers.synchronizations.sync_restaurants import \
+    start_synchronized_restaurants
+
+logger = logging.getLogger('support_bot')
+
+PROXY_ENV_VARS = (
+    'HTTP_PROXY',
+    'HTTPS_PROXY',
+    'ALL_PROXY',
+    'http_proxy',
+    'https_proxy',
+    'all_proxy',
+)
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест синхронизации ресторанов на симуляторе RK7'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hosts', type=int, default=1000)
+        parser.add_argument('--port', type=int, default=9000)
+        parser.add_argument('--first-address', default='127.1.0.1')
+        parser.add_argument(
+            '--latency-distribution',
+            choices=LATENCY_DISTRIBUTIONS,
+            default='lognormal',
+        )
+        parser.add_argument('--latency-median', type=float, default=0.05)
+        parser.add_argument('--latency-sigma', type=float, default=0.5)
+        parser.add_argument('--timeout-rate', type=float, default=0.0)
+        parser.add_argument('--tls-error-rate', type=float, default=0.0)
+        parser.add_argument('--auth-error-rate', type=float, default=0.0)
+        parser.add_argument('--no-transit-rate', type=float, default=0.0)
+        parser.add_argument('--page-size', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--franchises', type=int, default=3)
+        parser.add_argument('--concurrency', type=int)
+        parser.add_argument('--host-concurrency', type=int)
+        parser.add_argument('--sync-timeout', type=int)
+        parser.add_argument('--retry-attempts', type=int)
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=1,
+            help='Несколько запусков подряд на одной HTTP сессии',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            nargs='+',
+            help='Запуски с делением серверов на шарды по ip, каждый шард '
+                 'в своем процессе. Например: --workers 1 2 4',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            configure_logging()
+            override_sync_settings(options)
+            raise_open_files_limit()
+            for env_var in PROXY_ENV_VARS:
+                os.environ.pop(env_var, None)
+            report = asyncio.run(run_benchmark(options))
+            self.stdout.write(report)
+        except KeyboardInterrupt:
+            logger.info('Нагрузочный тест прерван')
+
+
+def override_sync_settings(options: dict):
+    overrides = {
+        'SYNC_CONCURRENCY': options['concurrency'],
+        'SYNC_HOST_CONCURRENCY': options['host_concurrency'],
+        'SYNC_TIMEOUT': options['sync_timeout'],
+        'SYNC_RETRY_ATTEMPTS': options['retry_attempts'],
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(settings, name, value)
+
+
+def raise_open_files_limit():
+    """Симулятор держит по сокету на сервер плюс соединения клиента"""
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit < hard_limit:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+
+async def run_benchmark(options: dict) -> str:
+    simulator = RK7Simulator(
+        hosts=options['hosts'],
+        port=options['port'],
+        first_address=options['first_address'],
+        latency_distribution=options['latency_distribution'],
+        latency_median=options['latency_median'],
+        latency_sigma=options['latency_sigma'],
+        timeout_rate=options['timeout_rate'],
+        tls_error_rate=options['tls_error_rate'],
+        auth_error_rate=options['auth_error_rate'],
+        no_transit_rate=options['no_transit_rate'],
+        connects_page_size=options['page_size'],
+        seed=options['seed'],
+    )
+    await simulator.start()
+    http_client = get_sync_http_client()
+    reports = []
+    try:
+        restaurants = [
+            Restaurant(
+                id=number,
+                code=number,
+                name=f'SIM_{number:05}',
+                server_ip=address,
+                franchise_id=number % options['franchises'] + 1,
+            )
+            for number, address in enumerate(simulator.addresses, start=1)
+        ]
+        if options['workers']:
+            reports = await run_sharded_benchmark(
+                simulator,
+                restaurants,
+                options['workers'],
+            )
+        else:
+            for run in range(1, options['runs'] + 1):
+                simulator.peak_connections = 0
+                requests_before = simulator.requests
+                connection_stats_before = replace(http_client.stats)
+                started_at = time.monotonic()
+                sync_statuses = await start_synchronized_restaurants(
+                    restaurants,
+                )
+                elapsed = time.monotonic() - started_at
+                reports.append(
+                    format_benchmark_report(
+                        run,
+                        sync_statuses,
+                        elapsed,
+                        simulator.peak_connections,
+                        simulator.requests - requests_before,
+                        http_client.stats - connection_stats_before,
+                        http_client.stats.avg_handshake_time,
+                    )
+                )
+    finally:
+        await close_sync_http_client()
+        await simulator.stop()
+    behaviours = Counter(host.behaviour for host in simulator.hosts.values())
+    header = (
+        f'Серверов: {len(simulator.hosts)} '
+        f'({", ".join(f"{k}={v}" for k, v in sorted(behaviours.items()))})\n'
+        f'Лимиты: SYNC_CONCURRENCY={settings.SYNC_CONCURRENCY} '
+        f'SYNC_HOST_CONCURRENCY={settings.SYNC_HOST_CONCURRENCY} '
+        f'SYNC_TIMEOUT={settings.SYNC_TIMEOUT}'
+    )
+    return '\n\n'.join([header] + reports)
+
+
+async def run_sharded_benchmark(
+        simulator: RK7Simulator,
+        restaurants: list[Restaurant],
+        workers_counts: list[int],
+) -> list[str]:
+    """Симулятор остается в этом процессе, синхронизация идет в дочерних.
+    Процессы форкаются до замера, в замер входит только синхронизация
+    """
+    loop = asyncio.get_running_loop()
+    reports = []
+    scaling = []
+    for workers in workers_counts:
+        shards = [[] for _ in range(workers)]
+        for restaurant in restaurants:
+            shard_index = get_shard_index(restaurant.server_ip, workers)
+            shards[shard_index].append(restaurant)
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('fork'),
+        ) as pool:
+            await asyncio.gather(*(
+                loop.run_in_executor(pool, time.sleep, 0)
+                for _ in range(workers)
+            ))
+            simulator.peak_connections = 0
+            requests_before = simulator.requests
+            started_at = time.monotonic()
+            shard_results = await asyncio.gather(*(
+                loop.run_in_executor(pool, run_shard_benchmark, shard)
+                for shard in shards
+            ))
+            elapsed = time.monotonic() - started_at
+        sync_statuses = []
+        connection_stats = ConnectionStats()
+        for shard_statuses, shard_connection_stats in shard_results:
+            sync_statuses += shard_statuses
+            connection_stats.created += shard_connection_stats.created
+            connection_stats.reused += shard_connection_stats.reused
+            connection_stats.handshake_time += (
+                shard_connection_stats.handshake_time
+            )
+        scaling.append((workers, elapsed))
+        reports.append(
+            f'Процессов: {workers} '
+            f'(серверов в шардах: {", ".join(str(len(s)) for s in shards)})\n'
+            + format_benchmark_report(
+                1,
+                sync_statuses,
+                elapsed,
+                simulator.peak_connections,
+                simulator.requests - requests_before,
+                connection_stats,
+                connection_stats.avg_handshake_time,
+            )
+        )
+    reports.append(format_scaling_report(scaling, len(restaurants)))
+    return reports
+
+
+def run_shard_benchmark(
+        restaurants: list[Restaurant],
+) -> tuple[list[SyncStatus], ConnectionStats]:
+    """Выполняется в дочернем процессе со своим циклом событий"""
+    return asyncio.run(sync_shard(restaurants))
+
+
+async def sync_shard(
+        restaurants: list[Restaurant],
+) -> tuple[list[SyncStatus], ConnectionStats]:
+    http_client = get_sync_http_client()
+    # после fork в клиенте счетчики родительского процесса
+    http_client.stats = ConnectionStats()
+    try:
+        sync_statuses = await start_synchronized_restaurants(restaurants)
+    finally:
+        await close_sync_http_client()
+    return sync_statuses, http_client.stats
+
+
+def format_scaling_report(
+        scaling: list[tuple[int, float]],
+        servers: int,
+) -> str:
+    _, base_elapsed = scaling[0]
+    lines = [
+        f'Масштабирование (ядер: {os.cpu_count()}, '
+        f'симулятор в одном процессе)',
+    ]
+    lines += [
+        f'  процессов {workers}: {elapsed:.2f} c, '
+        f'{servers / elapsed:.1f} серв/с, '
+        f'ускорение x{base_elapsed / elapsed:.2f}'
+        for workers, elapsed in scaling
+    ]
+    return '\n'.join(lines)
+
+
+def format_benchmark_report(
+        run: int,
+        sync_statuses: list[SyncStatus],
+        elapsed: float,
+        peak_connections: int,
+        requests: int,
+        connection_stats: ConnectionStats,
+        avg_handshake_time: float,
+) -> str:
+    latencies = [sync_status.elapsed for sync_status in sync_statuses]
+    p50, p95, p99 = get_percentiles(latencies, (50, 95, 99))
+    results = Counter(
+        f'{sync_status.status}: {sync_status.msg}'
+        for sync_status in sync_statuses
+    )
+    handshake_time_saved = connection_stats.reused * avg_handshake_time
+    lines = [
+        f'Запуск {run}',
+        f'Время: {elapsed:.2f} c',
+        f'Пропускная способность: {len(sync_statuses) / elapsed:.1f} серв/с',
+        f'Запросов к симулятору: {requests}',
+        f'Задержка на сервер, c: p50={p50:.3f} p95={p95:.3f} p99={p99:.3f}',
+        f'Пик открытых соединений: {peak_connections}',
+        f'Соединений новых: {connection_stats.created} '
+        f'(рукопожатия {connection_stats.handshake_time:.2f} c), '
+        f'переиспользовано: {connection_stats.reused} '
+        f'(сэкономлено примерно {handshake_time_saved:.2f} c)',
+        'Результаты:',
+    ]
+    lines += [f'  {result} - {count}' for result, count in results.items()]
+    return '\n'.join(lines)
+
+
+def get_percentiles(
+        values: list[float],
+        percents: tuple[int, ...],
+) -> list[float]:
+    if len(values) < 2:
+        return [values[0] if values else 0.0 for _ in percents]
+    cut_points = statistics.quantiles(values, n=100, method='inclusive')
+    return [cut_points[percent - 1] for percent in percents]
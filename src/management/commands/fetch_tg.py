@@ -17,6 +17,8 @@ from src.models import CustomUser
 from src.models import Dispatcher
 from src.entities.User import User
 from src.entities.Message import Message
+from src.bot.bot_client import init_bot
+from src.bot.bot_client import close_bot
 from src.bot.keyboards import get_choice_dispatcher_task_closed_keyboard
 from src.bot.dialogs import notify_for_engineers_from_dispatcher
 
@@ -132,13 +134,22 @@ async def parce_tg_notify(message: str) -> DispatcherTaskNotify:
     return dispatcher_task_notify
 
 
+async def start_bot_session():
+    """Уведомления уходят через общий Bot в цикле событий telethon"""
+    init_bot()
+
+
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         try:
             configure_logging()
             logging.getLogger('telethon').setLevel(logging.INFO)
             client.start()
-            client.run_until_disconnected()
+            client.loop.run_until_complete(start_bot_session())
+            try:
+                client.run_until_disconnected()
+            finally:
+                client.loop.run_until_complete(close_bot())
         except KeyboardInterrupt:
             logger.info('Работа бота прервана')
         except Exception as err:
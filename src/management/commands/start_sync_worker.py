@@ -0,0 +1,136 @@
+import signal
+import asyncio
+import logging
+import multiprocessing
+
+from django.db import connections
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from src.utils import configure_logging
+from src.bot.bot_client import init_bot
+from src.bot.bot_client import close_bot
+from src.entities.MassSyncLock import get_mass_sync_lock
+from src.bot.handlers.synchronizations.jobs import RedisSyncQueue
+from src.bot.handlers.synchronizations.worker import SyncWorker
+from src.bot.handlers.synchronizations.client import close_sync_http_client
+
+logger = logging.getLogger('support_bot')
+
+
+class Command(BaseCommand):
+    help = 'Воркер массовой синхронизации (задачи берет из очереди Redis)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Сколько процессов воркера запустить на этом хосте',
+        )
+        parser.add_argument(
+            '--worker-id',
+            default=settings.SYNC_WORKER_ID,
+            help='Постоянное имя воркера, у воркеров на разных хостах '
+                 'должно отличаться',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            configure_logging()
+            if not settings.REDIS_HOST:
+                logger.error(
+                    'Не задан REDIS_HOST. Без Redis синхронизации '
+                    'выполняются внутри процесса бота'
+                )
+                return
+            if options['processes'] > 1:
+                run_worker_processes(
+                    options['worker_id'],
+                    options['processes'],
+                )
+                return
+            asyncio.run(
+                run_sync_worker(get_worker_name(options['worker_id'], 0)),
+            )
+        except KeyboardInterrupt:
+            logger.info('Работа воркера синхронизации прервана')
+        except Exception as err:
+            logger.exception(err)
+
+
+def get_worker_name(worker_id: str, number: int) -> str:
+    """Имя постоянно между перезапусками: воркер забирает в очередь
+    только свои незавершенные задачи, а не задачи соседних процессов.
+    Имя хоста не подходит, docker меняет его при пересоздании контейнера
+    """
+    return f'{worker_id}:{number}'
+
+
+def run_worker_processes(worker_id: str, processes: int):
+    """Процессы форкаются, у каждого свой цикл событий и HTTP сессия.
+    SIGTERM пересылается процессам, каждый дожидается своей синхронизации
+    """
+    connections.close_all()
+    workers = [
+        multiprocessing.Process(
+            target=run_worker_process,
+            args=(get_worker_name(worker_id, number),),
+            name=f'sync_worker_{number}',
+        )
+        for number in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    logger.info('Запущено процессов воркера синхронизации: %s', processes)
+
+    def stop_workers(signum, frame):
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, stop_workers)
+    for worker in workers:
+        worker.join()
+
+
+def run_worker_process(worker_name: str):
+    try:
+        asyncio.run(run_sync_worker(worker_name))
+    except KeyboardInterrupt:
+        pass
+    except Exception as err:
+        logger.exception(err)
+
+
+async def run_sync_worker(worker_name: str):
+    bot = init_bot()
+    sync_queue = RedisSyncQueue(
+        settings.REDIS_HOST,
+        settings.REDIS_PORT,
+        worker_name,
+    )
+    sync_worker = SyncWorker(sync_queue, bot)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for stop_signal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(stop_signal, stop_event.set)
+    sync_worker_task = asyncio.create_task(sync_worker.run_forever())
+    stop_task = asyncio.create_task(stop_event.wait())
+    try:
+        await asyncio.wait(
+            {sync_worker_task, stop_task},
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if stop_event.is_set():
+            logger.info('Останавливаю воркер синхронизации')
+            await sync_worker.stop()
+        sync_worker_task.cancel()
+        await asyncio.gather(sync_worker_task, return_exceptions=True)
+    finally:
+        stop_task.cancel()
+        await sync_queue.close()
+        await get_mass_sync_lock().close()
+        await close_sync_http_client()
+        await close_bot()
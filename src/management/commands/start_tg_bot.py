@@ -9,13 +9,21 @@ from django.core.management.base import BaseCommand
 from aiogram import Bot
 from aiogram import types
 from aiogram import Dispatcher
-from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 
 
 from src.utils import configure_logging
+from src.bot.bot_client import init_bot
+from src.bot.bot_client import close_bot
+from src.bot.outbox import get_notification_dispatcher
 from src.entities.Scheduler import Scheduler
+from src.entities.MassSyncLock import get_mass_sync_lock
 from src.bot.handlers import router
+from src.bot.handlers.synchronizations.jobs import get_sync_queue
+from src.bot.handlers.synchronizations.worker import SyncWorker
+from src.bot.handlers.synchronizations.health import HostProber
+from src.bot.handlers.synchronizations.client import get_sync_http_client
+from src.bot.handlers.synchronizations.client import close_sync_http_client
 from src.bot.middlewares import AuthUpdateMiddleware
 from src.bot.middlewares import EmployeeStatusMiddleware
 from src.bot.middlewares import UserGroupMiddleware
@@ -42,6 +50,10 @@ async def start_bot(bot: Bot):
     await bot.send_message(settings.TG_BOT_ADMIN, text='Бот запущен!')
 
 
+async def start_sync_http_client():
+    await get_sync_http_client().get_session()
+
+
 async def set_commands(bot: Bot):
     available_commands = [
         types.BotCommand(
@@ -69,13 +81,42 @@ async def run_bot():
             jobstores=Scheduler.get_job_store()
         )
     )
-    bot = Bot(token=settings.TG_BOT_TOKEN, parse_mode=ParseMode.HTML)
+    bot = init_bot()
     dp = Dispatcher(storage=MemoryStorage(), skip_updates=True)
     dp.include_router(router)
     dp.startup.register(start_bot)
+    dp.startup.register(start_sync_http_client)
+    dp.shutdown.register(close_sync_http_client)
     dp.update.outer_middleware(AuthUpdateMiddleware())
     dp.update.outer_middleware(UserGroupMiddleware())
     dp.message.outer_middleware(EmployeeStatusMiddleware())
     dp.message.outer_middleware(RightMiddleware())
     scheduler.aio_scheduler.start()
-    await dp.start_polling(bot, scheduler=scheduler)
+    await scheduler.start_sync_schedules()
+    sync_queue = get_sync_queue()
+    sync_worker = SyncWorker(sync_queue, bot)
+    sync_worker_task = None
+    if sync_queue.is_local:
+        logger.info('Очередь синхронизаций в памяти, воркер в процессе бота')
+        sync_worker_task = asyncio.create_task(sync_worker.run_forever())
+    notification_dispatcher = get_notification_dispatcher()
+    notification_dispatcher_task = asyncio.create_task(
+        notification_dispatcher.run_forever(),
+    )
+    host_prober_task = None
+    if settings.SYNC_PROBE_INTERVAL:
+        host_prober_task = asyncio.create_task(HostProber().run_forever())
+    try:
+        await dp.start_polling(bot, scheduler=scheduler)
+    finally:
+        if sync_worker_task:
+            # polling остановлен по SIGTERM/SIGINT, дожидаемся синхронизацию
+            await sync_worker.stop()
+            sync_worker_task.cancel()
+        if host_prober_task:
+            host_prober_task.cancel()
+        await notification_dispatcher.stop()
+        notification_dispatcher_task.cancel()
+        await sync_queue.close()
+        await get_mass_sync_lock().close()
+        await close_bot()
@@ -0,0 +1,217 @@
+import json
+import time
+import asyncio
+import logging
+
+from dataclasses import asdict
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from src.models import CustomUser
+from src.utils import configure_logging
+from src.bot.scheme import SyncJob
+from src.bot.scheme import SyncStatus
+from src.entities.MassSyncLock import MassSyncHolder
+from src.entities.MassSyncLock import MASS_SYNC_CHOICES
+from src.entities.MassSyncLock import get_mass_sync_lock
+from src.bot.handlers.synchronizations.worker import SyncWorker
+from src.bot.handlers.synchronizations.worker import get_sync_service_user
+from src.bot.handlers.synchronizations.client import close_sync_http_client
+
+logger = logging.getLogger('support_bot')
+
+SERVER_TYPES = {
+    'restaurants': 'Report',
+    'transits': 'Transit',
+    'all': 'All',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Синхронизация справочников без бота. Результаты по серверам '
+        'выводятся в stdout построчно в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server-type',
+            choices=SERVER_TYPES,
+            default='restaurants',
+        )
+        parser.add_argument(
+            '--franchise',
+            help='Alias франшизы. Для транзитов и all - все владельцы',
+        )
+        parser.add_argument(
+            '--codes',
+            type=int,
+            nargs='+',
+            default=[],
+            help='Коды ресторанов',
+        )
+        parser.add_argument(
+            '--changed-only',
+            action='store_true',
+            help='Только сервера с изменившимися справочниками',
+        )
+        parser.add_argument('--concurrency', type=int)
+        parser.add_argument('--host-concurrency', type=int)
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            help='Одинаковый таймаут для всех серверов вместо '
+                 'рассчитанного по истории ответов',
+        )
+        parser.add_argument('--retry-attempts', type=int)
+        parser.add_argument(
+            '--user',
+            default=settings.SYNC_SERVICE_USER,
+            help='Login пользователя, от имени которого сохраняется отчет',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Запустить массовую синхронизацию, даже если идет другая '
+                 'или не прошла пауза SYNC_MASS_COOLDOWN',
+        )
+        parser.add_argument(
+            '--fail-on-error',
+            action='store_true',
+            help='Код возврата 1, если есть ошибки синхронизации',
+        )
+
+    def handle(self, *args, **options):
+        configure_logging()
+        override_sync_settings(options)
+        job_kwargs = get_job_kwargs(options)
+        try:
+            summary = asyncio.run(
+                run_sync(
+                    options['user'],
+                    job_kwargs,
+                    self.write_result,
+                    options['force'],
+                ),
+            )
+        except KeyboardInterrupt:
+            logger.info('Синхронизация прервана')
+            return
+        self.stdout.write(json.dumps(summary, ensure_ascii=False))
+        if options['fail_on_error'] and summary['error']:
+            raise CommandError(
+                f'Ошибок синхронизации: {summary["error"]}',
+                returncode=1,
+            )
+
+    def write_result(self, sync_status: SyncStatus):
+        self.stdout.write(json.dumps(asdict(sync_status), ensure_ascii=False))
+        self.stdout.flush()
+
+
+def get_job_kwargs(options: dict) -> dict:
+    server_type = SERVER_TYPES[options['server_type']]
+    job_kwargs = {
+        'server_type': server_type,
+        'changed_only': options['changed_only'],
+    }
+    if server_type in ('Transit', 'All'):
+        if options['codes']:
+            raise CommandError('--codes только для ресторанов')
+        job_kwargs['user_choice'] = options['franchise'] or 'all'
+        if server_type == 'All':
+            job_kwargs['user_choice'] = 'topology'
+            if options['franchise'] not in (None, 'all'):
+                job_kwargs['user_choice'] = f'topology_{options["franchise"]}'
+        return job_kwargs
+    if options['codes'] and options['franchise']:
+        raise CommandError('Укажите --codes или --franchise, не оба')
+    job_kwargs['user_choice'] = 'rest_all'
+    if options['codes']:
+        job_kwargs['user_choice'] = 'rest_list'
+        job_kwargs['restaurant_codes'] = options['codes']
+    if options['franchise']:
+        job_kwargs['user_choice'] = f'rest_group_{options["franchise"]}'
+    return job_kwargs
+
+
+def override_sync_settings(options: dict):
+    overrides = {
+        'SYNC_CONCURRENCY': options['concurrency'],
+        'SYNC_HOST_CONCURRENCY': options['host_concurrency'],
+        'SYNC_RETRY_ATTEMPTS': options['retry_attempts'],
+    }
+    if options['timeout']:
+        overrides.update(
+            SYNC_TIMEOUT=options['timeout'],
+            SYNC_TIMEOUT_MIN=options['timeout'],
+            SYNC_TIMEOUT_MAX=options['timeout'],
+        )
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(settings, name, value)
+
+
+async def run_sync(
+        login: str,
+        job_kwargs: dict,
+        write_result,
+        force: bool = False,
+) -> dict:
+    if login == settings.SYNC_SERVICE_USER:
+        employee = await get_sync_service_user()
+    else:
+        try:
+            employee = await CustomUser.objects.aget(login=login)
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'Нет пользователя {login} для отчета')
+    job = SyncJob(employee_id=employee.id, **job_kwargs)
+    if job.user_choice in MASS_SYNC_CHOICES and not force:
+        await acquire_mass_sync(job, employee)
+    results = Counter()
+
+    async def on_result(sync_status: SyncStatus):
+        results[sync_status.status] += 1
+        write_result(sync_status)
+
+    try:
+        sync_report = await SyncWorker(None, None).process(job, on_result)
+    finally:
+        await close_sync_http_client()
+        await get_mass_sync_lock().close()
+    return {
+        'report_id': sync_report.id,
+        'total': sum(results.values()),
+        'ok': results['ok'],
+        'error': results['error'],
+        'skipped': results['skipped'],
+    }
+
+
+async def acquire_mass_sync(job: SyncJob, employee: CustomUser):
+    """Та же блокировка, что у запусков из бота и по расписанию"""
+    mass_sync_lock = get_mass_sync_lock()
+    current_holder = await mass_sync_lock.acquire(
+        MassSyncHolder(
+            job_id=job.id,
+            employee_name=employee.name,
+            started_at=time.time(),
+        ),
+    )
+    if current_holder is None:
+        return
+    await mass_sync_lock.close()
+    if current_holder.finished:
+        raise CommandError(
+            'Не прошла пауза после массовой синхронизации '
+            f'{current_holder.job_id}, осталось '
+            f'{int(current_holder.cooldown_left)} c. '
+            'Запустить сейчас: --force'
+        )
+    raise CommandError(
+        f'Идет массовая синхронизация {current_holder.job_id} '
+        f'({current_holder.employee_name}). Запустить параллельно: --force'
+    )
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.15 on 2026-10-18 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0066_auto_20240808_2006'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='franchiseowner',
+            name='referents_changed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Справочники изменены'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='last_sync_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя успешная синхронизация'),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='last_sync_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последняя успешная синхронизация'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.15 on 2026-10-18 09:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_hosts_health_bot_command(apps, schema_editor):
+    BotCommand = apps.get_model('src', 'BotCommand')
+    BotCommandCategory = apps.get_model('src', 'BotCommandCategory')
+    sync_category, _ = BotCommandCategory.objects.get_or_create(
+        name='Синхронизация',
+    )
+    BotCommand.objects.update_or_create(
+        name='/hosts_health',
+        defaults={
+            'description': 'Доступность серверов для синхронизации',
+            'category': sync_category,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0067_sync_last_sync_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostHealth',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.GenericIPAddressField(verbose_name='IP адрес')),
+                ('port', models.PositiveIntegerField(default=9000, verbose_name='Порт веб сервера')),
+                ('last_checked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Последняя проверка')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний раз доступен')),
+                ('latency_ms', models.FloatField(blank=True, null=True, verbose_name='Среднее время подключения (мс)')),
+                ('consecutive_failures', models.PositiveIntegerField(default=0, verbose_name='Неудачных проверок подряд')),
+                ('last_error', models.CharField(blank=True, default='', max_length=100, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Доступность сервера',
+                'verbose_name_plural': 'Доступность серверов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hosthealth',
+            constraint=models.UniqueConstraint(fields=('host', 'port'), name='unique_host_health'),
+        ),
+        migrations.RunPython(
+            create_hosts_health_bot_command,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.15 on 2026-10-18 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_sync_results(apps, schema_editor):
+    """
+    Переносим статусы серверов из JSON поля SyncReport.report
+    в отдельную таблицу SyncResult
+    """
+    SyncReport = apps.get_model('src', 'SyncReport')
+    SyncResult = apps.get_model('src', 'SyncResult')
+    sync_results = []
+    sync_reports = SyncReport.objects.only('id', 'report')
+    for sync_report in sync_reports.iterator(chunk_size=100):
+        for item in sync_report.report or []:
+            sync_results.append(
+                SyncResult(
+                    report_id=sync_report.id,
+                    server_name=item.get('server_name', '')[:100],
+                    web_link=item.get('web_link', '')[:150],
+                    status=item.get('status', 'error')[:10],
+                    msg=(item.get('msg') or '')[:255],
+                    attempts=item.get('attempts') or 1,
+                    error_class=(item.get('error_class') or '')[:50],
+                    http_status=item.get('http_status'),
+                )
+            )
+        if len(sync_results) >= BACKFILL_BATCH_SIZE:
+            SyncResult.objects.bulk_create(sync_results)
+            sync_results = []
+    SyncResult.objects.bulk_create(sync_results)
+
+
+def clear_sync_results(apps, schema_editor):
+    SyncResult = apps.get_model('src', 'SyncResult')
+    SyncResult.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0068_hosthealth'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncreport',
+            name='report',
+            field=models.JSONField(blank=True, default=list, verbose_name='Отчет'),
+        ),
+        migrations.CreateModel(
+            name='SyncResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('server_name', models.CharField(db_index=True, max_length=100, verbose_name='Имя сервера')),
+                ('web_link', models.CharField(max_length=150, verbose_name='Web сервер')),
+                ('status', models.CharField(db_index=True, max_length=10, verbose_name='Статус')),
+                ('msg', models.CharField(blank=True, max_length=255, verbose_name='Сообщение')),
+                ('attempts', models.PositiveSmallIntegerField(default=1, verbose_name='Попыток')),
+                ('error_class', models.CharField(blank=True, default='', max_length=50, verbose_name='Тип ошибки')),
+                ('http_status', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='HTTP статус')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='src.syncreport', verbose_name='Журнал синхронизации')),
+            ],
+            options={
+                'verbose_name': 'Результат синхронизации',
+                'verbose_name_plural': 'Результаты синхронизации',
+                'indexes': [models.Index(fields=['report', 'status'], name='sync_result_report_status')],
+            },
+        ),
+        migrations.RunPython(backfill_sync_results, clear_sync_results),
+    ]
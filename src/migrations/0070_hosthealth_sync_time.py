@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0069_syncresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hosthealth',
+            name='sync_time_ms',
+            field=models.FloatField(blank=True, null=True, verbose_name='Среднее время синхронизации (мс)'),
+        ),
+        migrations.AddField(
+            model_name='hosthealth',
+            name='sync_time_var_ms',
+            field=models.FloatField(blank=True, null=True, verbose_name='Разброс времени синхронизации (мс)'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:15
+
+from django.db import migrations
+from django.contrib.auth.hashers import make_password
+
+SYNC_SERVICE_USER = 'sync_service'
+# tg_id обязателен и уникален, id вне диапазона телеграма
+SYNC_SERVICE_USER_TG_ID = 2 ** 63 - 1
+
+
+def create_sync_service_user(apps, schema_editor):
+    CustomUser = apps.get_model('src', 'CustomUser')
+    CustomUser.objects.get_or_create(
+        login=SYNC_SERVICE_USER,
+        defaults={
+            'name': 'Синхронизация без бота',
+            'tg_id': SYNC_SERVICE_USER_TG_ID,
+            'password': make_password(None),
+            'is_active': False,
+        },
+    )
+
+
+def delete_sync_service_user(apps, schema_editor):
+    CustomUser = apps.get_model('src', 'CustomUser')
+    CustomUser.objects.filter(login=SYNC_SERVICE_USER).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0070_hosthealth_sync_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_sync_service_user,
+            delete_sync_service_user,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:50
+
+from django.db import migrations
+
+
+def create_all_server_type(apps, schema_editor):
+    """Тип для отчетов синхронизации транзитов вместе с ресторанами"""
+    ServerType = apps.get_model('src', 'ServerType')
+    ServerType.objects.update_or_create(name='All')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0071_sync_service_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_all_server_type,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.15 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0072_servertype_all'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='syncresult',
+            index=models.Index(fields=['report', 'server_name'], name='sync_result_report_server'),
+        ),
+    ]
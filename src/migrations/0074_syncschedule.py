@@ -0,0 +1,32 @@
+# Generated by Django 4.2.15 on 2026-10-18 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0073_syncresult_report_server_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncSchedule',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('server_type', models.CharField(choices=[('Report', 'Рестораны'), ('Transit', 'Транзиты'), ('All', 'Транзиты и рестораны')], default='Report', max_length=10, verbose_name='Что синхронизировать')),
+                ('changed_only', models.BooleanField(default=False, verbose_name='Только изменившиеся')),
+                ('window_start', models.TimeField(verbose_name='Начало окна')),
+                ('window_end', models.TimeField(help_text='Сервера равномерно распределяются по окну. Окно может переходить через полночь', verbose_name='Конец окна')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний запуск')),
+                ('franchise', models.ForeignKey(blank=True, help_text='Пусто - все франшизы', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sync_schedules', to='src.franchiseowner', verbose_name='Франшиза')),
+            ],
+            options={
+                'verbose_name': 'Расписание синхронизации',
+                'verbose_name_plural': 'Расписания синхронизации',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.15 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0074_syncschedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncreport',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время завершения'),
+        ),
+        migrations.AddField(
+            model_name='syncreport',
+            name='job_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32, verbose_name='Id задачи синхронизации'),
+        ),
+        migrations.AddField(
+            model_name='syncreport',
+            name='status',
+            field=models.CharField(choices=[('running', 'Выполняется'), ('completed', 'Завершена'), ('cancelled', 'Отменена'), ('interrupted', 'Прервана')], db_index=True, default='completed', max_length=15, verbose_name='Статус'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0075_syncreport_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncresult',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Время по фазам, мс'),
+        ),
+    ]
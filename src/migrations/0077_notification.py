@@ -0,0 +1,49 @@
+# Generated by Django 4.2.15 on 2026-10-18 16:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0076_syncresult_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.BigIntegerField(verbose_name='Чат')),
+                ('recipient_name', models.CharField(blank=True, default='', max_length=50, verbose_name='Получатель')),
+                ('text', models.TextField(verbose_name='Текст')),
+                ('reply_markup', models.JSONField(blank=True, null=True, verbose_name='Клавиатура')),
+                ('priority', models.PositiveSmallIntegerField(choices=[(0, 'Эскалация'), (1, 'Обычное'), (2, 'Массовое')], default=1, verbose_name='Приоритет')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sent', 'Отправлено'), ('dead', 'Не доставлено')], default='pending', max_length=10, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('last_error', models.CharField(blank=True, default='', max_length=255, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создано')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Следующая попытка')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Отправлено')),
+            ],
+            options={
+                'verbose_name': 'Уведомление',
+                'verbose_name_plural': 'Уведомления',
+                'indexes': [models.Index(fields=['status', 'priority', 'next_attempt_at'], name='notification_queue')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeadNotification',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Недоставленное уведомление',
+                'verbose_name_plural': 'Недоставленные уведомления',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('src.notification',),
+        ),
+    ]
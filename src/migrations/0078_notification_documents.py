@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0077_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='documents',
+            field=models.JSONField(blank=True, help_text='Имя документа и file_id телеграма, отправляются после текста', null=True, verbose_name='Документы'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.15 on 2026-10-18 18:45
+
+from django.db import migrations, models
+
+
+def clear_unprobed_last_checked_at(apps, schema_editor):
+    """Строки, созданные по времени синхронизации, получили время
+    проверки по умолчанию. У проверенного сервера есть задержка
+    подключения или неудачные проверки
+    """
+    HostHealth = apps.get_model('src', 'HostHealth')
+    HostHealth.objects.filter(
+        latency_ms__isnull=True,
+        consecutive_failures=0,
+    ).update(last_checked_at=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0078_notification_documents'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='hosthealth',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, help_text='Пусто, если сервер еще не проверялся, а строка создана по времени синхронизации', null=True, verbose_name='Последняя проверка'),
+        ),
+        migrations.RunPython(
+            clear_unprobed_last_checked_at,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0079_hosthealth_last_checked_at_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncreport',
+            name='changed_only',
+            field=models.BooleanField(default=False, help_text='Сервера без изменений пропущены', verbose_name='Только изменившиеся'),
+        ),
+    ]
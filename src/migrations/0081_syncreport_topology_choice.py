@@ -0,0 +1,31 @@
+# Generated by Django 4.2.15 on 2026-10-18 19:35
+
+from django.db import migrations
+
+
+def set_topology_choice(apps, schema_editor):
+    """Запуски транзитов с ресторанами сохранялись с выбором транзитов:
+    all или алиас франшизы
+    """
+    SyncReport = apps.get_model('src', 'SyncReport')
+    topology_reports = SyncReport.objects.filter(server_type__name='All')
+    topology_reports.filter(user_choice='all').update(user_choice='topology')
+    for sync_report in topology_reports.exclude(
+        user_choice__startswith='topology',
+    ):
+        sync_report.user_choice = f'topology_{sync_report.user_choice}'
+        sync_report.save(update_fields=['user_choice'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0080_syncreport_changed_only'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            set_topology_choice,
+            migrations.RunPython.noop,
+        ),
+    ]
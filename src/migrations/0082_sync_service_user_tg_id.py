@@ -0,0 +1,30 @@
+# Generated by Django 4.2.15 on 2026-10-18 20:05
+
+from django.db import migrations
+
+SYNC_SERVICE_USER = 'sync_service'
+SYNC_SERVICE_USER_TG_ID = 2 ** 63 - 1
+
+
+def move_sync_service_user_tg_id(apps, schema_editor):
+    """Пользователь синхронизаций без бота создавался с tg_id=0:
+    он совпадал с id неопознанного события и выглядел как id телеграма
+    """
+    CustomUser = apps.get_model('src', 'CustomUser')
+    CustomUser.objects.filter(login=SYNC_SERVICE_USER, tg_id=0).update(
+        tg_id=SYNC_SERVICE_USER_TG_ID,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('src', '0081_syncreport_topology_choice'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            move_sync_service_user_tg_id,
+            migrations.RunPython.noop,
+        ),
+    ]
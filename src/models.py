@@ -324,6 +324,11 @@ class Right(models.Model):
 class FranchiseOwner(models.Model):
     name = models.CharField('Имя франшизы', max_length=25)
     alias = models.CharField('Alias', max_length=10)
+    referents_changed_at = models.DateTimeField(
+        'Справочники изменены',
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = 'Франшиза'
@@ -398,6 +403,11 @@ class Restaurant(models.Model):
         verbose_name='Франшиза',
     )
     is_sync = models.BooleanField('Синхронизация?', default=False)
+    last_sync_at = models.DateTimeField(
+        'Последняя успешная синхронизация',
+        null=True,
+        blank=True,
+    )
 
     objects = RestaurantQuerySet.as_manager()
 
@@ -462,6 +472,11 @@ class Server(models.Model):
     )
     is_sync = models.BooleanField('Синхронизация?', default=False)
     is_active = models.BooleanField('Рабочий?', default=True)
+    last_sync_at = models.DateTimeField(
+        'Последняя успешная синхронизация',
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         verbose_name = 'Сервер'
@@ -708,7 +723,33 @@ class SDTask(models.Model):
         return f'{self.applicant} - {self.number}'
 
 
+class SyncReportQuerySet(models.QuerySet):
+
+    def with_result_counts(self):
+        return self.annotate(
+            completed=models.Count(
+                'results',
+                filter=models.Q(results__status='ok'),
+            ),
+            errors=models.Count(
+                'results',
+                filter=models.Q(results__status='error'),
+            ),
+            skipped=models.Count(
+                'results',
+                filter=models.Q(results__status='skipped'),
+            ),
+        )
+
+
 class SyncReport(models.Model):
+    STATUS_CHOICES = (
+        ('running', 'Выполняется'),
+        ('completed', 'Завершена'),
+        ('cancelled', 'Отменена'),
+        ('interrupted', 'Прервана'),
+    )
+
     start_at = models.DateTimeField(
         'Время запуска синхронизации',
         default=timezone.now,
@@ -735,8 +776,34 @@ class SyncReport(models.Model):
         related_name='sync_reports',
         verbose_name='Что синхронизировали',
     )
-    report = models.JSONField('Отчет')
+    report = models.JSONField('Отчет', default=list, blank=True)
     user_choice = models.CharField('Выбор пользователя', max_length=25)
+    status = models.CharField(
+        'Статус',
+        choices=STATUS_CHOICES,
+        default='completed',
+        db_index=True,
+        max_length=15,
+    )
+    job_id = models.CharField(
+        'Id задачи синхронизации',
+        max_length=32,
+        blank=True,
+        default='',
+        db_index=True,
+    )
+    changed_only = models.BooleanField(
+        'Только изменившиеся',
+        default=False,
+        help_text='Сервера без изменений пропущены',
+    )
+    finished_at = models.DateTimeField(
+        'Время завершения',
+        null=True,
+        blank=True,
+    )
+
+    objects = SyncReportQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Журнал синхронизации'
@@ -746,6 +813,261 @@ class SyncReport(models.Model):
         return f'{self.start_at}'
 
 
+class SyncResult(models.Model):
+    report = models.ForeignKey(
+        'SyncReport',
+        on_delete=models.CASCADE,
+        related_name='results',
+        verbose_name='Журнал синхронизации',
+    )
+    server_name = models.CharField(
+        'Имя сервера',
+        max_length=100,
+        db_index=True,
+    )
+    web_link = models.CharField('Web сервер', max_length=150)
+    status = models.CharField('Статус', max_length=10, db_index=True)
+    msg = models.CharField('Сообщение', max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=1)
+    error_class = models.CharField(
+        'Тип ошибки',
+        max_length=50,
+        blank=True,
+        default='',
+    )
+    http_status = models.PositiveSmallIntegerField(
+        'HTTP статус',
+        null=True,
+        blank=True,
+    )
+    timings = models.JSONField(
+        'Время по фазам, мс',
+        default=dict,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Результат синхронизации'
+        verbose_name_plural = 'Результаты синхронизации'
+        indexes = [
+            models.Index(
+                fields=['report', 'status'],
+                name='sync_result_report_status',
+            ),
+            models.Index(
+                fields=['report', 'server_name'],
+                name='sync_result_report_server',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.server_name} - {self.status}'
+
+
+class HostHealth(models.Model):
+    host = models.GenericIPAddressField('IP адрес')
+    port = models.PositiveIntegerField('Порт веб сервера', default=9000)
+    last_checked_at = models.DateTimeField(
+        'Последняя проверка',
+        null=True,
+        blank=True,
+        help_text='Пусто, если сервер еще не проверялся, '
+                  'а строка создана по времени синхронизации',
+    )
+    last_seen_at = models.DateTimeField(
+        'Последний раз доступен',
+        null=True,
+        blank=True,
+    )
+    latency_ms = models.FloatField(
+        'Среднее время подключения (мс)',
+        null=True,
+        blank=True,
+    )
+    consecutive_failures = models.PositiveIntegerField(
+        'Неудачных проверок подряд',
+        default=0,
+    )
+    last_error = models.CharField(
+        'Последняя ошибка',
+        max_length=100,
+        blank=True,
+        default='',
+    )
+    sync_time_ms = models.FloatField(
+        'Среднее время синхронизации (мс)',
+        null=True,
+        blank=True,
+    )
+    sync_time_var_ms = models.FloatField(
+        'Разброс времени синхронизации (мс)',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Доступность сервера'
+        verbose_name_plural = 'Доступность серверов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['host', 'port'],
+                name='unique_host_health',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.host}:{self.port}'
+
+
+class SyncSchedule(models.Model):
+    SERVER_TYPE_CHOICES = (
+        ('Report', 'Рестораны'),
+        ('Transit', 'Транзиты'),
+        ('All', 'Транзиты и рестораны'),
+    )
+
+    name = models.CharField('Название', max_length=100)
+    server_type = models.CharField(
+        'Что синхронизировать',
+        choices=SERVER_TYPE_CHOICES,
+        default='Report',
+        max_length=10,
+    )
+    franchise = models.ForeignKey(
+        'FranchiseOwner',
+        on_delete=models.CASCADE,
+        related_name='sync_schedules',
+        verbose_name='Франшиза',
+        null=True,
+        blank=True,
+        help_text='Пусто - все франшизы',
+    )
+    changed_only = models.BooleanField(
+        'Только изменившиеся',
+        default=False,
+    )
+    window_start = models.TimeField('Начало окна')
+    window_end = models.TimeField(
+        'Конец окна',
+        help_text='Сервера равномерно распределяются по окну. '
+                  'Окно может переходить через полночь',
+    )
+    is_active = models.BooleanField('Активно', default=True)
+    last_run_at = models.DateTimeField(
+        'Последний запуск',
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = 'Расписание синхронизации'
+        verbose_name_plural = 'Расписания синхронизации'
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def window_seconds(self) -> int:
+        start = self.window_start.hour * 3600 + self.window_start.minute * 60
+        end = self.window_end.hour * 3600 + self.window_end.minute * 60
+        return (end - start) % (24 * 3600)
+
+    @property
+    def user_choice(self) -> str:
+        """Выбор пользователя как при запуске синхронизации из бота"""
+        if self.server_type == 'Report':
+            if self.franchise:
+                return f'rest_group_{self.franchise.alias}'
+            return 'rest_all'
+        if self.server_type == 'All':
+            if self.franchise:
+                return f'topology_{self.franchise.alias}'
+            return 'topology'
+        if self.franchise:
+            return self.franchise.alias
+        return 'all'
+
+
+class Notification(models.Model):
+    """Исходящее уведомление в телеграм. Сообщения Message.* сначала
+    сохраняются здесь, отправляет их фоновый NotificationDispatcher
+    """
+    ESCALATION = 0
+    NORMAL = 1
+    BULK = 2
+    PRIORITY_CHOICES = (
+        (ESCALATION, 'Эскалация'),
+        (NORMAL, 'Обычное'),
+        (BULK, 'Массовое'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Ожидает отправки'),
+        ('sent', 'Отправлено'),
+        ('dead', 'Не доставлено'),
+    )
+
+    chat_id = models.BigIntegerField('Чат')
+    recipient_name = models.CharField(
+        'Получатель',
+        max_length=50,
+        blank=True,
+        default='',
+    )
+    text = models.TextField('Текст')
+    reply_markup = models.JSONField('Клавиатура', null=True, blank=True)
+    documents = models.JSONField(
+        'Документы',
+        null=True,
+        blank=True,
+        help_text='Имя документа и file_id телеграма, '
+                  'отправляются после текста',
+    )
+    priority = models.PositiveSmallIntegerField(
+        'Приоритет',
+        choices=PRIORITY_CHOICES,
+        default=NORMAL,
+    )
+    status = models.CharField(
+        'Статус',
+        choices=STATUS_CHOICES,
+        default='pending',
+        max_length=10,
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    last_error = models.CharField(
+        'Последняя ошибка',
+        max_length=255,
+        blank=True,
+        default='',
+    )
+    created_at = models.DateTimeField('Создано', default=timezone.now)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка',
+        default=timezone.now,
+    )
+    sent_at = models.DateTimeField('Отправлено', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Уведомление'
+        verbose_name_plural = 'Уведомления'
+        indexes = [
+            models.Index(
+                fields=['status', 'priority', 'next_attempt_at'],
+                name='notification_queue',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipient_name or self.chat_id}: {self.text[:50]}'
+
+
+class DeadNotification(Notification):
+    class Meta:
+        proxy = True
+        verbose_name = 'Недоставленное уведомление'
+        verbose_name_plural = 'Недоставленные уведомления'
+
+
 class BotCommandCategory(models.Model):
     name = models.CharField('Команда', max_length=25, unique=True)
 
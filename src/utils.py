@@ -216,18 +216,6 @@ def prepare_tasks_info(tasks: list) -> tuple:
     return tasks_info, len(tasks_processing_time), avg_tasks_processing_time
 
 
-def get_sync_statuses(sync_report: dict) -> tuple[list, list]:
-    errors = []
-    completed = []
-    for report in sync_report:
-        if report['status'] == 'error':
-            errors.append(report)
-            continue
-        if report['status'] == 'ok':
-            completed.append(report)
-    return completed, errors
-
-
 def format_timedelta(delta: timedelta):
     total_seconds = int(delta.total_seconds())
     hours = total_seconds // 3600
@@ -17,6 +17,8 @@ from src.models import SDTask
 from src.models import CustomUser
 from src.models import WorkShift
 from src.models import SyncReport
+from src.entities.SyncPhaseStats import SyncPhaseStats
+from src.entities.SyncReportDiff import SyncReportDiff
 
 logger = logging.getLogger('support_web')
 
@@ -243,10 +245,9 @@ def show_dealers_report(request):
 
 
 def show_sync_report_prev(request):
-    last_4_sync_reports = SyncReport.objects.prefetch_related(
-        'new_employee',
-        'server_type'
-    ).all().order_by('-id')[:4]
+    last_4_sync_reports = SyncReport.objects.with_result_counts() \
+        .select_related('new_employee', 'server_type') \
+        .order_by('-id')[:4]
     sync_reports = []
     for sync in last_4_sync_reports:
         sync_report = {
@@ -254,10 +255,11 @@ def show_sync_report_prev(request):
             'sync_date': sync.start_at,
             'employee': sync.new_employee,
             'what_sync': sync.user_choice,
+            'changed_only': sync.changed_only,
+            'errors': sync.errors,
+            'completed': sync.completed,
+            'skipped': sync.skipped,
         }
-        sync_completed, sync_errors = utils.get_sync_statuses(sync.report)
-        sync_report['errors'] = len(sync_errors)
-        sync_report['completed'] = len(sync_completed)
         sync_reports.append(sync_report)
     return render(
         request,
@@ -267,7 +269,10 @@ def show_sync_report_prev(request):
 
 
 def show_sync_report(request, pk):
-    sync = get_object_or_404(SyncReport, pk=pk)
+    sync = get_object_or_404(
+        SyncReport.objects.with_result_counts().select_related('new_employee'),
+        pk=pk,
+    )
     sync_report = {
         'table': {
             'headers': [
@@ -279,14 +284,20 @@ def show_sync_report(request, pk):
         'sync_date': sync.start_at,
         'employee': sync.new_employee,
         'what_sync': sync.user_choice,
+        'changed_only': sync.changed_only,
+        'status': sync.status,
+        'status_display': sync.get_status_display(),
         'sync_status': {
-            'errors': [],
-            'completed': [],
-        }
+            'errors': sync.results.filter(status='error')
+            .order_by('server_name')
+            .values('server_name', 'web_link', 'msg'),
+            'errors_count': sync.errors,
+            'completed_count': sync.completed,
+            'skipped_count': sync.skipped,
+        },
+        'diff': SyncReportDiff.for_report(sync),
+        'phases': SyncPhaseStats.for_report(sync),
     }
-    sync_completed, sync_errors = utils.get_sync_statuses(sync.report)
-    sync_report['sync_status']['completed'] = sync_completed
-    sync_report['sync_status']['errors'] = sync_errors
     return render(
         request,
         template_name='pages/sync_report.html',